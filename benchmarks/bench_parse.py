@@ -0,0 +1,243 @@
+"""Офлайн-бенчмарк парсинга и отрисовки Расписания Арбитражей.
+
+Работает без браузера и без Discord: данные берутся из записанных фикстур
+блока #log (benchmarks/fixtures/arbys_days*.html), каналы и гильдии
+подменяются простыми фейковыми объектами. Результаты печатаются в JSON,
+чтобы сравнивать версии main_bot.py между собой.
+
+Запуск:
+    python benchmarks/bench_parse.py --output bench.json
+    python benchmarks/bench_parse.py --compare bench.json   # сравнить с прошлым прогоном
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+WINDOW_DAYS = (1, 30, 90, 365)
+FAKE_GUILDS = 50
+
+# main_bot при импорте читает конфиг и состояние и открывает архив —
+# подсовываем временные файлы, чтобы бенчмарк не трогал рабочие.
+_TMP_DIR = tempfile.mkdtemp(prefix='arbys-bench-')
+for _name, _file in (('CONFIG_FILE', 'config.json'), ('STATE_FILE', 'state.json'),
+                     ('SNAPSHOT_FILE', 'schedule_snapshot.json'), ('ARCHIVE_FILE', 'archive.sqlite3')):
+    os.environ.setdefault(_name, os.path.join(_TMP_DIR, _file))
+sys.path.insert(0, REPO_DIR)
+
+import main_bot  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+from fixture_data import load_fixture, rebase_fixture  # noqa: E402
+
+
+# =================================================================
+# ФЕЙКОВЫЕ ОБЪЕКТЫ DISCORD
+# =================================================================
+
+_ids = itertools.count(10_000)
+
+class FakeRole:
+    def __init__(self, name: str):
+        self.id = next(_ids)
+        self.name = name
+        self.mention = f"<@&{self.id}>"
+
+    def is_default(self) -> bool:
+        return False
+
+class FakeGuild:
+    def __init__(self, role_names):
+        self.id = next(_ids)
+        self.roles = [FakeRole(name) for name in role_names]
+
+class FakeMessage:
+    def __init__(self, channel: 'FakeChannel', message_id: int):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        self.channel.api_calls += 1
+
+class FakeChannel:
+    def __init__(self, guild: FakeGuild):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = f"arbys-{self.id}"
+        self.api_calls = 0
+
+    async def send(self, content=None, embed=None):
+        self.api_calls += 1
+        return FakeMessage(self, next(_ids))
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        return FakeMessage(self, message_id)
+
+class FakeBot:
+    def __init__(self, channels: List[FakeChannel]):
+        self._channels = {c.id: c for c in channels}
+        self.emojis = []
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self._channels.get(channel_id)
+
+
+# =================================================================
+# ИЗМЕРЕНИЯ
+# =================================================================
+
+def measure(name: str, days: int, items: int, fn: Callable[[], Any], iterations: int) -> Dict[str, Any]:
+    """Время (несколько прогонов) и память (один прогон под tracemalloc)."""
+    fn()  # прогрев
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        "name": name,
+        "window_days": days,
+        "items": items,
+        "iterations": iterations,
+        "mean_s": mean,
+        "min_s": timings[0],
+        "p50_s": timings[len(timings) // 2],
+        "ops_per_s": 1 / mean if mean else None,
+        "items_per_s": items / mean if mean else None,
+        "peak_bytes": peak,
+        "net_alloc_bytes": sum(stat.size_diff for stat in diff),
+        "net_alloc_blocks": sum(stat.count_diff for stat in diff),
+    }
+
+def bench_window(days: int, iterations: int, loop: asyncio.AbstractEventLoop) -> List[Dict[str, Any]]:
+    now = time.time()
+    html = rebase_fixture(load_fixture(days), now)
+    soup = BeautifulSoup(html, 'html.parser')
+    entries = main_bot.extract_log_entries(soup)
+    timeline = main_bot.parse_arbitration_entries(entries)
+    store = main_bot.ScheduleStore.from_missions(timeline)
+    main_bot.publish_schedule(store, now)
+    schedule = main_bot.build_arbitration_schedule(store, now)
+
+    faction_pairs = []
+    for _, text in entries:
+        match = main_bot.MISSION_INFO_RE.search(main_bot.TRAILING_PARENS_RE.sub('', main_bot.TIME_PREFIX_RE.sub('', text)))
+        if match:
+            faction_pairs.append((match.group(2), f"{match.group(3)}, {match.group(4)}"))
+
+    def normalize_all():
+        for faction_raw, location in faction_pairs:
+            main_bot.normalize_faction_name(faction_raw, location)
+
+    def build_embed():
+        embed = main_bot.build_arbitration_embed(main_bot.get_arbitration_schedule(now))
+        main_bot.embed_fingerprint(embed)
+
+    # Половина гильдий имеет роль текущей ноды, чтобы проверять и путь с упоминанием
+    node = schedule["Current"].get("Node", "N/A")
+    channels = [FakeChannel(FakeGuild([node] if i % 2 else [])) for i in range(FAKE_GUILDS)]
+    fake_bot = FakeBot(channels)
+    main_bot.CONFIG['GUILDS'] = {str(c.guild.id): {'ARBITRATION_CHANNEL_ID': c.id} for c in channels}
+    main_bot.STATE['GUILDS'] = {}
+    loop.run_until_complete(main_bot.update_arbitration_channel(fake_bot))  # первая отправка
+
+    def publish_unchanged():
+        loop.run_until_complete(main_bot.update_arbitration_channel(fake_bot))
+
+    n = len(entries)
+    return [
+        measure("parse_html_bs4", days, n, lambda: main_bot.parse_arbitration_schedule(BeautifulSoup(html, 'html.parser'), now), iterations),
+        measure("parse_entries", days, n, lambda: main_bot.parse_arbitration_entries(entries), iterations),
+        measure("build_store", days, n, lambda: main_bot.ScheduleStore.from_missions(timeline), iterations),
+        measure("build_schedule", days, n, lambda: main_bot.build_arbitration_schedule(store, now), iterations),
+        measure("query_next_tier_node", days, 1, lambda: store.next_index(now, Tier="S", Node=node), iterations),
+        measure("normalize_faction_name", days, len(faction_pairs), normalize_all, iterations),
+        measure("build_embed", days, 1, build_embed, iterations),
+        measure("publish_unchanged", days, FAKE_GUILDS, publish_unchanged, iterations),
+    ]
+
+def version_info() -> Dict[str, Any]:
+    with open(os.path.join(REPO_DIR, 'main_bot.py'), 'rb') as f:
+        main_bot_sha1 = hashlib.sha1(f.read()).hexdigest()
+    try:
+        git_rev = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        git_rev = None
+    return {
+        "main_bot_sha1": main_bot_sha1,
+        "git_rev": git_rev,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+    }
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Печатает отношение времени к прошлому прогону; False при регрессии."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r["name"], r["window_days"]): r for r in json.load(f)["results"]}
+    ok = True
+    for r in results:
+        old = baseline.get((r["name"], r["window_days"]))
+        if not old:
+            continue
+        ratio = r["mean_s"] / old["mean_s"] if old["mean_s"] else float('inf')
+        flag = "РЕГРЕССИЯ" if ratio > threshold else ""
+        ok = ok and ratio <= threshold
+        print(f"{r['name']:<24} days={r['window_days']:<4} x{ratio:5.2f} {flag}", file=sys.stderr)
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--days', type=int, nargs='+', default=list(WINDOW_DAYS))
+    parser.add_argument('--output', help='Куда записать JSON (по умолчанию stdout)')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Допустимое замедление при --compare')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    results = []
+    # Логи бота уходят в stderr, чтобы stdout оставался чистым JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        for days in args.days:
+            results.extend(bench_window(days, args.iterations, loop))
+    loop.close()
+
+    report = {"benchmark": "arbys-parse-render", **version_info(), "results": results}
+    raw = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(raw + '\n')
+    else:
+        print(raw)
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Локальная подмена browse.wf для HTTP-источника данных бота.
+
+Отдает записанные фикстуры #log, сдвинутые к текущим суткам:
+    /arbys       — HTML-страница с #log
+    /arbys.json  — JSON-массив пар [timestamp, text]
+Ответы снабжены ETag и Last-Modified; условные запросы получают 304.
+Для нагрузочных прогонов можно добавить задержку ответа и отказы (503):
+случайные с заданной долей и сплошные окна «аварий» по часам подмены.
+
+Запуск:
+    python benchmarks/fake_browsewf.py --port 8765 --days 30
+    python benchmarks/fake_browsewf.py --latency 0.2 --jitter 0.1 --failure-rate 0.1
+    HTTP_SOURCE_URL=http://127.0.0.1:8765/arbys.json python main_bot.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from email.utils import formatdate
+from typing import Callable, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from fixture_data import load_fixture, rebase_fixture
+
+LOG_ENTRY_RE = re.compile(r'<(?:b|span)\b[^>]*\bdata-timestamp="(\d+)"[^>]*>(.*?)</(?:b|span)>', re.S)
+
+
+def payload_entries(html: str):
+    """Пары [timestamp, text] из HTML фикстуры — то же, что отдает LOG_EXTRACT_JS."""
+    return [[ts, re.sub(r'<[^>]+>', '', text).strip()] for ts, text in LOG_ENTRY_RE.findall(html)]
+
+class FakeBrowseWf:
+    """Состояние подмены: кэш отрисованных ответов и счетчики запросов.
+
+    latency и jitter — задержка ответа в настоящих секундах; failure_rate —
+    доля запросов, получающих 503; outages — окна (начало, конец) по часам
+    clock, в которые отвечает 503 на все запросы.
+    """
+
+    def __init__(self, days: int = 30, clock: Callable[[], float] = time.time,
+                 latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 outages: Sequence[Tuple[float, float]] = (), seed: Optional[int] = None):
+        self.fixture = load_fixture(days)
+        self.clock = clock
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.outages = tuple(outages)
+        self._random = random.Random(seed)
+        self.requests = 0
+        self.not_modified = 0
+        self.failures = 0
+        self._day: Optional[int] = None
+        self._rendered = {}
+
+    def _render(self) -> None:
+        """Пересобирает ответы раз в сутки: расписание детерминировано."""
+        now = self.clock()
+        day = int(now // 86400)
+        if day == self._day:
+            return
+        html = rebase_fixture(self.fixture, now)
+        raw_json = json.dumps(payload_entries(html), ensure_ascii=False)
+        last_modified = formatdate(day * 86400, usegmt=True)
+        self._rendered = {
+            'html': self._entry(html, 'text/html', last_modified),
+            'json': self._entry(raw_json, 'application/json', last_modified),
+        }
+        self._day = day
+
+    @staticmethod
+    def _entry(body: str, content_type: str, last_modified: str) -> Tuple[bytes, str, str, str]:
+        data = body.encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(data).hexdigest()[:16]
+        return data, content_type, etag, last_modified
+
+    def _failing(self) -> bool:
+        now = self.clock()
+        if any(start <= now < end for start, end in self.outages):
+            return True
+        return self._random.random() < self.failure_rate
+
+    async def respond(self, request: web.Request, kind: str) -> web.Response:
+        self.requests += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._failing():
+            self.failures += 1
+            return web.Response(status=503, text='Service Unavailable')
+        self._render()
+        data, content_type, etag, last_modified = self._rendered[kind]
+        headers = {'ETag': etag, 'Last-Modified': last_modified, 'Cache-Control': 'no-cache'}
+        if request.headers.get('If-None-Match') == etag or (
+            'If-None-Match' not in request.headers and request.headers.get('If-Modified-Since') == last_modified
+        ):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=data, content_type=content_type, charset='utf-8', headers=headers)
+
+    def make_app(self) -> web.Application:
+        async def html_page(request):
+            return await self.respond(request, 'html')
+
+        async def json_entries(request):
+            return await self.respond(request, 'json')
+
+        app = web.Application()
+        app.router.add_get('/arbys', html_page)
+        app.router.add_get('/arbys.json', json_entries)
+        return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--days', type=int, default=30, help='Размер окна фикстуры в сутках')
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа, с')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Случайная добавка к задержке, с')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Доля ответов 503')
+    args = parser.parse_args()
+    fake = FakeBrowseWf(args.days, latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+    web.run_app(fake.make_app(), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
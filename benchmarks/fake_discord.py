@@ -0,0 +1,233 @@
+"""Локальная подмена REST API Discord для нагрузочных прогонов бота.
+
+Принимает те запросы, что бот делает при публикации расписания:
+    GET   /api/v10/users/@me
+    POST  /api/v10/channels/{channel_id}/messages
+    PATCH /api/v10/channels/{channel_id}/messages/{message_id}
+Лимиты воспроизводятся как у Discord: bucket на канал с заголовками
+X-RateLimit-* (limit/remaining/reset/reset-after/bucket), глобальный лимит
+на бота и 429 с retry_after в теле. Можно добавить задержку ответа и
+случайные 429 «shared»-лимита, которые не предсказать по заголовкам.
+
+discord.py ходит сюда настоящим HTTPClient, если подменить базовый адрес:
+    discord.http.Route.BASE = 'http://127.0.0.1:8766/api/v10'
+
+Запуск:
+    python benchmarks/fake_discord.py --port 8766 --route-limit 5 --global-limit 50
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+BOT_USER = {
+    'id': '100000000000000001',
+    'username': 'arbys-soak',
+    'discriminator': '0',
+    'global_name': None,
+    'avatar': None,
+    'bot': True,
+}
+SHARED_RETRY_AFTER_SECONDS = 0.5
+
+
+def json_response(data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    """JSON-ответ с Content-Type ровно application/json: discord.py сравнивает его
+    строкой и иначе отдает тело как текст (web.json_response дописывает charset)."""
+    headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    return web.Response(body=json.dumps(data).encode('utf-8'), status=status, headers=headers)
+
+
+class RouteBucket:
+    """Фиксированное окно, как у bucket Discord: limit запросов за per секунд."""
+
+    def __init__(self, name: str, limit: int, per: float):
+        self.name = name
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def take(self, now: float) -> bool:
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    def headers(self, now: float) -> Dict[str, str]:
+        reset_after = max(self.reset_at - now, 0.0)
+        return {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': '%.3f' % (time.time() + reset_after),
+            'X-RateLimit-Reset-After': '%.3f' % reset_after,
+            'X-RateLimit-Bucket': self.name,
+        }
+
+class FakeDiscordApi:
+    """Состояние подмены: сообщения каналов, bucket'ы и счетчики запросов.
+
+    Хранится только последнее содержимое каждого сообщения, поэтому память
+    подмены не растет со временем прогона.
+    """
+
+    def __init__(self, route_limit: int = 5, route_per: float = 5.0, global_limit: int = 50,
+                 latency: float = 0.0, jitter: float = 0.0, shared_429_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.route_limit = route_limit
+        self.route_per = route_per
+        self.global_bucket = RouteBucket('global', global_limit, 1.0)
+        self.latency = latency
+        self.jitter = jitter
+        self.shared_429_rate = shared_429_rate
+        self._random = random.Random(seed)
+        self._buckets: Dict[Tuple[str, int], RouteBucket] = {}
+        self._ids = itertools.count(200_000_000_000_000_000)
+        self.messages: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+
+    def _bucket(self, route: str, channel_id: int) -> RouteBucket:
+        key = (route, channel_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # Хэш bucket общий для маршрута, окно — свое у каждого канала (major parameter)
+            bucket = self._buckets[key] = RouteBucket(f'{route}-bucket', self.route_limit, self.route_per)
+        return bucket
+
+    @staticmethod
+    def _too_many(retry_after: float, scope: str, headers: Dict[str, str]) -> web.Response:
+        # Via отличает 429 API от блокировки Cloudflare — без него discord.py не повторяет запрос
+        headers = dict(headers, **{
+            'Via': '1.1 google',
+            'Retry-After': str(max(1, round(retry_after))),
+            'X-RateLimit-Scope': scope,
+        })
+        if scope == 'global':
+            headers['X-RateLimit-Global'] = 'true'
+        body = {'message': 'You are being rate limited.', 'retry_after': round(retry_after, 3), 'global': scope == 'global'}
+        return json_response(body, status=429, headers=headers)
+
+    async def _limited(self, route: str, channel_id: int) -> Tuple[Optional[web.Response], Dict[str, str]]:
+        """Задержка и проверка лимитов; возвращает (ответ 429 или None, заголовки bucket)."""
+        self.calls[route] += 1
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        now = time.monotonic()
+        if not self.global_bucket.take(now):
+            self.rate_limited['global'] += 1
+            return self._too_many(self.global_bucket.reset_at - now, 'global', {}), {}
+        bucket = self._bucket(route, channel_id)
+        if not bucket.take(now):
+            self.rate_limited['user'] += 1
+            return self._too_many(bucket.reset_at - now, 'user', bucket.headers(now)), {}
+        headers = bucket.headers(now)
+        if self._random.random() < self.shared_429_rate:
+            self.rate_limited['shared'] += 1
+            return self._too_many(SHARED_RETRY_AFTER_SECONDS, 'shared', headers), {}
+        return None, headers
+
+    def _message(self, channel_id: int, message_id: int, body: Dict[str, Any],
+                 previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        stamp = datetime.now(timezone.utc).isoformat()
+        message = dict(previous or {
+            'id': str(message_id),
+            'channel_id': str(channel_id),
+            'type': 0,
+            'author': BOT_USER,
+            'content': '',
+            'embeds': [],
+            'components': [],
+            'timestamp': stamp,
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'pinned': False,
+        })
+        # content=None в PATCH очищает текст, embed/view=None — список
+        if 'content' in body:
+            message['content'] = body['content'] or ''
+        for key in ('embeds', 'components'):
+            if key in body:
+                message[key] = body[key] or []
+        if previous is not None:
+            message['edited_timestamp'] = stamp
+        return message
+
+    async def current_user(self, request: web.Request) -> web.Response:
+        self.calls['get_user'] += 1
+        return json_response(BOT_USER)
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info['channel_id'])
+        limited, headers = await self._limited('create_message', channel_id)
+        if limited is not None:
+            return limited
+        message_id = next(self._ids)
+        message = self._message(channel_id, message_id, await request.json())
+        self.messages.setdefault(channel_id, {})[message_id] = message
+        return json_response(message, headers=headers)
+
+    async def edit_message(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info['channel_id'])
+        message_id = int(request.match_info['message_id'])
+        limited, headers = await self._limited('edit_message', channel_id)
+        if limited is not None:
+            return limited
+        channel = self.messages.get(channel_id, {})
+        if message_id not in channel:
+            return json_response({'message': 'Unknown Message', 'code': 10008}, status=404, headers=headers)
+        channel[message_id] = self._message(channel_id, message_id, await request.json(), channel[message_id])
+        return json_response(channel[message_id], headers=headers)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/api/v10/users/@me', self.current_user)
+        app.router.add_post('/api/v10/channels/{channel_id}/messages', self.create_message)
+        app.router.add_patch('/api/v10/channels/{channel_id}/messages/{message_id}', self.edit_message)
+        return app
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': dict(self.calls),
+            'rate_limited': dict(self.rate_limited),
+            'channels': len(self.messages),
+            'messages': sum(len(m) for m in self.messages.values()),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--route-limit', type=int, default=5, help='Запросов на канал за окно bucket')
+    parser.add_argument('--route-per', type=float, default=5.0, help='Длина окна bucket канала, с')
+    parser.add_argument('--global-limit', type=int, default=50, help='Глобальный лимит, запросов/с')
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа, с')
+    parser.add_argument('--shared-429-rate', type=float, default=0.0, help='Доля случайных 429 (scope=shared)')
+    args = parser.parse_args()
+    fake = FakeDiscordApi(args.route_limit, args.route_per, args.global_limit, args.latency,
+                          shared_429_rate=args.shared_429_rate)
+    app = fake.make_app()
+
+    async def report(app):
+        print(json.dumps(fake.stats(), ensure_ascii=False))
+
+    app.on_shutdown.append(report)
+    web.run_app(app, host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Загрузка записанных фикстур #log (benchmarks/fixtures/arbys_days*.html).
+
+Общий код для бенчмарка и локальной подмены browse.wf; main_bot не импортирует.
+"""
+import os
+import re
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+ENTRY_RE = re.compile(r'data-timestamp="(\d+)"')
+
+
+def load_fixture(days: int) -> str:
+    """Возвращает HTML с #log за days дней.
+
+    Если записи нужного размера нет, она собирается из 30-дневной: ротация
+    повторяется, поэтому записи сдвигаются целыми окнами по 30 суток.
+    """
+    path = os.path.join(FIXTURES_DIR, f'arbys_days{days}.html')
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+
+    with open(os.path.join(FIXTURES_DIR, 'arbys_days30.html'), encoding='utf-8') as f:
+        base = f.read()
+    head, rest = base.split('<div id="log">', 1)
+    body, tail = rest.split('</div>', 1)
+    lines = [line for line in body.splitlines() if 'data-timestamp' in line]
+    window = 30 * 86400
+    out = []
+    for i in range(days * 24):
+        shift = (i // len(lines)) * window
+        line = lines[i % len(lines)]
+        out.append(ENTRY_RE.sub(lambda m: f'data-timestamp="{int(m.group(1)) + shift}"', line))
+    return f'{head}<div id="log">\n' + '\n'.join(out) + f'\n</div>{tail}'
+
+def rebase_fixture(html: str, now: float) -> str:
+    """Сдвигает фикстуру целыми сутками так, чтобы now попадал на 12-й час лога."""
+    first = int(ENTRY_RE.search(html).group(1))
+    shift = int((now - 12 * 3600 - first) // 86400) * 86400
+    return ENTRY_RE.sub(lambda m: f'data-timestamp="{int(m.group(1)) + shift}"', html)
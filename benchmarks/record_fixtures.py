@@ -0,0 +1,53 @@
+"""Записывает фикстуры блока #log с живого browse.wf для бенчмарков.
+
+Использует тот же BrowserManager и ту же проверку готовности, что и бот.
+Сохраняется только разметка #log, обернутая в минимальную страницу.
+
+Запуск:
+    python benchmarks/record_fixtures.py --days 1 30
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+_TMP_DIR = tempfile.mkdtemp(prefix='arbys-record-')
+os.environ.setdefault('CONFIG_FILE', os.path.join(_TMP_DIR, 'config.json'))
+os.environ.setdefault('STATE_FILE', os.path.join(_TMP_DIR, 'state.json'))
+sys.path.insert(0, REPO_DIR)
+
+import main_bot  # noqa: E402
+
+PAGE_TEMPLATE = (
+    '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Arbitration Schedule</title></head><body>\n'
+    '{log}\n</body></html>\n'
+)
+
+async def record(days: int) -> str:
+    manager = main_bot.BrowserManager(f'https://browse.wf/arbys#days={days}&tz=utc&hourfmt=24')
+    try:
+        page = await manager.load_page()
+        await main_bot.wait_for_log_ready(page)
+        log_html = await page.evaluate("() => document.querySelector('#log').outerHTML")
+    finally:
+        await manager.close()
+    path = os.path.join(FIXTURES_DIR, f'arbys_days{days}.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(PAGE_TEMPLATE.format(log=log_html))
+    return path
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[1, 30])
+    args = parser.parse_args()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for days in args.days:
+        print(f"Записано: {await record(days)}")
+
+if __name__ == '__main__':
+    asyncio.run(main())
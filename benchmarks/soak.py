@@ -0,0 +1,353 @@
+"""Нагрузочный и длительный (soak) прогон конвейера публикации без сети.
+
+Поднимает в одном процессе подмену browse.wf (fake_browsewf.py) и подмену
+REST API Discord (fake_discord.py) и гоняет настоящий конвейер бота:
+parse_warframe_state → update_arbitration_channel → send_or_edit_message
+для N гильдий на протяжении нескольких часов симулированного времени.
+
+Часы бота подменяются: итерации идут по next_update_time, как в
+UpdateScheduler, но без ожидания между ними. Запросы к подменам идут по
+настоящему HTTP — расписание через HttpSource, сообщения через HTTPClient
+discord.py, поэтому обработка лимитов и 429 тоже попадает в замер.
+Окна лимитов подмены Discord идут по настоящим часам, а часы симуляции
+сжаты — лимиты получаются строже, чем в проде, и 429 в отчете это верхняя
+оценка.
+
+Отчет печатается в JSON: p50/p99 задержки обновления, запросы к API в час
+симулированного времени, рост памяти (RSS и, с --tracemalloc, кучи Python).
+
+Запуск:
+    python benchmarks/soak.py --guilds 200 --hours 48 --output soak.json
+    python benchmarks/soak.py --source-failure-rate 0.3 --outage 6:9 --shared-429-rate 0.05
+    python benchmarks/soak.py --hours 168 --max-rss-growth-mb 5   # код 1 при утечке
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+PROFILES = (('ru', 'UTC+3'), ('en', 'UTC'), ('en', 'UTC-5'), ('ru', 'UTC+7'))
+
+# main_bot при импорте читает конфиг и состояние и открывает архив —
+# подсовываем временные файлы, чтобы прогон не трогал рабочие.
+_TMP_DIR = tempfile.mkdtemp(prefix='arbys-soak-')
+for _name, _file in (('CONFIG_FILE', 'config.json'), ('STATE_FILE', 'state.json'),
+                     ('SNAPSHOT_FILE', 'schedule_snapshot.json'), ('ARCHIVE_FILE', 'archive.sqlite3')):
+    os.environ.setdefault(_name, os.path.join(_TMP_DIR, _file))
+sys.path.insert(0, REPO_DIR)
+
+import discord  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+import main_bot  # noqa: E402
+from bench_parse import version_info  # noqa: E402
+from fake_browsewf import FakeBrowseWf, payload_entries  # noqa: E402
+from fake_discord import FakeDiscordApi  # noqa: E402
+from fixture_data import rebase_fixture  # noqa: E402
+
+
+# =================================================================
+# СИМУЛИРОВАННОЕ ВРЕМЯ
+# =================================================================
+
+class SimulatedClock:
+    """Время бота: стоит на месте, пока драйвер не сдвинет его."""
+
+    def __init__(self, start: float):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+class SimulatedTimeModule:
+    """Замена модуля time внутри main_bot: time() и strftime() идут по
+    симуляции, monotonic/perf_counter и остальное — настоящие."""
+
+    def __init__(self, clock: SimulatedClock):
+        self._clock = clock
+
+    def time(self) -> float:
+        return self._clock.now
+
+    def strftime(self, fmt: str, t=None) -> str:
+        return time.strftime(fmt, time.localtime(self._clock.now) if t is None else t)
+
+    def __getattr__(self, name: str):
+        return getattr(time, name)
+
+
+# =================================================================
+# ГИЛЬДИИ И КАНАЛЫ
+# =================================================================
+
+_ids = itertools.count(300_000_000_000_000_000)
+
+def role_payload(role_id: int, name: str, position: int) -> Dict[str, Any]:
+    return {
+        'id': str(role_id), 'name': name, 'permissions': '0', 'position': position,
+        'color': 0, 'hoist': False, 'managed': False, 'mentionable': True, 'flags': 0,
+    }
+
+def add_guilds(client: discord.Client, count: int, node_names: Sequence[str]) -> List[int]:
+    """Заводит гильдии с каналом Арбитражей в кэше discord.py и в CONFIG.
+
+    Каждая вторая гильдия получает роли всех нод — там сообщение несет
+    упоминание и меняется на каждой смене миссии. Профили отрисовки
+    чередуются, чтобы embed строился больше чем для одного профиля.
+    """
+    state = client._connection
+    main_bot.CONFIG['GUILDS'] = {}
+    main_bot.STATE['GUILDS'] = {}
+    guild_ids = []
+    for i in range(count):
+        guild_id, channel_id = next(_ids), next(_ids)
+        roles = [role_payload(guild_id, '@everyone', 0)]
+        if i % 2:
+            roles += [role_payload(next(_ids), name, pos) for pos, name in enumerate(node_names, 1)]
+        state._add_guild_from_data({
+            'id': str(guild_id),
+            'name': f'soak-{i}',
+            'member_count': 1,
+            'roles': roles,
+            'channels': [{'id': str(channel_id), 'type': 0, 'name': f'arbys-{i}', 'position': 0}],
+        })
+        locale, timezone_name = PROFILES[i % len(PROFILES)]
+        main_bot.CONFIG['GUILDS'][str(guild_id)] = {
+            'ARBITRATION_CHANNEL_ID': channel_id, 'LOCALE': locale, 'TIMEZONE': timezone_name,
+        }
+        guild_ids.append(guild_id)
+    return guild_ids
+
+
+# =================================================================
+# ИЗМЕРЕНИЯ
+# =================================================================
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Перцентиль по ближайшему рангу (None для пустой выборки)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered) + 0.5) - 1))]
+
+def distribution(values: Sequence[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50_s": percentile(values, 0.50),
+        "p99_s": percentile(values, 0.99),
+        "max_s": max(values) if values else None,
+    }
+
+def slope_per_hour(points: Sequence[Tuple[float, float]]) -> Optional[float]:
+    """Наклон (в единицах значения на час) по методу наименьших квадратов."""
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+def memory_sample(hour: int, use_tracemalloc: bool) -> Dict[str, Any]:
+    gc.collect()
+    return {
+        "hour": hour,
+        "rss_bytes": main_bot.read_rss_bytes(os.getpid()),
+        "heap_bytes": tracemalloc.get_traced_memory()[0] if use_tracemalloc else None,
+        "gc_objects": len(gc.get_objects()),
+        "message_handles": len(main_bot.MESSAGE_HANDLES),
+        "render_hashes": len(main_bot.RENDER_HASHES),
+        "embed_cache": len(main_bot.EMBED_RENDER_CACHE),
+    }
+
+
+# =================================================================
+# ПРОГОН
+# =================================================================
+
+async def start_app(app: web.Application) -> Tuple[web.AppRunner, int]:
+    """Запускает подмену на свободном порту localhost."""
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner, runner.addresses[0][1]
+
+async def soak(args) -> Dict[str, Any]:
+    clock = SimulatedClock(time.time())
+    main_bot.time = SimulatedTimeModule(clock)
+    started_at = clock.now
+
+    site = FakeBrowseWf(
+        args.days, clock.time, latency=args.source_latency, jitter=args.source_jitter,
+        failure_rate=args.source_failure_rate,
+        outages=[(started_at + a * 3600, started_at + b * 3600) for a, b in args.outage], seed=args.seed,
+    )
+    api = FakeDiscordApi(
+        args.route_limit, args.route_per, args.global_limit, latency=args.discord_latency,
+        jitter=args.discord_jitter, shared_429_rate=args.shared_429_rate, seed=args.seed,
+    )
+    site_runner, site_port = await start_app(site.make_app())
+    api_runner, api_port = await start_app(api.make_app())
+
+    main_bot.SCHEDULE_SOURCE = main_bot.HttpSource(f'http://127.0.0.1:{site_port}/{args.source_path}')
+    discord.http.Route.BASE = f'http://127.0.0.1:{api_port}/api/v10'
+    client = discord.Client(intents=discord.Intents.none())
+    await client._async_setup_hook()
+    client._connection.user = discord.ClientUser(state=client._connection, data=await client.http.static_login('soak'))
+
+    timeline = main_bot.parse_arbitration_entries(payload_entries(rebase_fixture(site.fixture, started_at)))
+    node_names = sorted({m['Node'] for m in timeline})
+    add_guilds(client, args.guilds, node_names)
+
+    publish_latencies: List[float] = []
+    cycle_durations: List[float] = []
+    scrape_durations: List[float] = []
+    scrapes: Counter = Counter()
+    hours: List[Dict[str, Any]] = []
+    memory: List[Dict[str, Any]] = []
+    prev_calls, prev_limited, prev_source = Counter(), Counter(), 0
+    iterations = 0
+
+    def close_hour(hour: int):
+        nonlocal prev_calls, prev_limited, prev_source
+        calls, limited = Counter(api.calls), Counter(api.rate_limited)
+        hours.append({
+            "hour": hour,
+            "api_calls": sum((calls - prev_calls).values()),
+            "create_message": calls["create_message"] - prev_calls["create_message"],
+            "edit_message": calls["edit_message"] - prev_calls["edit_message"],
+            "rate_limited": sum((limited - prev_limited).values()),
+            "source_requests": site.requests - prev_source,
+        })
+        memory.append(memory_sample(hour, args.tracemalloc))
+        prev_calls, prev_limited, prev_source = calls, limited, site.requests
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    wall_started = time.perf_counter()
+    end = started_at + args.hours * 3600
+    hour = 0
+    try:
+        while clock.now < end:
+            now = clock.now
+            while now >= started_at + (hour + 1) * 3600:
+                close_hour(hour)
+                hour += 1
+
+            if main_bot.timeline_needs_refresh(now):
+                scrape_started = time.perf_counter()
+                snapshot = await main_bot.run_scrape_cycle()
+                scrape_durations.append(time.perf_counter() - scrape_started)
+                scrapes["ok" if snapshot is not None else "failed"] += 1
+
+            main_bot.PUBLISH_LATENCIES.clear()
+            cycle_started = time.perf_counter()
+            await main_bot.update_arbitration_channel(client)
+            cycle_durations.append(time.perf_counter() - cycle_started)
+            publish_latencies.extend(main_bot.PUBLISH_LATENCIES.values())
+            iterations += 1
+
+            clock.now = max(main_bot.next_update_time(now), now + 1)
+        while hour < args.hours:
+            close_hour(hour)
+            hour += 1
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        await client.http.close()
+        await main_bot.close_http_session()
+        await site_runner.cleanup()
+        await api_runner.cleanup()
+        main_bot.STATE_STORE.flush()
+        main_bot.ARCHIVE.close()
+
+    # Первый час — прогрев: первые отправки, построение кэшей и индексов ролей
+    steady = memory[1:] if len(memory) > 2 else memory
+    rss_points = [(m["hour"], m["rss_bytes"]) for m in steady]
+    heap_points = [(m["hour"], m["heap_bytes"]) for m in steady if m["heap_bytes"] is not None]
+    api_per_hour = [h["api_calls"] for h in hours]
+    return {
+        "guilds": args.guilds,
+        "simulated_hours": args.hours,
+        "wall_seconds": time.perf_counter() - wall_started,
+        "iterations": iterations,
+        "scrapes": dict(scrapes),
+        "update_latency": distribution(publish_latencies),
+        "update_cycle": distribution(cycle_durations),
+        "scrape": distribution(scrape_durations),
+        "api_calls_per_hour": {
+            "mean": sum(api_per_hour) / len(api_per_hour) if api_per_hour else 0,
+            "max": max(api_per_hour, default=0),
+        },
+        "memory_growth": {
+            "rss_bytes": steady[-1]["rss_bytes"] - steady[0]["rss_bytes"] if steady else 0,
+            "rss_bytes_per_hour": slope_per_hour(rss_points),
+            "heap_bytes_per_hour": slope_per_hour(heap_points),
+            "gc_objects": steady[-1]["gc_objects"] - steady[0]["gc_objects"] if steady else 0,
+        },
+        "fake_discord": api.stats(),
+        "fake_browsewf": {"requests": site.requests, "not_modified": site.not_modified, "failures": site.failures},
+        "hours": hours,
+        "memory": memory,
+    }
+
+def parse_outage(value: str) -> Tuple[float, float]:
+    start, _, end = value.partition(':')
+    return float(start), float(end)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=100)
+    parser.add_argument('--hours', type=int, default=24, help='Длительность в часах симулированного времени')
+    parser.add_argument('--days', type=int, default=30, help='Окно фикстуры browse.wf в сутках')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source-path', default='arbys.json', choices=('arbys.json', 'arbys'))
+    parser.add_argument('--source-latency', type=float, default=0.05, help='Задержка browse.wf, с')
+    parser.add_argument('--source-jitter', type=float, default=0.05)
+    parser.add_argument('--source-failure-rate', type=float, default=0.0, help='Доля ответов 503 от browse.wf')
+    parser.add_argument('--outage', type=parse_outage, action='append', default=[],
+                        help='Окно недоступности browse.wf в часах от начала, например 6:9')
+    parser.add_argument('--discord-latency', type=float, default=0.02, help='Задержка ответа API Discord, с')
+    parser.add_argument('--discord-jitter', type=float, default=0.03)
+    parser.add_argument('--route-limit', type=int, default=5, help='Запросов на канал за окно bucket')
+    parser.add_argument('--route-per', type=float, default=5.0)
+    parser.add_argument('--global-limit', type=int, default=50, help='Глобальный лимит API, запросов/с')
+    parser.add_argument('--shared-429-rate', type=float, default=0.0, help='Доля случайных 429 (scope=shared)')
+    parser.add_argument('--tracemalloc', action='store_true', help='Следить за кучей Python (медленнее)')
+    parser.add_argument('--max-rss-growth-mb', type=float, help='Код 1, если RSS растет быстрее (МБ/час)')
+    parser.add_argument('--output', help='Куда записать JSON (по умолчанию stdout)')
+    parser.add_argument('--quiet', action='store_true', help='Не выводить логи бота')
+    args = parser.parse_args()
+
+    # Логи бота уходят в stderr, чтобы stdout оставался чистым JSON
+    logs = open(os.devnull, 'w') if args.quiet else sys.stderr
+    with contextlib.redirect_stdout(logs):
+        result = asyncio.run(soak(args))
+    report = {"benchmark": "arbys-soak", **version_info(), **result}
+    raw = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(raw + '\n')
+    else:
+        print(raw)
+
+    growth = result["memory_growth"]["rss_bytes_per_hour"]
+    if args.max_rss_growth_mb is not None and growth is not None and growth > args.max_rss_growth_mb * 2**20:
+        print(f"Рост RSS {growth / 2**20:.2f} МБ/час выше порога {args.max_rss_growth_mb} МБ/час", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,51 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import json
 import time
-import threading
+import hashlib
+import logging
+from contextlib import contextmanager
 import re
+import abc
 import asyncio
 import os # <-- ДОБАВЛЕНО ДЛЯ РАБОТЫ С ПЕРЕМЕННЫМИ ОКРУЖЕНИЯ
-from typing import Dict, Any, List, Optional
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError 
-from bs4 import BeautifulSoup, Tag
+import random
+import signal
+import sqlite3
+import sys
+import threading
+import functools
+import itertools
+import math
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from html import unescape
+from urllib.parse import urlsplit
+import aiohttp
+from aiohttp import web
+from typing import Dict, Any, Callable, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+# bs4 нужен только для режима EXTRACTION_MODE=html (разбор полного DOM)
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
 # НОВЫЕ ИМПОРТЫ ДЛЯ РАБОТЫ С ВРЕМЕННЫМИ ЗОНАМИ
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone, timedelta, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Процесс скрапинга (main_bot.py --scrape-worker) отвечает боту JSON-строками
+# в stdout. Канал IPC забирается до первого print при импорте, а весь
+# остальной вывод (в том числе дочерних процессов — драйвера Playwright и
+# Chromium) уходит в stderr.
+SCRAPE_WORKER_MODE = '--scrape-worker' in sys.argv[1:]
+SCRAPE_WORKER_IPC = None
+if SCRAPE_WORKER_MODE:
+    SCRAPE_WORKER_IPC = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
 
 # =================================================================
 # 1. КОНСТАНТЫ И НАСТРОЙКИ
@@ -22,16 +57,122 @@ BOT_TOKEN = os.environ.get('BOT_TOKEN')
 
 # URL для скрапинга. ИЗМЕНЕНИЕ: Форсируем UTC, чтобы время было независимо от хоста.
 URL = 'https://browse.wf/arbys#days=30&tz=utc&hourfmt=24' 
-CONFIG_FILE = 'config.json'
-SCRAPE_INTERVAL_SECONDS = 20  # Скрапинг раз в 5 минут (обновление данных)
-# ИЗМЕНЕНИЕ: Обновляем Discord-сообщение только после нового скрапинга.
-MISSION_UPDATE_INTERVAL_SECONDS = 20 
+CONFIG_FILE = os.environ.get('CONFIG_FILE', 'config.json')  # Статические настройки (каналы, роли)
+STATE_FILE = os.environ.get('STATE_FILE', 'state.json')     # Горячее состояние (ID сообщений, последняя нода)
+# Снимок последнего разобранного расписания для «теплого» старта после перезапуска
+SNAPSHOT_FILE = os.environ.get('SNAPSHOT_FILE', 'schedule_snapshot.json')
+SNAPSHOT_FORMAT_VERSION = 2  # 2: типы миссий и фракции хранятся без перевода
+# История всех увиденных ротаций (SQLite) для команды !stats
+ARCHIVE_FILE = os.environ.get('ARCHIVE_FILE', 'arbys_archive.sqlite3')
+ARCHIVE_BATCH_SIZE = 500  # Строк в одном executemany
+ARCHIVE_STATS_TOP = 10  # Сколько нод показывать в общей статистике тиров
+# Локальный эндпоинт метрик Prometheus; выключен, если METRICS_PORT не задан
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))
+PUBLISH_CONCURRENCY = 10  # Сколько каналов обновляется одновременно
+DISCORD_GLOBAL_RATE_PER_SECOND = 40  # Запас до глобального лимита Discord (50/с)
+CONFIG_FLUSH_DELAY_SECONDS = 2  # Окно, за которое изменения сливаются в одну запись
+# Ключи прошлых версий бота, которые больше нигде не используются
+STALE_CONFIG_KEYS = ('LAST_MESSAGE_IDS', 'LAST_NORMAL_MESSAGE_ID', 'LAST_STEEL_MESSAGE_ID')
+# Обновление канала привязано к границам миссий (старт/конец, раз в час):
+# таймеры в embed рисует сам Discord (<t:..:R>), между границами править нечего.
+UPDATE_BOUNDARY_LAG_SECONDS = 1  # Просыпаемся чуть позже границы, чтобы она точно наступила
+UPDATE_SAFETY_INTERVAL_SECONDS = 15 * 60  # Страховочное обновление, даже если границ нет
+UPDATE_RECHECK_SECONDS = 60  # Пока кэш ждет скрапинга, цикл перепроверяет его раз в минуту
+# Политика обновления кэша 30-дневного расписания: страница детерминирована,
+# поэтому перескрапливаем ее редко — раз в несколько часов. Когда оставшийся
+# горизонт короче TIMELINE_MIN_HORIZON, интервал сжимается пропорционально
+# (но не чаще SCRAPE_MIN_INTERVAL).
+TIMELINE_REFRESH_INTERVAL_SECONDS = int(os.environ.get('TIMELINE_REFRESH_HOURS', 6)) * 3600
+TIMELINE_MIN_HORIZON_SECONDS = int(os.environ.get('TIMELINE_MIN_HORIZON_HOURS', 72)) * 3600
+SCRAPE_MIN_INTERVAL_SECONDS = 10 * 60
+# Неудачные скрапинги: экспоненциальная пауза с джиттером, после
+# SCRAPE_CIRCUIT_THRESHOLD неудач подряд источник «отключается» на
+# SCRAPE_CIRCUIT_COOLDOWN; затем одна пробная попытка решает, закрыть ли цепь.
+SCRAPE_BACKOFF_BASE_SECONDS = 30
+SCRAPE_BACKOFF_MAX_SECONDS = 30 * 60
+SCRAPE_CIRCUIT_THRESHOLD = 5
+SCRAPE_CIRCUIT_COOLDOWN_SECONDS = 60 * 60
+# Старше этого кэш показывается с пометкой о недоступности источника
+SCRAPE_STALE_AFTER_SECONDS = 2 * TIMELINE_REFRESH_INTERVAL_SECONDS
 MAX_UPCOMING_FIELD_LENGTH = 950 
+UPCOMING_CACHE_LIMIT = 20  # Сколько ближайших миссий отдавать в Upcoming
+HIGHLIGHT_TIERS = ["S", "A", "B"]  # Тиры для блока «Выделенные тиры»
+MISSION_DURATION_SECONDS = 3600  # Каждый Арбитраж длится ровно час
+# Команда поиска по расписанию (!arbys / /arbys)
+QUERY_PAGE_SIZE = 10  # Миссий на одной странице результата
+QUERY_CACHE_LIMIT = 128  # Сколько отрисованных результатов держать в LRU
+QUERY_VIEW_TIMEOUT_SECONDS = 300  # Сколько живут кнопки листания
+# Подписки на уведомления (!subscribe)
+NOTIFY_DEFAULT_LEAD_MINUTES = 5  # За сколько минут до старта уведомлять по умолчанию
+NOTIFY_MAX_LEAD_MINUTES = 120
+NOTIFY_MAX_ATTEMPTS = 3  # Попыток доставки одного сообщения из очереди
+# Отображение по умолчанию; гильдия может выбрать свое (!set_timezone, !set_language).
+# Пояс — смещение вида UTC+3 или имя IANA (Europe/Berlin).
+DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE', 'UTC+3')
+DEFAULT_LOCALE = os.environ.get('DEFAULT_LOCALE', 'ru')
+EMBED_CACHE_LIMIT = 64  # Отрисованных embed канала (версия расписания × профиль) в памяти
+BROWSER_DEFAULT_TIMEOUT_MS = 60000
+# Через сколько обновлений пересоздавать вкладку (браузер при этом не перезапускается)
+BROWSER_MAX_PAGE_USES = 500
+# Фильтрация сети в браузере: для заполнения #log нужны только документ,
+# скрипты и XHR/fetch самого browse.wf; картинки, шрифты, стили и сторонняя
+# аналитика обрываются еще до загрузки.
+BROWSER_ALLOWED_RESOURCE_TYPES = {"document", "script", "xhr", "fetch"}
+BROWSER_ALLOWED_HOSTS = tuple(
+    host.strip() for host in os.environ.get('BROWSER_ALLOWED_HOSTS', 'browse.wf').split(',') if host.strip()
+)
+# Готовность страницы: число записей в #log перестало меняться LOG_STABLE_POLLS
+# проверок подряд (вместо фиксированной паузы в 1.5с).
+LOG_POLL_INTERVAL_MS = 250
+LOG_STABLE_POLLS = 2
+# Режим извлечения данных: 'script' — JS внутри страницы возвращает только
+# записи #log; 'html' — старый путь page.content() + BeautifulSoup.
+EXTRACTION_MODE = os.environ.get('EXTRACTION_MODE', 'script')
+# Жесткий предел на один скрапинг целиком (запуск браузера + загрузка + парсинг)
+SCRAPE_TIMEOUT_SECONDS = 90
+# Источник данных: 'browser' — Chromium через Playwright; 'http' — прямой запрос
+# к HTTP_SOURCE_URL без браузера (с откатом на Playwright при ошибке).
+# HTTP_SOURCE_URL должен отдавать JSON-массив пар [timestamp, text] или HTML
+# с элементами data-timestamp (как в блоке #log).
+HTTP_SOURCE_URL = os.environ.get('HTTP_SOURCE_URL')
+SCRAPE_SOURCE = os.environ.get('SCRAPE_SOURCE', 'http' if HTTP_SOURCE_URL else 'browser')
+HTTP_SOURCE_TIMEOUT_SECONDS = 30
+HTTP_POOL_SIZE = 4  # Соединений в пуле keep-alive
+HTTP_KEEPALIVE_SECONDS = 300
+# Скрапинг в дочернем процессе (main_bot.py --scrape-worker): Chromium и
+# источник данных живут там, бот получает только записи #log по JSON-строкам
+# через stdin/stdout. Процесс перезапускается по пульсу, RSS, времени
+# скрапинга и после SCRAPE_WORKER_MAX_SCRAPES скрапингов.
+SCRAPE_WORKER = os.environ.get('SCRAPE_WORKER', '1') != '0'
+SCRAPE_WORKER_WALL_SECONDS = SCRAPE_TIMEOUT_SECONDS - 10  # Чуть меньше общего таймаута скрапинга
+SCRAPE_WORKER_HEARTBEAT_SECONDS = 5
+SCRAPE_WORKER_HEARTBEAT_TIMEOUT_SECONDS = 30  # Без пульса дольше — event loop воркера завис
+SCRAPE_WORKER_MAX_SCRAPES = int(os.environ.get('SCRAPE_WORKER_MAX_SCRAPES', 50))
+SCRAPE_WORKER_RECYCLE_MB = int(os.environ.get('SCRAPE_WORKER_RECYCLE_MB', 512))  # Плановый перезапуск между скрапингами
+SCRAPE_WORKER_MAX_RSS_MB = int(os.environ.get('SCRAPE_WORKER_MAX_RSS_MB', 1024))  # Жесткий предел: убиваем сразу
+SCRAPE_WORKER_STOP_SECONDS = 10  # Сколько ждать штатного выхода перед SIGKILL
+SCRAPE_WORKER_IPC_LIMIT = 16 * 2**20  # Предел одной строки IPC (ответ с записями за год)
+# Ленты в отдельные каналы (трещины, Стальной Путь, каскады): JSON-API мира
+# игры, общий HTTP-пул с источником расписания, у каждой ленты свой интервал.
+FEEDS_API_URL = os.environ.get('FEEDS_API_URL', 'https://api.warframestat.us/pc').rstrip('/')
+FISSURE_REFRESH_SECONDS = 2 * 60
+STEEL_PATH_REFRESH_SECONDS = 30 * 60
+FEED_RETRY_SECONDS = 5 * 60  # Повтор после ошибки запроса (последние данные остаются в канале)
+FEED_FIELD_LENGTH = 950  # Запас до лимита поля embed (1024)
 
 # --- ГЛОБАЛЬНОЕ СОСТОЯНИЕ ---
-CURRENT_MISSION_STATE = {"ArbitrationSchedule": {}}
-LAST_SCRAPE_TIME = 0 
+# Кэш: опубликованный снимок расписания (создается ниже, после ScheduleStore).
+# Меняется только присваиванием новой ссылки в publish_schedule.
+CURRENT_SCHEDULE: "ScheduleSnapshot"
 CONFIG: Dict[str, Any] = {}
+STATE: Dict[str, Any] = {}
+
+# --- СОГЛАШЕНИЕ ОБ ИМЕНАХ РОЛЕЙ НОД ---
+# Роль ноды может называться "Casta", "Арби Casta", "arby-casta" или "Casta (Ceres)".
+ROLE_NAME_PREFIX_RE = re.compile(r'^\s*(?:arbitrations?|arbitrage|arbys?|арбитражи?|арби)\b[\s:_\-–—|]*', re.IGNORECASE)
+ROLE_PLANET_SUFFIX_RE = re.compile(r'\s*\(.*\)\s*$')
+NON_ALNUM_RE = re.compile(r'[\W_]+')
 
 # --- КОНСТАНТЫ ЦВЕТОВ ТИРОВ ---
 TIER_COLORS = {
@@ -41,10 +182,12 @@ TIER_COLORS = {
 FALLBACK_COLOR = 0xAAAAAA
 
 # --- КОНСТАНТЫ СТИЛИЗАЦИИ И ЭМОДЗИ ---
+# Фракции в расписании хранятся кодами; названия для показа — в LOCALES
+FACTIONS = ("Grineer", "Corpus", "Infested", "Orokin", "Murmur")
 EMOJI_NAMES = {
     # Фракции
-    "Гринир": "gren", "Корпус": "corp", "Зараженные": "infest", 
-    "Орокин": "orokin", "Шёпот": "murmur",
+    "Grineer": "gren", "Corpus": "corp", "Infested": "infest", 
+    "Orokin": "orokin", "Murmur": "murmur",
     # Тиры
     "S": "S_", "A": "A_", "B": "B_", "C": "C_", "D": "D_", "F": "F_",
     # Новые (для шапки)
@@ -56,6 +199,7 @@ RESOLVED_EMOJIS: Dict[str, str] = {}
 FACTION_EMOJIS_FINAL: Dict[str, str] = {} 
 TIER_EMOJIS_FINAL: Dict[str, str] = {}
 FALLBACK_EMOJI = "❓" 
+EMOJI_SET_VERSION = 0  # Растет при каждом resolve_custom_emojis (входит в ключ кэша embed)
 
 # Новые ключи для удобства
 KUVA_EMOJI_KEY = "КУВА"
@@ -63,11 +207,11 @@ VITUS_EMOJI_KEY = "ВИТУС"
 
 # --- КОНСТАНТЫ ФРАКЦИОННЫХ ИЗОБРАЖЕНИЙ (ДЛЯ ТАЙЛСЕТА) ---
 FACTION_IMAGE_URLS = {
-    "Зараженные": "https://images-ext-1.discordapp.net/external/9_z1utcRwJxSSw4n6ebRLAzqynWnAJAVJDphsjyrg9E/https/assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Infested.png?format=webp&quality=lossless",
-    "Гринир": "https://images-ext-1.discordapp.net/external/Wmh0isPGDXG8s1_xJKjSW_F6CHl6aBQXoRIINUdvm0g/https/assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Grineer.png?format=webp&quality=lossless",
-    "Корпус": "https://images-ext-1.discordapp.net/external/BUNqoLvclDjqa3OUzE04XI4E1nXvU8qR9f_IIb5AP7o/https/assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Corpus.png?format=webp&quality=lossless",
-    "Орокин": "https://assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Corrupted.png",
-    "Шёпот": "https://i.imgur.com/gK2oQ9Z.png"
+    "Infested": "https://images-ext-1.discordapp.net/external/9_z1utcRwJxSSw4n6ebRLAzqynWnAJAVJDphsjyrg9E/https/assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Infested.png?format=webp&quality=lossless",
+    "Grineer": "https://images-ext-1.discordapp.net/external/Wmh0isPGDXG8s1_xJKjSW_F6CHl6aBQXoRIINUdvm0g/https/assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Grineer.png?format=webp&quality=lossless",
+    "Corpus": "https://images-ext-1.discordapp.net/external/BUNqoLvclDjqa3OUzE04XI4E1nXvU8qR9f_IIb5AP7o/https/assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Corpus.png?format=webp&quality=lossless",
+    "Orokin": "https://assets.empx.cc/Lotus/Interface/Graphics/WorldStatePanel/Corrupted.png",
+    "Murmur": "https://i.imgur.com/gK2oQ9Z.png"
 }
 
 # --- ПОЛНАЯ РУСИФИКАЦИЯ ТИПОВ МИССИЙ ---
@@ -82,56 +226,402 @@ MISSION_TYPE_TRANSLATIONS = {
     "Defection": "Перебежчики", 
     "Unknown Mission": "Неизвестный тип"
 }
+# Сокращения, которые встречаются в логе; в расписании хранится полное имя
+MISSION_TYPE_ALIASES = {"MD": "Mobile Defense", "Def": "Defense"}
+
+# --- ЯЗЫКИ ОТОБРАЖЕНИЯ ---
+LOCALES: Dict[str, Dict[str, Any]] = {
+    "ru": {
+        "title": "РАСПИСАНИЕ АРБИТРАЖЕЙ",
+        "current": "ТЕКУЩИЙ АРБИТРАЖ", "next": "СЛЕДУЮЩИЙ АРБИТРАЖ", "tier": "Тир",
+        "ends": "завершится {timer}", "starts": "начнется {timer}",
+        "location": "Локация", "enemy": "Враг", "bonus": "Бонус", "time": "Время",
+        "no_schedule": "**Актуальное расписание миссий не найдено.**\nПожалуйста, подождите следующего скрапинга. (Тир: N/A)",
+        "upcoming_header": "— — — БЛИЖАЙШИЕ 5 МИССИЙ — — —",
+        "no_upcoming": "Нет данных о грядущих миссиях.",
+        "highlight_header": "— — — ВЫДЕЛЕННЫЕ ТИРЫ — — —",
+        "highlight_name": "Ближайший {tier} Тир",
+        "not_scheduled": "Нет в расписании.",
+        "footer": "Данные: browse.wf/arbys | Время: {tz}",
+        "stale": "⚠️ browse.wf недоступен — расписание по данным от {when}.",
+        "query_title": "🔎 Арбитражи ({label})", "query_all": "все миссии",
+        "query_empty": "Подходящих миссий в расписании нет.",
+        "query_footer": "Страница {page}/{pages} • Найдено: {found} | Время: {tz}",
+        "notify_title": "🔔 Арбитражи по подписке",
+        "notify_footer": "Управление: !subscriptions | Время: {tz}",
+        "fissures_title": "РАЗРЫВЫ БЕЗДНЫ", "fissures_empty": "Активных разрывов нет.",
+        "cascades_title": "КАСКАДЫ БЕЗДНЫ", "cascades_empty": "Сейчас каскадов нет.",
+        "steel_path_title": "СТАЛЬНОЙ ПУТЬ", "steel_path_reward": "Награда Тешина",
+        "steel_path_cost": "{cost} стальных эссенций", "steel_path_next": "Следующая награда",
+        "steel_path_rotation": "Смена {timer}", "steel_path_mark": "СП",
+        "expires": "до {timer}",
+        "feed_footer": "Данные: warframestat.us",
+        "stats_tiers_title": "📊 Тиры по нодам (больше всего S)", "stats_tiers_node": "📊 Тиры: {node}",
+        "stats_gaps_title": "⏱️ Интервалы между миссиями {tier} тира",
+        "stats_gaps_body": (
+            "Миссий в архиве: **{count}**\nСредний интервал: **{mean:.1f} ч**\n"
+            "Медиана: **{median:.1f} ч**\nМин / макс: **{min:.0f} ч / {max:.0f} ч**"
+        ),
+        "stats_factions_title": "⚔️ Фракции с {since}",
+        "stats_empty": "В архиве пока нет подходящих данных.",
+        "stats_footer": "Архив: {count} миссий, {first} — {last}",
+        "filters": {"tier": "Тир", "type": "Тип", "faction": "Враг", "node": "Нода", "planet": "Планета", "bonus": "Бонус"},
+        "timezones": {"UTC+3": "МСК (UTC+3)"},
+        "factions": {"Grineer": "Гринир", "Corpus": "Корпус", "Infested": "Зараженные", "Orokin": "Орокин", "Murmur": "Шёпот"},
+        "mission_types": MISSION_TYPE_TRANSLATIONS,
+    },
+    "en": {
+        "title": "ARBITRATION SCHEDULE",
+        "current": "CURRENT ARBITRATION", "next": "NEXT ARBITRATION", "tier": "Tier",
+        "ends": "ends {timer}", "starts": "starts {timer}",
+        "location": "Location", "enemy": "Enemy", "bonus": "Bonus", "time": "Time",
+        "no_schedule": "**No current mission schedule found.**\nPlease wait for the next scrape. (Tier: N/A)",
+        "upcoming_header": "— — — NEXT 5 MISSIONS — — —",
+        "no_upcoming": "No upcoming missions.",
+        "highlight_header": "— — — HIGHLIGHTED TIERS — — —",
+        "highlight_name": "Next {tier} Tier",
+        "not_scheduled": "Not in the schedule.",
+        "footer": "Data: browse.wf/arbys | Time: {tz}",
+        "stale": "⚠️ browse.wf is unavailable — schedule as of {when}.",
+        "query_title": "🔎 Arbitrations ({label})", "query_all": "all missions",
+        "query_empty": "No matching missions in the schedule.",
+        "query_footer": "Page {page}/{pages} • Found: {found} | Time: {tz}",
+        "notify_title": "🔔 Subscribed arbitrations",
+        "notify_footer": "Manage: !subscriptions | Time: {tz}",
+        "fissures_title": "VOID FISSURES", "fissures_empty": "No active fissures.",
+        "cascades_title": "VOID CASCADES", "cascades_empty": "No cascades right now.",
+        "steel_path_title": "STEEL PATH", "steel_path_reward": "Teshin's reward",
+        "steel_path_cost": "{cost} Steel Essence", "steel_path_next": "Next reward",
+        "steel_path_rotation": "Rotates {timer}", "steel_path_mark": "SP",
+        "expires": "until {timer}",
+        "feed_footer": "Data: warframestat.us",
+        "stats_tiers_title": "📊 Tiers by node (most S first)", "stats_tiers_node": "📊 Tiers: {node}",
+        "stats_gaps_title": "⏱️ Gaps between {tier} tier missions",
+        "stats_gaps_body": (
+            "Missions archived: **{count}**\nAverage gap: **{mean:.1f} h**\n"
+            "Median: **{median:.1f} h**\nMin / max: **{min:.0f} h / {max:.0f} h**"
+        ),
+        "stats_factions_title": "⚔️ Factions since {since}",
+        "stats_empty": "No matching data in the archive yet.",
+        "stats_footer": "Archive: {count} missions, {first} — {last}",
+        "filters": {"tier": "Tier", "type": "Type", "faction": "Enemy", "node": "Node", "planet": "Planet", "bonus": "Bonus"},
+        "timezones": {},
+        "factions": {},
+        "mission_types": {},
+    },
+}
 
 
 # =================================================================
 # 2. УТИЛИТЫ И КОНФИГУРАЦИЯ
 # =================================================================
 
+class JsonStore:
+    """JSON-файл, который держится в памяти и сохраняется «пачками».
+
+    Изменения только помечают хранилище грязным; запись происходит в фоне не
+    чаще раза в CONFIG_FLUSH_DELAY_SECONDS (все изменения за это окно
+    сливаются в одну запись). Файл пишется атомарно: во временный файл,
+    fsync и os.replace, поэтому падение посреди записи не портит данные.
+    """
+
+    def __init__(self, path: str, data: Dict[str, Any], indent: Optional[int] = 4):
+        self.path = path
+        self.data = data
+        self.indent = indent
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        # Отмена _flush_task не останавливает запись в потоке: замок не дает
+        # двум записям делить .tmp, а номер снимка — затереть новые данные старыми
+        self._write_lock = threading.Lock()
+        self._generation = 0
+        self._saved_generation = 0
+
+    def load(self) -> bool:
+        """Читает файл в память. Возвращает False, если файла нет или он битый."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+            return True
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+    def mark_dirty(self):
+        """Помечает данные измененными и планирует фоновое сохранение."""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Вне event loop (загрузка при импорте) пишем сразу
+            self.flush()
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # Изменения, пришедшие во время записи, подхватит следующий виток цикла
+        while self._dirty:
+            await asyncio.sleep(CONFIG_FLUSH_DELAY_SECONDS)
+            raw, generation = self._serialize()
+            try:
+                await asyncio.to_thread(self._save, raw, generation)
+            except OSError as e:
+                self._dirty = True
+                print(f"[{time.strftime('%H:%M:%S')}] 🚨 Не удалось сохранить {self.path}: {e}")
+
+    def _serialize(self) -> Tuple[str, int]:
+        self._dirty = False
+        self._generation += 1
+        return json.dumps(self.data, indent=self.indent, ensure_ascii=False), self._generation
+
+    def _save(self, raw: str, generation: int):
+        """Пишет снимок под замком; снимок старше уже записанного пропускает."""
+        with self._write_lock:
+            if generation <= self._saved_generation:
+                return
+            self._write(raw)
+            self._saved_generation = generation
+
+    def _write(self, raw: str):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def flush(self):
+        """Синхронно сохраняет несохраненные изменения (при старте и остановке)."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        if self._dirty:
+            # Если фоновая запись еще идет в потоке, дождется ее на замке
+            self._save(*self._serialize())
+
+
+SETTINGS_STORE = JsonStore(CONFIG_FILE, CONFIG)
+STATE_STORE = JsonStore(STATE_FILE, STATE)
+SNAPSHOT_STORE = JsonStore(SNAPSHOT_FILE, {}, indent=None)
+
 def save_config():
-    """Сохраняет настройки в файл JSON."""
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(CONFIG, f, indent=4)
+    """Помечает статические настройки (config.json) к сохранению."""
+    SETTINGS_STORE.mark_dirty()
+
+def save_state():
+    """Помечает горячее состояние бота (state.json) к сохранению."""
+    STATE_STORE.mark_dirty()
 
 def load_config():
-    """Загружает настройки из файла JSON."""
+    """Загружает настройки и состояние, переносит старые ключи из config.json."""
     DEFAULT_CONFIG = {
-        "ARBITRATION_CHANNEL_ID": None, 
-        'LAST_ARBITRATION_MESSAGE_ID': None,
-        'LAST_MENTIONED_NODE': None # Отслеживание последней упомянутой ноды
+        "GUILDS": {},  # guild_id -> {"ARBITRATION_CHANNEL_ID": ..., "FISSURE_CHANNEL_ID": ..., ...}
     } 
-    global CONFIG
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            loaded_config = json.load(f)
-            CONFIG.update(loaded_config)
-    except (FileNotFoundError, json.JSONDecodeError):
-        pass
+    DEFAULT_STATE = {
+        "GUILDS": {},  # guild_id -> {"ARBITRATION_MESSAGE_ID": ..., "LAST_MENTIONED_NODE": ..., "NOTIFIED": {...}}
+        "OUTBOX": {},  # "user:ID" / "channel:ID" -> неотправленные уведомления по подпискам
+    }
+    SETTINGS_STORE.load()
+    STATE_STORE.load()
+    settings_changed = state_changed = False
+    
+    # Горячее состояние раньше жило в config.json — переносим его в state.json
+    # (в настройки гильдии его разнесет migrate_legacy_arbitration_channel)
+    for key in ('LAST_ARBITRATION_MESSAGE_ID', 'LAST_MENTIONED_NODE'):
+        if key in CONFIG:
+            value = CONFIG.pop(key)
+            if STATE.get(key) is None:
+                STATE[key] = value
+            settings_changed = state_changed = True
+    
+    # Выбрасываем устаревшие ключи прошлых версий бота
+    for key in list(CONFIG):
+        if key in STALE_CONFIG_KEYS or key.startswith('LAST_MESSAGE_ID_'):
+            del CONFIG[key]
+            settings_changed = True
     
     for key, default_value in DEFAULT_CONFIG.items():
         if key not in CONFIG:
             CONFIG[key] = default_value
+            settings_changed = True
+    for key, default_value in DEFAULT_STATE.items():
+        if key not in STATE:
+            STATE[key] = default_value
+            state_changed = True
 
-    save_config()
+    if settings_changed: save_config()
+    if state_changed: save_state()
+
+# --- МЕТРИКИ (формат Prometheus, без внешних зависимостей) ---
+
+METRIC_HELP = {
+    "arbys_stage_duration_seconds": ("histogram", "Длительность этапов скрапинга и обновления канала."),
+    "arbys_scrapes_total": ("counter", "Скрапинги по результату (ok, not_modified, empty, timeout, error)."),
+    "arbys_source_fallbacks_total": ("counter", "Откаты с основного источника данных на запасной."),
+    "arbys_discord_messages_total": ("counter", "Обработка сообщений Discord по результату (edited, sent, skipped, failed)."),
+    "arbys_discord_rate_limited_total": ("counter", "Ответы Discord 429 (rate limit)."),
+    "arbys_query_cache_total": ("counter", "Запросы к расписанию по результату кэша отрисовки (hit, miss)."),
+    "arbys_stats_cache_total": ("counter", "Запросы статистики архива по результату кэша (hit, miss)."),
+    "arbys_notifications_total": ("counter", "Доставка уведомлений по подпискам (sent, dropped, retry)."),
+    "arbys_feed_fetches_total": ("counter", "Запросы данных лент по пути и результату (ok, not_modified, error)."),
+    "arbys_update_wakeups_total": ("counter", "Пробуждения планировщика обновлений по причине (timer, schedule_changed, scrape_failed)."),
+    "arbys_process_rss_bytes": ("gauge", "RSS процесса бота."),
+    "arbys_browser_rss_bytes": ("gauge", "Суммарный RSS дочерних процессов (процесс скрапинга, драйвер Playwright и Chromium)."),
+    "arbys_scrape_worker_rss_bytes": ("gauge", "RSS процесса скрапинга вместе с его потомками."),
+    "arbys_scrape_worker_starts_total": ("counter", "Запуски процесса скрапинга."),
+    "arbys_scrape_worker_stops_total": ("counter", "Остановки процесса скрапинга по причине (recycle_scrapes, recycle_rss, rss_limit, heartbeat, wall_time, exited, shutdown)."),
+    "arbys_last_scrape_timestamp_seconds": ("gauge", "Время последнего успешного скрапинга (UNIX)."),
+    "arbys_schedule_version": ("gauge", "Версия опубликованного расписания (растет при смене содержимого)."),
+    "arbys_scrape_consecutive_failures": ("gauge", "Неудачных скрапингов подряд."),
+    "arbys_scrape_circuit_open": ("gauge", "1, пока цепь скрапинга разомкнута и попытки не делаются."),
+}
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Metrics:
+    """Реестр счетчиков, гистограмм и гейджей с выводом в текстовом формате Prometheus."""
 
-def set_current_state(data, scrape_time):
-    """Обновляет текущее состояние миссий и время скрапинга."""
-    global CURRENT_MISSION_STATE, LAST_SCRAPE_TIME
-    CURRENT_MISSION_STATE.update(data)
-    LAST_SCRAPE_TIME = scrape_time
+    def __init__(self):
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, List[float]]] = {}
+        self._gauges: Dict[str, Any] = {}
 
-load_config()
+    def inc(self, name: str, amount: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        # Накопительные корзины + сумма + количество
+        state = series.setdefault(key, [0] * len(METRIC_BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(METRIC_BUCKETS):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def gauge(self, name: str, collect):
+        """Регистрирует гейдж; collect() вызывается в момент отдачи метрик."""
+        self._gauges[name] = collect
+
+    @contextmanager
+    def span(self, stage: str):
+        """Замеряет длительность этапа (работает и вокруг await)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("arbys_stage_duration_seconds", time.perf_counter() - started, stage=stage)
+
+    @staticmethod
+    def _labels(key: tuple, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in key]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        lines = []
+        def header(name):
+            kind, text = METRIC_HELP.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+        for name, series in self._counters.items():
+            header(name)
+            for key, value in series.items():
+                lines.append(f"{name}{self._labels(key)} {value}")
+        for name, series in self._histograms.items():
+            header(name)
+            for key, state in series.items():
+                for i, bound in enumerate(METRIC_BUCKETS):
+                    bucket_labels = self._labels(key, 'le="%s"' % bound)
+                    lines.append(f"{name}_bucket{bucket_labels} {state[i]}")
+                inf_labels = self._labels(key, 'le="+Inf"')
+                lines.append(f"{name}_bucket{inf_labels} {state[-1]}")
+                lines.append(f"{name}_sum{self._labels(key)} {state[-2]}")
+                lines.append(f"{name}_count{self._labels(key)} {state[-1]}")
+        for name, collect in self._gauges.items():
+            header(name)
+            try:
+                lines.append(f"{name} {collect()}")
+            except Exception:
+                pass
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+def read_rss_bytes(pid: int) -> int:
+    """RSS процесса из /proc (0, если процесс недоступен или это не Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+def descendant_pids(pid: int) -> List[int]:
+    """Все потомки процесса по /proc/<pid>/task/*/children."""
+    result, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            tasks_dir = f"/proc/{current}/task"
+            for tid in os.listdir(tasks_dir):
+                with open(f"{tasks_dir}/{tid}/children") as f:
+                    children = [int(child) for child in f.read().split()]
+                result.extend(children)
+                stack.extend(children)
+        except (OSError, ValueError):
+            continue
+    return result
+
+METRICS.gauge("arbys_process_rss_bytes", lambda: read_rss_bytes(os.getpid()))
+METRICS.gauge("arbys_browser_rss_bytes", lambda: sum(read_rss_bytes(p) for p in descendant_pids(os.getpid())))
+METRICS.gauge("arbys_last_scrape_timestamp_seconds", lambda: CURRENT_SCHEDULE.scraped_at)
+METRICS.gauge("arbys_schedule_version", lambda: CURRENT_SCHEDULE.version)
+
+class RateLimitLogCounter(logging.Handler):
+    """Считает 429: discord.py обрабатывает их сам и сообщает только в лог."""
+
+    def emit(self, record: logging.LogRecord):
+        if "rate limit" in record.getMessage().lower():
+            METRICS.inc("arbys_discord_rate_limited_total")
+
+logging.getLogger("discord.http").addHandler(RateLimitLogCounter(level=logging.WARNING))
+
+async def start_metrics_server() -> Optional[web.AppRunner]:
+    """Поднимает локальный HTTP /metrics, если задан METRICS_PORT."""
+    if not METRICS_PORT:
+        return None
+
+    async def handle_metrics(request):
+        return web.Response(text=METRICS.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    print(f"Метрики доступны на http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
+
+# Воркеру скрапинга не нужны ни настройки гильдий, ни состояние бота
+if not SCRAPE_WORKER_MODE:
+    load_config()
 
 def normalize_faction_name(race_name: str, location: str) -> str:
-    """Унифицирует имя фракции/тайлсета."""
+    """Унифицирует имя фракции/тайлсета в код из FACTIONS (или 'N/A')."""
     norm_location = location.lower()
-    norm_race = (race_name or '').lower()
+    norm_race = (race_name or '').lower().replace('ё', 'е')
     
     if 'гринир' in norm_race or 'grineer' in norm_race:
-        return 'Гринир'
+        return 'Grineer'
     
     if 'корпус' in norm_race or 'corpus' in norm_race:
-        return 'Корпус'
+        return 'Corpus'
         
     infestation_keywords = [
         'зараженные', 'infested', 'заражение', 'infest', 'инфест', 
@@ -140,13 +630,13 @@ def normalize_faction_name(race_name: str, location: str) -> str:
     ]
     if any(keyword in norm_race for keyword in infestation_keywords) or \
        any(keyword in norm_location for keyword in infestation_keywords): 
-        return 'Зараженные'
+        return 'Infested'
     
-    if 'орокин' in norm_race or 'corrupted' in norm_race or 'void' in norm_location or 'бездна' in norm_location:
-        return 'Орокин'
+    if 'орокин' in norm_race or 'orokin' in norm_race or 'corrupted' in norm_race or 'void' in norm_location or 'бездна' in norm_location:
+        return 'Orokin'
 
     if 'шепот' in norm_race or 'murmur' in norm_race:
-        return 'Шёпот'
+        return 'Murmur'
         
     return 'N/A' 
 
@@ -156,7 +646,7 @@ def get_faction_image_url(faction_name: str) -> Optional[str]:
 
 def resolve_custom_emojis(bot: commands.Bot):
     """Находит все пользовательские эмодзи и сохраняет их."""
-    global RESOLVED_EMOJIS, FACTION_EMOJIS_FINAL, TIER_EMOJIS_FINAL, FALLBACK_EMOJI
+    global RESOLVED_EMOJIS, FACTION_EMOJIS_FINAL, TIER_EMOJIS_FINAL, FALLBACK_EMOJI, EMOJI_SET_VERSION
     
     print("Начало поиска эмодзи...")
     
@@ -169,12 +659,12 @@ def resolve_custom_emojis(bot: commands.Bot):
             RESOLVED_EMOJIS[emoji_name] = f"❓{key_name}❓" 
 
     # 2. Определяем фоллбэк
-    orokin_emoji_name = EMOJI_NAMES.get("Орокин")
+    orokin_emoji_name = EMOJI_NAMES.get("Orokin")
     orokin_emoji = RESOLVED_EMOJIS.get(orokin_emoji_name, "❓")
     FALLBACK_EMOJI = orokin_emoji if not orokin_emoji.startswith("❓") else "❓"
     
     # 3. Заполняем финальный словарь фракций
-    for key in ["Гринир", "Корпус", "Зараженные", "Орокин", "Шёпот"]:
+    for key in FACTIONS:
         emoji_name = EMOJI_NAMES.get(key)
         final_emoji = RESOLVED_EMOJIS.get(emoji_name, FALLBACK_EMOJI)
         FACTION_EMOJIS_FINAL[key] = final_emoji if not final_emoji.startswith("❓") else FALLBACK_EMOJI
@@ -185,42 +675,63 @@ def resolve_custom_emojis(bot: commands.Bot):
         final_emoji = RESOLVED_EMOJIS.get(emoji_name, tier) 
         TIER_EMOJIS_FINAL[tier] = final_emoji if not final_emoji.startswith("❓") else tier
     
+    EMOJI_SET_VERSION += 1
     print("Поиск эмодзи завершен.")
 
 # =================================================================
 # 3. ЛОГИКА СКРАПИНГА
 # =================================================================
 
-def parse_arbitration_schedule(soup: BeautifulSoup, current_scrape_time: float) -> Dict[str, Any]:
-    """Парсит данные о расписании Арбитражей из блока #log."""
-    schedule = {"Current": {}, "Upcoming": [], "Notable": []}
-    
+# Скрипт, выполняемый внутри страницы: отдает только элементы #log с
+# data-timestamp в виде компактного массива пар [timestamp, text].
+LOG_EXTRACT_JS = """
+() => Array.from(
+    document.querySelectorAll('#log b[data-timestamp], #log span[data-timestamp]'),
+    el => [el.dataset.timestamp, el.textContent.trim()]
+)
+"""
+
+# Предкомпилированные регулярные выражения для строк вида
+# "12:00 • Defense - Infested @ Casta, Ceres (S tier, бонус)"
+TIER_BONUS_RE = re.compile(r'\((.+?)\s*tier(?:,\s*(.+?))?\)$')
+TIME_PREFIX_RE = re.compile(r'^\d{2}:\d{2}\s*•\s*')
+TRAILING_PARENS_RE = re.compile(r'\s*\(.+\)$')
+MISSION_INFO_RE = re.compile(r'(.+?)\s*-\s*(.+?)\s*@\s*(.+?),\s*(.+?)$')
+
+def extract_log_entries(soup: "BeautifulSoup") -> List[Sequence[Any]]:
+    """Достает пары (timestamp, text) из блока #log разобранного HTML."""
     log_div = soup.find('div', id='log')
     if not log_div:
-        return schedule
-        
-    all_missions = log_div.find_all(['b', 'span'], attrs={'data-timestamp': True})
-    
+        return []
+    return [
+        (tag.attrs['data-timestamp'], tag.text.strip())
+        for tag in log_div.find_all(['b', 'span'], attrs={'data-timestamp': True})
+    ]
+
+def parse_arbitration_timeline(soup: "BeautifulSoup") -> List[Dict[str, Any]]:
+    """Парсит весь таймлайн Арбитражей из блока #log (без привязки к «сейчас»)."""
+    return parse_arbitration_entries(extract_log_entries(soup))
+
+def parse_arbitration_entries(entries: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Парсит таймлайн из пар (timestamp, text), полученных из страницы."""
     parsed_missions = []
-    # --- НОВЫЙ ОБЪЕКТ ЧАСОВОГО ПОЯСА МСК (UTC+3) ---
-    msk_tz = timezone(timedelta(hours=3)) 
     
-    for tag in all_missions:
+    for raw_timestamp, text_content in entries:
         try:
-            text_content = tag.text.strip()
+            text_content = text_content.strip()
             
             # Нам больше не нужно парсить '00:00 •' из строки, так как мы будем считать его сами
             
-            tier_bonus_match = re.search(r'\((.+?)\s*tier(?:,\s*(.+?))?\)$', text_content)
+            tier_bonus_match = TIER_BONUS_RE.search(text_content)
             if not tier_bonus_match: continue
             
             tier = tier_bonus_match.group(1).strip().upper()
             bonus = tier_bonus_match.group(2).strip() if tier_bonus_match.group(2) else 'N/A'
             
-            mission_info_raw = re.sub(r'^\d{2}:\d{2}\s*•\s*', '', text_content)
-            mission_info_raw = re.sub(r'\s*\(.+\)$', '', mission_info_raw).strip()
+            mission_info_raw = TIME_PREFIX_RE.sub('', text_content)
+            mission_info_raw = TRAILING_PARENS_RE.sub('', mission_info_raw).strip()
             
-            mission_match = re.search(r'(.+?)\s*-\s*(.+?)\s*@\s*(.+?),\s*(.+?)$', mission_info_raw)
+            mission_match = MISSION_INFO_RE.search(mission_info_raw)
             if not mission_match: continue
                 
             mission_type_raw = mission_match.group(1).strip()
@@ -230,68 +741,439 @@ def parse_arbitration_schedule(soup: BeautifulSoup, current_scrape_time: float)
             
             location_combined = f"{node}, {planet}" 
 
-            start_timestamp = int(tag.attrs['data-timestamp'])
-            end_timestamp = start_timestamp + 3600 # Missions last 1 hour
-            
-            # --- НОВОЕ: Конвертация времени UTC в МСК для отображения ---
-            utc_dt = datetime.fromtimestamp(start_timestamp, tz=timezone.utc)
-            msk_dt = utc_dt.astimezone(msk_tz)
-            msk_start_time_display = msk_dt.strftime('%H:%M')
-            # -----------------------------------------------------------
+            start_timestamp = int(raw_timestamp)
+            end_timestamp = start_timestamp + MISSION_DURATION_SECONDS
             
             parsed_missions.append({
                 "Tier": tier,
-                "Type": MISSION_TYPE_TRANSLATIONS.get(mission_type_raw, mission_type_raw),
+                "Type": MISSION_TYPE_ALIASES.get(mission_type_raw, mission_type_raw),
                 "Faction": normalize_faction_name(faction_raw, location_combined), 
                 "Node": node,
                 "Planet": planet,
                 "Location": location_combined,
                 "Bonus": bonus,
-                "StartTimeDisplay": msk_start_time_display, # Используем МСК время
                 "StartTimestamp": start_timestamp,
                 "EndTimestamp": end_timestamp,
             })
         except Exception as e:
             continue
 
-    # 4. Determine Current and Upcoming Missions
-    now = current_scrape_time
     parsed_missions.sort(key=lambda m: m['StartTimestamp'])
+    return parsed_missions
+
+class ScheduleStore:
+    """Компактное хранилище таймлайна Арбитражей.
+
+    Миссии лежат в параллельных массивах (время старта и коды тира, типа,
+    фракции, ноды, бонуса), строки интернированы в таблицы. Время старта
+    отсортировано, поэтому «текущая/следующая на момент t» — это bisect.
+    Для каждого поля заранее построены списки позиций; индексы по
+    сочетаниям полей строятся один раз при первом запросе.
+    Хранилище не изменяется после построения; content_hash — отпечаток
+    содержимого, по которому publish_schedule решает, менять ли версию.
+    """
+
+    __slots__ = ('content_hash', 'starts', 'codes', 'tables', '_lookup', '_node_codes', '_indexes')
+
+    # Поля миссии, хранящиеся кодами; нода хранится парой (нода, планета)
+    FIELDS = ('Tier', 'Type', 'Faction', 'Node', 'Bonus')
+    PREBUILT_INDEXES = tuple((field,) for field in FIELDS)
+
+    def __init__(self):
+        self.content_hash = ''
+        self.starts = array('q')
+        self.codes: Dict[str, array] = {field: array('H') for field in self.FIELDS}
+        self.tables: Dict[str, List[Any]] = {field: [] for field in self.FIELDS}
+        self._lookup: Dict[str, Dict[Any, int]] = {field: {} for field in self.FIELDS}
+        self._node_codes: Dict[str, int] = {}  # имя ноды -> код пары (нода, планета)
+        self._indexes: Dict[tuple, Dict[tuple, array]] = {}
+
+    @classmethod
+    def from_missions(cls, missions: Iterable[Dict[str, Any]]) -> 'ScheduleStore':
+        store = cls()
+        for mission in sorted(missions, key=lambda m: m['StartTimestamp']):
+            store._append(mission)
+        store._seal()
+        return store
+
+    def _seal(self):
+        """Завершает построение: индексы по полям и отпечаток содержимого."""
+        for fields in self.PREBUILT_INDEXES:
+            self._index(fields)
+        digest = hashlib.sha1(self.starts.tobytes())
+        for field in self.FIELDS:
+            digest.update(self.codes[field].tobytes())
+            digest.update(json.dumps(self.tables[field], ensure_ascii=False).encode('utf-8'))
+        self.content_hash = digest.hexdigest()
+
+    def _intern(self, field: str, value: Any) -> int:
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.tables[field])
+            self.tables[field].append(value)
+            if field == 'Node':
+                self._node_codes.setdefault(value[0], code)
+        return code
+
+    def _append(self, mission: Dict[str, Any]):
+        self.starts.append(mission['StartTimestamp'])
+        for field in self.FIELDS:
+            value = (mission['Node'], mission['Planet']) if field == 'Node' else mission[field]
+            self.codes[field].append(self._intern(field, value))
+
+    def _index(self, fields: tuple) -> Dict[tuple, array]:
+        """Позиции миссий для каждого сочетания кодов полей (строится один раз)."""
+        index = self._indexes.get(fields)
+        if index is None:
+            index = {}
+            columns = [self.codes[field] for field in fields]
+            for pos in range(len(self.starts)):
+                index.setdefault(tuple(column[pos] for column in columns), array('I')).append(pos)
+            self._indexes[fields] = index
+        return index
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def horizon_end(self) -> int:
+        """Конец последней миссии в хранилище (0, если оно пустое)."""
+        return self.starts[-1] + MISSION_DURATION_SECONDS if self.starts else 0
+
+    def current_index(self, t: float) -> Optional[int]:
+        """Позиция миссии, идущей в момент t, или None."""
+        pos = bisect_right(self.starts, t) - 1
+        if pos >= 0 and t < self.starts[pos] + MISSION_DURATION_SECONDS:
+            return pos
+        return None
+
+    def first_after(self, t: float) -> int:
+        """Позиция первой миссии, начинающейся строго после t (len, если таких нет)."""
+        return bisect_right(self.starts, t)
+
+    def next_index(self, t: float, **criteria: Any) -> Optional[int]:
+        """Первая миссия после t, у которой поля равны criteria (Node — имя ноды).
+
+        Пример: next_index(now, Tier="S"), next_index(now, Faction="Infested", Node="Casta").
+        """
+        if not criteria:
+            pos = self.first_after(t)
+            return pos if pos < len(self.starts) else None
+        fields = tuple(sorted(criteria))
+        key = []
+        for field in fields:
+            code = self._code(field, criteria[field])
+            if code is None:
+                return None
+            key.append(code)
+        positions = self._index(fields).get(tuple(key))
+        if not positions:
+            return None
+        i = bisect_right(positions, t, key=self.starts.__getitem__)
+        return positions[i] if i < len(positions) else None
+
+    def find(self, t: float, criteria: Dict[str, Iterable[int]]) -> List[int]:
+        """Позиции миссий, не закончившихся к t, у которых код каждого поля
+        из criteria входит в заданный набор кодов (пересечение индексов)."""
+        first = bisect_right(self.starts, t - MISSION_DURATION_SECONDS)
+        result = None
+        for field, codes in criteria.items():
+            index = self._index((field,))
+            positions = set()
+            for code in codes:
+                column = index.get((code,))
+                if column:
+                    positions.update(column[bisect_left(column, first):])
+            result = positions if result is None else result & positions
+            if not result:
+                return []
+        if result is None:
+            return list(range(first, len(self.starts)))
+        return sorted(result)
+
+    def _code(self, field: str, value: Any) -> Optional[int]:
+        if field == 'Node':
+            return self._node_codes.get(value)
+        return self._lookup[field].get(value)
+
+    def same_content(self, other: 'ScheduleStore') -> bool:
+        """Совпадает ли расписание с other (по отпечатку содержимого)."""
+        return self.content_hash == other.content_hash
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Компактное JSON-представление: таблицы строк и массивы кодов."""
+        return {
+            "starts": self.starts.tolist(),
+            "tables": {field: [list(v) if field == 'Node' else v for v in table] for field, table in self.tables.items()},
+            "codes": {field: column.tolist() for field, column in self.codes.items()},
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> 'ScheduleStore':
+        """Восстанавливает хранилище из to_snapshot(); ValueError при несовпадении данных."""
+        store = cls()
+        store.starts = array('q', data['starts'])
+        for field in cls.FIELDS:
+            for value in data['tables'][field]:
+                store._intern(field, tuple(value) if field == 'Node' else value)
+            column = array('H', data['codes'][field])
+            if len(column) != len(store.starts) or any(code >= len(store.tables[field]) for code in column):
+                raise ValueError(f"поврежден столбец {field}")
+            store.codes[field] = column
+        store._seal()
+        return store
+
+    def mission(self, pos: int) -> Dict[str, Any]:
+        """Словарь миссии в формате парсера (для отрисовки)."""
+        node, planet = self.tables['Node'][self.codes['Node'][pos]]
+        start = self.starts[pos]
+        return {
+            "Tier": self.tables['Tier'][self.codes['Tier'][pos]],
+            "Type": self.tables['Type'][self.codes['Type'][pos]],
+            "Faction": self.tables['Faction'][self.codes['Faction'][pos]],
+            "Node": node,
+            "Planet": planet,
+            "Location": f"{node}, {planet}",
+            "Bonus": self.tables['Bonus'][self.codes['Bonus'][pos]],
+            "StartTimestamp": start,
+            "EndTimestamp": start + MISSION_DURATION_SECONDS,
+        }
+
+def format_display_time(timestamp: int, tz: tzinfo, fmt: str = '%H:%M') -> str:
+    """Время старта для отображения в часовом поясе профиля."""
+    return datetime.fromtimestamp(timestamp, tz=tz).strftime(fmt)
+
+class ScheduleSnapshot(NamedTuple):
+    """Опубликованное расписание: хранилище, время скрапинга и версия.
+
+    Снимок неизменяем и заменяется целиком одним присваиванием
+    CURRENT_SCHEDULE, поэтому код, один раз взявший ссылку, видит
+    согласованные данные даже если за время await вышел новый снимок.
+    version монотонно растет только при смене содержимого — по ней
+    кэши и конвейер обновления пропускают работу.
+    """
+    store: ScheduleStore
+    scraped_at: float
+    version: int
+
+SCHEDULE_VERSIONS = itertools.count(1)
+
+def publish_schedule(store: ScheduleStore, scraped_at: float) -> ScheduleSnapshot:
+    """Публикует расписание; при том же содержимом остаются прежние хранилище и версия."""
+    global CURRENT_SCHEDULE
+    current = CURRENT_SCHEDULE
+    if store.same_content(current.store):
+        snapshot = current._replace(scraped_at=scraped_at)
+    else:
+        snapshot = ScheduleSnapshot(store, scraped_at, next(SCHEDULE_VERSIONS))
+    CURRENT_SCHEDULE = snapshot
+    return snapshot
+
+# Пустой кэш до первого скрапинга
+_empty_store = ScheduleStore()
+_empty_store._seal()
+CURRENT_SCHEDULE = ScheduleSnapshot(_empty_store, 0, next(SCHEDULE_VERSIONS))
+del _empty_store
+
+def save_schedule_snapshot(snapshot: ScheduleSnapshot):
+    """Планирует запись снимка расписания на диск (в фоне, атомарно).
+
+    Если содержимое не менялось, обновляется только время скрапинга.
+    """
+    data = SNAPSHOT_STORE.data
+    if data.get("content_hash") != snapshot.store.content_hash:
+        data.clear()
+        data.update({
+            "format": SNAPSHOT_FORMAT_VERSION, "content_hash": snapshot.store.content_hash,
+            **snapshot.store.to_snapshot(),
+        })
+    data["scraped_at"] = snapshot.scraped_at
+    SNAPSHOT_STORE.mark_dirty()
+
+def load_schedule_snapshot(now: Optional[float] = None) -> bool:
+    """Загружает снимок расписания в кэш, чтобы не ждать первого скрапинга.
+
+    Снимок другой версии формата, поврежденный или уже целиком прошедший
+    игнорируется. Current/Upcoming все равно считаются от текущего времени.
+    """
+    now = time.time() if now is None else now
+    if not SNAPSHOT_STORE.load():
+        return False
+    data = SNAPSHOT_STORE.data
+    if data.get("format") != SNAPSHOT_FORMAT_VERSION:
+        print(f"⚠️ Снимок расписания {SNAPSHOT_FILE} другой версии формата, пропущен.")
+        return False
+    try:
+        store = ScheduleStore.from_snapshot(data)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"⚠️ Снимок расписания {SNAPSHOT_FILE} поврежден ({e}), пропущен.")
+        return False
+    if store.horizon_end <= now:
+        return False
+    snapshot = publish_schedule(store, data.get("scraped_at", 0))
+    print(f"Загружен снимок расписания: миссий {len(store)}, скрапинг от {time.strftime('%d.%m %H:%M', time.localtime(snapshot.scraped_at))}.")
+    return True
+
+if not SCRAPE_WORKER_MODE:
+    load_schedule_snapshot()
+
+class ScheduleArchive:
+    """История ротаций Арбитражей в локальной SQLite.
+
+    Каждая новая версия расписания дописывается пачками upsert по ключу
+    (время старта, нода); уже известные миссии без изменений не
+    переписываются. Индексы по времени (первичный ключ), тиру, ноде и
+    фракции держат агрегаты по году почасовых данных в пределах
+    миллисекунд. version растет при каждом изменении архива и служит
+    ключом кэша статистики. Все методы синхронные — из event loop их
+    вызывают через asyncio.to_thread.
+    """
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS missions (
+            start INTEGER NOT NULL,
+            node TEXT NOT NULL,
+            planet TEXT NOT NULL,
+            tier TEXT NOT NULL,
+            type TEXT NOT NULL,
+            faction TEXT NOT NULL,
+            bonus TEXT NOT NULL,
+            first_seen INTEGER NOT NULL,
+            PRIMARY KEY (start, node)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS missions_tier ON missions (tier, start)",
+        "CREATE INDEX IF NOT EXISTS missions_node ON missions (node COLLATE NOCASE, tier)",
+        "CREATE INDEX IF NOT EXISTS missions_faction ON missions (faction, start)",
+    )
+    UPSERT = """
+        INSERT INTO missions (start, node, planet, tier, type, faction, bonus, first_seen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (start, node) DO UPDATE SET
+            planet = excluded.planet, tier = excluded.tier, type = excluded.type,
+            faction = excluded.faction, bonus = excluded.bonus
+        WHERE (planet, tier, type, faction, bonus)
+            IS NOT (excluded.planet, excluded.tier, excluded.type, excluded.faction, excluded.bonus)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = 0
+        self.archived_hash = ''  # content_hash последнего записанного расписания
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def record(self, store: ScheduleStore, seen_at: float) -> int:
+        """Дописывает расписание в архив; возвращает число новых или измененных миссий."""
+        if store.content_hash == self.archived_hash:
+            return 0
+        rows = (
+            (m['StartTimestamp'], m['Node'], m['Planet'], m['Tier'], m['Type'], m['Faction'], m['Bonus'], int(seen_at))
+            for m in map(store.mission, range(len(store)))
+        )
+        with self._lock:
+            conn = self._connect()
+            before = conn.total_changes
+            with conn:
+                for batch in iter(lambda: list(itertools.islice(rows, ARCHIVE_BATCH_SIZE)), []):
+                    conn.executemany(self.UPSERT, batch)
+            changed = conn.total_changes - before
+            self.archived_hash = store.content_hash
+            if changed:
+                self.version += 1
+        return changed
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def span(self) -> Optional[Tuple[int, int, int]]:
+        """(первый старт, последний старт, число миссий) или None для пустого архива."""
+        first, last, count = self._query("SELECT MIN(start), MAX(start), COUNT(*) FROM missions")[0]
+        return (first, last, count) if count else None
+
+    def tier_frequency(self, node: Optional[str] = None, limit: int = ARCHIVE_STATS_TOP) -> List[Tuple[str, Dict[str, int]]]:
+        """Частота тиров по нодам: одна нода или limit нод с наибольшим числом S."""
+        if node:
+            rows = self._query(
+                "SELECT node, tier, COUNT(*) FROM missions WHERE node = ? COLLATE NOCASE GROUP BY node, tier", (node,)
+            )
+        else:
+            rows = self._query("SELECT node, tier, COUNT(*) FROM missions GROUP BY node, tier")
+        by_node: Dict[str, Dict[str, int]] = {}
+        for name, tier, count in rows:
+            by_node.setdefault(name, {})[tier] = count
+        ranked = sorted(by_node.items(), key=lambda item: (-item[1].get('S', 0), -sum(item[1].values()), item[0]))
+        return ranked[:limit]
+
+    def tier_gaps(self, tier: str) -> Optional[Dict[str, float]]:
+        """Интервалы между соседними миссиями тира (в часах) или None, если их меньше двух."""
+        starts = [row[0] for row in self._query("SELECT start FROM missions WHERE tier = ? ORDER BY start", (tier,))]
+        gaps = [(b - a) / 3600 for a, b in zip(starts, starts[1:])]
+        if not gaps:
+            return None
+        ordered = sorted(gaps)
+        return {
+            "count": len(starts), "mean": sum(gaps) / len(gaps), "median": ordered[len(ordered) // 2],
+            "min": ordered[0], "max": ordered[-1],
+        }
+
+    def faction_mix(self, since: int) -> List[Tuple[str, int]]:
+        """Число миссий по фракциям со старта since."""
+        return self._query(
+            "SELECT faction, COUNT(*) AS total FROM missions WHERE start >= ? GROUP BY faction ORDER BY total DESC",
+            (since,),
+        )
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is not None:
+                conn.close()
+
+ARCHIVE = ScheduleArchive(ARCHIVE_FILE)
+
+async def archive_schedule(snapshot: ScheduleSnapshot):
+    """Пишет новое расписание в архив в фоне; ошибка архива не мешает скрапингу."""
+    if not len(snapshot.store) or snapshot.store.content_hash == ARCHIVE.archived_hash:
+        return
+    try:
+        with METRICS.span("archive_write"):
+            changed = await asyncio.to_thread(ARCHIVE.record, snapshot.store, snapshot.scraped_at)
+    except sqlite3.Error as e:
+        print(f"[{time.strftime('%H:%M:%S')}] 🚨 Не удалось записать архив {ARCHIVE_FILE}: {e}")
+        return
+    if changed:
+        print(f"[{time.strftime('%H:%M:%S')}] 🗄️ Архив: новых или измененных миссий {changed}.")
+
+def build_arbitration_schedule(store: ScheduleStore, now: float) -> Dict[str, Any]:
+    """Вычисляет Current/Upcoming/Notable из хранилища расписания на момент now."""
+    schedule = {"Current": {}, "Upcoming": [], "Notable": []}
     
-    current_mission: Optional[Dict[str, Any]] = None
-    upcoming_missions_list: List[Dict[str, Any]] = []
-    
-    for mission in parsed_missions:
-        start = mission['StartTimestamp']
-        end = mission['EndTimestamp']
-        
-        if start <= now < end:
-            current_mission = mission
-        elif start > now:
-            upcoming_missions_list.append(mission)
-
-    # --- Current / Next Mission ---
-    target_mission = current_mission
-    is_active = True
+    # --- Current / Next Mission (bisect по времени старта) ---
+    current_pos = store.current_index(now)
+    first_upcoming = store.first_after(now)
+    is_active = current_pos is not None
+    target_pos = current_pos
     
-    if not target_mission:
-        if upcoming_missions_list:
-            target_mission = upcoming_missions_list.pop(0) 
-            is_active = False
-
-    if target_mission:
-        # Расчет времени всегда точен, т.к. основан на разнице timestamp (секунды)
-        time_diff = target_mission['EndTimestamp'] - now if is_active else target_mission['StartTimestamp'] - now
-        
-        hours = int(time_diff // 3600)
-        minutes = int((time_diff % 3600) // 60)
-        seconds = int(time_diff % 60)
-        
-        time_raw_display = f"{minutes}м {seconds}с"
-        if hours > 0: time_raw_display = f"{hours}ч {time_raw_display}"
+    if not is_active and first_upcoming < len(store):
+        target_pos = first_upcoming
+        first_upcoming += 1
 
-        time_status = f"осталось {time_raw_display}" if is_active else f"через {time_raw_display}"
-        
+    if target_pos is not None:
+        target_mission = store.mission(target_pos)
+        # Расписание не зависит от языка: текст времени рисует embed (или сам Discord)
         # НОВОЕ: Целевой UNIX-таймстамп для Discord-таймера (секунды с эпохи)
         target_time_for_discord = target_mission['EndTimestamp'] if is_active else target_mission['StartTimestamp']
         
@@ -303,354 +1185,2545 @@ def parse_arbitration_schedule(soup: BeautifulSoup, current_scrape_time: float)
             "Type": target_mission["Type"], 
             "Tileset": target_mission["Faction"], 
             "Bonus": target_mission["Bonus"],
-            "TimeRaw": time_status,
             "TargetTimestamp": target_time_for_discord, # <--- ДОБАВЛЕНО
             "StartTimestamp": target_mission["StartTimestamp"],
             "IsActive": is_active
         }
     else:
-        schedule["Current"] = {"Tier": "N/A", "TimeRaw": "Нет данных", "IsActive": False, "Node": "N/A"}
+        schedule["Current"] = {"Tier": "N/A", "IsActive": False, "Node": "N/A"}
 
 
     # --- Upcoming Missions ---
     
-    for mission in upcoming_missions_list:
-        time_until_start = mission['StartTimestamp'] - now
-        
-        if time_until_start > 0:
-            hours = int(time_until_start // 3600)
-            minutes = int((time_until_start % 3600) // 60)
-            
-            if hours > 0:
-                time_raw_display = f"через {hours}:{minutes:02}"
-            else:
-                time_raw_display = f"через {minutes}м"
-            
-            # НОВОЕ: Целевой UNIX-таймстамп для Discord-таймера
-            target_time_for_discord = mission['StartTimestamp']
-
-            schedule["Upcoming"].append({
-                "Tier": mission["Tier"], 
-                "Name": mission["Type"], 
-                "Location": mission["Location"],
-                "Faction": mission["Faction"],
-                "StartTimeDisplay": mission["StartTimeDisplay"], 
-                "TimeRaw": time_raw_display,
-                "TimeInSeconds": time_until_start,
-                "TargetTimestamp": target_time_for_discord, # <--- ДОБАВЛЕНО ДЛЯ БЛИЖАЙШИХ
-            })
-            
-    schedule["Upcoming"] = schedule["Upcoming"][:20] 
+    for pos in range(first_upcoming, min(first_upcoming + UPCOMING_CACHE_LIMIT, len(store))):
+        schedule["Upcoming"].append(upcoming_mission_entry(store.mission(pos), now))
+
+    # --- Notable: ближайшая миссия каждого выделенного тира (индекс по тиру) ---
+    if first_upcoming < len(store):
+        after = store.starts[first_upcoming] - 1
+        notable_positions = (store.next_index(after, Tier=tier) for tier in HIGHLIGHT_TIERS)
+        for pos in sorted(p for p in notable_positions if p is not None):
+            schedule["Notable"].append(upcoming_mission_entry(store.mission(pos), now))
     
     return schedule
 
-def parse_warframe_state():
-    """Скрапинг данных с browse.wf и парсинг Арбитражей."""
-    print(f"[{time.strftime('%H:%M:%S')}] 🔄 Запуск скрапинга Арбитража...")
-    current_scrape_time = time.time()
-    results = {"ArbitrationSchedule": {}}
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.set_default_timeout(60000)
-            page.goto(URL, wait_until="domcontentloaded") 
-            page.wait_for_selector('#log', timeout=30000) 
-            time.sleep(1.5) 
-            soup = BeautifulSoup(page.content(), 'html.parser')
-            browser.close()
-            
-            results["ArbitrationSchedule"] = parse_arbitration_schedule(soup, current_scrape_time)
-            
-    except PlaywrightTimeoutError:
-        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Таймаут при загрузке данных.")
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] 🚨 Критическая ошибка скрапинга: {e}")
+def upcoming_mission_entry(mission: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Формирует запись грядущей миссии для embed относительно момента now."""
+    time_until_start = mission['StartTimestamp'] - now
+    
+    return {
+        "Tier": mission["Tier"], 
+        "Name": mission["Type"], 
+        "Location": mission["Location"],
+        "Faction": mission["Faction"],
+        "TimeInSeconds": time_until_start,
+        "TargetTimestamp": mission['StartTimestamp'], # Целевой UNIX-таймстамп для Discord-таймера
+    }
 
-    arb_tier = results["ArbitrationSchedule"]["Current"].get("Tier", "N/A")
-    print(f"[{time.strftime('%H:%M:%S')}] ✅ Скрапинг завершен. Арбитраж: {arb_tier}.")
-    set_current_state(results, current_scrape_time)
-    return results
+def parse_arbitration_schedule(soup: "BeautifulSoup", current_scrape_time: float) -> Dict[str, Any]:
+    """Парсит данные о расписании Арбитражей из блока #log."""
+    store = ScheduleStore.from_missions(parse_arbitration_timeline(soup))
+    return build_arbitration_schedule(store, current_scrape_time)
 
-def mission_update_loop():
-    """Постоянный цикл для периодического скрапинга в фоновом потоке."""
-    while True:
-        parse_warframe_state()
-        time.sleep(SCRAPE_INTERVAL_SECONDS)
+def get_arbitration_schedule(now: Optional[float] = None) -> Dict[str, Any]:
+    """Current/Upcoming на текущую секунду, вычисленные из кэша расписания."""
+    return build_arbitration_schedule(CURRENT_SCHEDULE.store, time.time() if now is None else now)
 
-def start_scraper():
-    """Запускает цикл скрапинга в отдельном потоке."""
-    tracker_thread = threading.Thread(target=mission_update_loop, daemon=True)
-    tracker_thread.start()
+class ScrapeBackoff:
+    """Пауза между неудачными скрапингами и размыкатель цепи.
 
+    Каждая неудача подряд удваивает паузу (с джиттером, чтобы перезапуски
+    не били в источник синхронно). После SCRAPE_CIRCUIT_THRESHOLD неудач
+    цепь размыкается на SCRAPE_CIRCUIT_COOLDOWN_SECONDS; по истечении
+    делается одна пробная попытка: неудача снова размыкает цепь, успех
+    сбрасывает все счетчики.
+    """
 
-# =================================================================
-# 4. ЛОГИКА ОБНОВЛЕНИЯ КАНАЛА
-# =================================================================
+    def __init__(self):
+        self.failures = 0
+        self.not_before = 0.0
+        self.open_until = 0.0
 
-async def send_or_edit_message(message_id_key: str, channel: discord.TextChannel, embed: discord.Embed, content: str = None):
-    """Отправляет или редактирует сообщение в канале. Добавлен параметр content."""
-    
-    # Удаляем content, если он пустой, чтобы не редактировать сообщение без необходимости
-    if content is None or content.strip() == "":
-        content = None
-    
-    try:
-        message_id = CONFIG.get(message_id_key) 
-        
-        if message_id:
-            try:
-                message = await channel.fetch_message(message_id)
-                await message.edit(content=content, embed=embed, view=None)
-                return
-            except discord.NotFound:
-                pass 
-        
-        # Передаем content здесь
-        sent_message = await channel.send(content=content, embed=embed)
-        CONFIG[message_id_key] = sent_message.id
-        save_config()
-        
-    except discord.Forbidden:
-        print(f"[{time.strftime('%H:%M:%S')}] ❌ Нет прав для отправки/редактирования в канале {channel.name}.")
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] 🚨 Ошибка при обновлении канала {channel.name}: {e}")
-        if isinstance(e, discord.HTTPException) and e.status == 400:
-             print(f"[{time.strftime('%H:%M:%S')}] 🚨 Ошибка HTTP 400: {e.text}")
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
 
+    def record_success(self):
+        if self.failures >= SCRAPE_CIRCUIT_THRESHOLD:
+            print(f"[{time.strftime('%H:%M:%S')}] 🔌 Источник снова доступен, цепь скрапинга замкнута.")
+        self.failures = 0
+        self.not_before = self.open_until = 0.0
 
-async def update_arbitration_channel(bot: commands.Bot):
-    """Обновляет канал с Расписанием Арбитражей (ротацией)."""
-    arb_id = CONFIG.get('ARBITRATION_CHANNEL_ID')
-    if not arb_id: return
-    arb_channel = bot.get_channel(arb_id)
-    if not arb_channel: return
+    def record_failure(self, now: float) -> bool:
+        """Учитывает неудачу; True, если цепь только что разомкнулась."""
+        self.failures += 1
+        if self.failures >= SCRAPE_CIRCUIT_THRESHOLD:
+            self.open_until = self.not_before = now + SCRAPE_CIRCUIT_COOLDOWN_SECONDS
+            print(
+                f"[{time.strftime('%H:%M:%S')}] 🔌 Неудачных скрапингов подряд: {self.failures}, "
+                f"следующая попытка через {SCRAPE_CIRCUIT_COOLDOWN_SECONDS // 60} мин."
+            )
+            return True
+        delay = min(SCRAPE_BACKOFF_MAX_SECONDS, SCRAPE_BACKOFF_BASE_SECONDS * 2 ** (self.failures - 1))
+        self.not_before = now + random.uniform(delay / 2, delay)
+        return False
 
-    data = CURRENT_MISSION_STATE.get("ArbitrationSchedule", {})
-    
-    current_arb = data.get("Current", {})
-    upcoming = data.get("Upcoming", [])
-    
-    # 1. Определение цвета, тира и статуса
-    embed_tier = current_arb.get("Tier", "N/A").upper()
-    embed_color = TIER_COLORS.get(embed_tier, FALLBACK_COLOR)
-    tier_emoji = TIER_EMOJIS_FINAL.get(embed_tier, embed_tier) 
-    time_raw = current_arb.get('TimeRaw', 'N/A')
-    is_active = current_arb.get('IsActive', False)
-    target_ts = current_arb.get('TargetTimestamp') # <-- НОВОЕ: Целевой таймстамп
-    
-    # 2. Эмодзи и Изображение Фракции
-    faction_name = current_arb.get('Tileset', 'N/A')
-    faction_emoji = FACTION_EMOJIS_FINAL.get(faction_name, FALLBACK_EMOJI)
-    faction_url = get_faction_image_url(faction_name)
-    
-    # 3. Получение эмодзи Кувы и Витуса
-    vitus_emoji_name = EMOJI_NAMES.get(VITUS_EMOJI_KEY)
-    kuva_emoji_name = EMOJI_NAMES.get(KUVA_EMOJI_KEY)
-    vitus_emoji = RESOLVED_EMOJIS.get(vitus_emoji_name, "⭐")
-    kuva_emoji = RESOLVED_EMOJIS.get(kuva_emoji_name, "⚡️")
+SCRAPE_BACKOFF = ScrapeBackoff()
+METRICS.gauge("arbys_scrape_consecutive_failures", lambda: SCRAPE_BACKOFF.failures)
+METRICS.gauge("arbys_scrape_circuit_open", lambda: int(SCRAPE_BACKOFF.is_open(time.time())))
 
-    # 4. Линковка роли (ДИНАМИЧЕСКИЙ ПОИСК И ЛОГИКА УВЕДОМЛЕНИЯ)
-    content_to_send: Optional[str] = None
-    node_name = current_arb.get('Node') 
-    
-    # --- Логика Уведомления и Удержания ---
-    current_node_key = f"{node_name}_{current_arb.get('StartTimestamp')}" if is_active else None
-    last_mentioned_key = CONFIG.get('LAST_MENTIONED_NODE')
-    
-    should_find_role = False
-    
-    if is_active and node_name and arb_channel.guild:
-        
-        if current_node_key != last_mentioned_key:
-            # СЛУЧАЙ 1: НОВАЯ АКТИВНАЯ МИССИЯ (нужно уведомить и сохранить ключ)
-            should_find_role = True
-            CONFIG['LAST_MENTIONED_NODE'] = current_node_key
-            save_config()
-            print(f"[{time.strftime('%H:%M:%S')}] DEBUG: Активировано УВЕДОМЛЕНИЕ для ноды: {node_name}")
-            
-        elif current_node_key == last_mentioned_key:
-            # СЛУЧАЙ 2: МИССИЯ ПРОДОЛЖАЕТСЯ (нужно только сохранить упоминание в сообщении)
-            should_find_role = True
-            
-    elif not is_active and last_mentioned_key:
-        # СЛУЧАЙ 3: МИССИЯ ЗАКОНЧИЛАСЬ (сбрасываем ключ, чтобы очистить упоминание)
-        CONFIG['LAST_MENTIONED_NODE'] = None
-        save_config()
+def scrape_interval(store: "ScheduleStore", now: float) -> float:
+    """Плановый интервал перескрапливания: короче, чем меньше осталось горизонта."""
+    remaining = store.horizon_end - now
+    scale = min(1.0, max(0.0, remaining) / TIMELINE_MIN_HORIZON_SECONDS)
+    return max(SCRAPE_MIN_INTERVAL_SECONDS, TIMELINE_REFRESH_INTERVAL_SECONDS * scale)
 
-    
-    if should_find_role and node_name and arb_channel.guild:
-        # Ищем роль по имени (точное совпадение)
-        target_role = discord.utils.get(arb_channel.guild.roles, name=node_name)
-        
-        if target_role:
-            # Устанавливаем упоминание, которое будет отображаться (и уведомит только в СЛУЧАЕ 1)
-            content_to_send = f"{target_role.mention}" 
-            print(f"[{time.strftime('%H:%M:%S')}] DEBUG: Роль найдена для ноды {node_name}. Mention: {content_to_send}")
-        else:
-            print(f"[{time.strftime('%H:%M:%S')}] DEBUG: Роль НЕ НАЙДЕНА для ноды: {node_name}. Проверьте точное совпадение имени.")
+def next_scrape_time(now: float) -> float:
+    """Когда можно скрапить: по плану кэша, но не раньше паузы после неудач."""
+    schedule = CURRENT_SCHEDULE
+    planned = schedule.scraped_at + scrape_interval(schedule.store, now) if len(schedule.store) else 0.0
+    return max(planned, SCRAPE_BACKOFF.not_before)
 
-    # --- 3. EMBED CONSTRUCTION ---
-    embed = discord.Embed(
-        title=f"{vitus_emoji} РАСПИСАНИЕ АРБИТРАЖЕЙ",
-        url="https://browse.wf/arbys", 
-        color=embed_color
-    )
-    
-    # --- A. Current / Next Active Mission ---
-    if current_arb.get("Name"):
-        
-        tier_display = f"{tier_emoji} Тир" if embed_tier != "N/A" else ""
-        
-        # НОВОЕ: Формирование строки с нативным Discord-таймером
-        if target_ts:
-            discord_timer = f"<t:{target_ts}:R>" # Формат :R - относительное время ("через 5 минут")
-            time_line = f"завершится {discord_timer}" if is_active else f"начнется {discord_timer}"
-        else:
-            time_line = f"`{time_raw}`" # Фоллбэк, если таймстамп не найден
+def timeline_needs_refresh(now: float) -> bool:
+    """Решает, пора ли перескрапить страницу, согласно политике кэша."""
+    return now >= next_scrape_time(now)
 
-        if not is_active:
-            title_line = f"{kuva_emoji} **СЛЕДУЮЩИЙ АРБИТРАЖ ({tier_display}):**"
-        else:
-            # Заголовок без упоминания
-            title_line = f"{kuva_emoji} **ТЕКУЩИЙ АРБИТРАЖ ({tier_display}):**" 
-            
-        description_value = (
-            f"**{current_arb.get('Name', 'N/A')}**\n"
-            f"Локация: **{current_arb.get('Location', 'N/A')}**\n"
-            f"Враг: {faction_emoji} **{faction_name}**\n"
-            f"Бонус: **{current_arb.get('Bonus', 'N/A')}**\n"
-            f"Время: **{time_line}**" # <--- Используем новую строку с Discord-таймером
-        )
-        embed.add_field(name=title_line, value=description_value, inline=False)
-        
-        if faction_url:
-            embed.set_thumbnail(url=faction_url)
-        
-    else:
-        embed.description = "**Актуальное расписание миссий не найдено.**\nПожалуйста, подождите следующего скрапинга. (Тир: N/A)"
-        embed.color = discord.Color.red()
-        
-    # --- B. Upcoming Missions ---
-    upcoming_lines = []
-    UPCOMING_LIMIT = 5 
-    
-    if upcoming:
-        missions_to_display = upcoming[:UPCOMING_LIMIT] 
-        
-        for m in missions_to_display:
-            upc_tier_emoji = TIER_EMOJIS_FINAL.get(m['Tier'], m['Tier'])
-            upc_faction_emoji = FACTION_EMOJIS_FINAL.get(m['Faction'], FALLBACK_EMOJI)
-            
-            # ВНИМАНИЕ: Здесь используем m['TargetTimestamp'] для нативного таймера
-            upc_timer = f"<t:{m['TargetTimestamp']}:R>" if m.get('TargetTimestamp') else f"**{m['TimeRaw']}**"
+def schedule_stale_since(schedule: "ScheduleSnapshot", now: float) -> Optional[int]:
+    """Время последнего удачного скрапинга, если кэш уже считается устаревшим."""
+    scraped_at = schedule.scraped_at
+    if scraped_at and now - scraped_at >= SCRAPE_STALE_AFTER_SECONDS:
+        return int(scraped_at)
+    return None
 
-            line = (
-                f"{upc_tier_emoji} | {m['StartTimeDisplay']} • {upc_faction_emoji} ({m['Location']}) {upc_timer}"
-            )
-            upcoming_lines.append(line)
-    
-    if upcoming_lines:
-        field_value = "\n".join(upcoming_lines)
-    else:
-        field_value = "Нет данных о грядущих миссиях."
-        
-    embed.add_field(
-        name="\u200b\n— — — БЛИЖАЙШИЕ 5 МИССИЙ — — —", 
-        value=field_value,
-        inline=False
-    )
-    
-    # --- C. Tier-Specific Highlights ---
-    TIERS_TO_HIGHLIGHT = ["S", "A", "B"]
+class BrowserManager:
+    """Держит один «тёплый» Chromium и страницу между скрапингами.
 
-    embed.add_field(name="\u200b", value="— — — ВЫДЕЛЕННЫЕ ТИРЫ — — —", inline=False)
+    Браузер запускается один раз; каждый следующий скрапинг делает только
+    reload уже открытой страницы. Перед использованием проверяется здоровье
+    браузера и страницы, после падения они перезапускаются автоматически.
+    Все вызовы идут из event loop бота (playwright.async_api).
+    """
 
-    for tier in TIERS_TO_HIGHLIGHT:
-        next_mission = next((m for m in upcoming if m['Tier'].upper() == tier), None)
-        
-        tier_emoji = TIER_EMOJIS_FINAL.get(tier, tier)
-        field_name = f"Ближайший {tier_emoji} Тир"
-        
-        if next_mission:
-            upc_faction_emoji = FACTION_EMOJIS_FINAL.get(next_mission['Faction'], FALLBACK_EMOJI)
-            
-            # НОВОЕ: Используем TargetTimestamp для выделенных тиров
-            next_timer = f"<t:{next_mission['TargetTimestamp']}:R>" if next_mission.get('TargetTimestamp') else f"**{next_mission['TimeRaw']}**"
+    def __init__(self, url: str):
+        self.url = url
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._page_uses = 0
 
+    async def _launch(self):
+        """(Пере)запускает Chromium и открывает страницу с расписанием."""
+        await self.close()
+        print(f"[{time.strftime('%H:%M:%S')}] 🌐 Запуск Chromium...")
+        with METRICS.span("browser_launch"):
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+        await self._open_page()
+
+    async def _open_page(self):
+        """Открывает новую вкладку вместо старой (браузер остается прежним)."""
+        if self._page is not None and not self._page.is_closed():
+            try:
+                await self._page.close()
+            except Exception:
+                pass
+        self._page = await self._browser.new_page()
+        self._page.set_default_timeout(BROWSER_DEFAULT_TIMEOUT_MS)
+        await self._page.route("**/*", filter_browser_request)
+        with METRICS.span("page_goto"):
+            await self._page.goto(self.url, wait_until="domcontentloaded")
+        self._page_uses = 0
+
+    async def is_healthy(self) -> bool:
+        """Проверяет, что браузер подключен, а страница жива и отвечает."""
+        if self._browser is None or self._page is None:
+            return False
+        try:
+            return (
+                self._browser.is_connected()
+                and not self._page.is_closed()
+                and await self._page.evaluate("1 + 1") == 2
+            )
+        except Exception:
+            return False
+
+    async def load_page(self):
+        """Возвращает страницу со свежими данными: reload или перезапуск."""
+        if not await self.is_healthy():
+            await self._launch()
+        elif self._page_uses >= BROWSER_MAX_PAGE_USES:
+            # Периодически пересоздаем вкладку, чтобы не копить память страницы
+            await self._open_page()
+        else:
+            with METRICS.span("page_reload"):
+                await self._page.reload(wait_until="domcontentloaded")
+        self._page_uses += 1
+        return self._page
+
+    async def reset(self):
+        """Принудительно закрывает браузер; следующий load_page его перезапустит."""
+        await self.close()
+
+    async def close(self):
+        """Закрывает браузер и драйвер Playwright, игнорируя ошибки."""
+        browser, driver = self._browser, self._playwright
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._page_uses = 0
+        for closer in (browser and browser.close, driver and driver.stop):
+            if not closer:
+                continue
+            try:
+                await closer()
+            except Exception:
+                pass
+
+
+def is_allowed_request(url: str, resource_type: str) -> bool:
+    """Разрешен ли запрос страницы: только нужные типы ресурсов с browse.wf."""
+    if resource_type not in BROWSER_ALLOWED_RESOURCE_TYPES:
+        return False
+    host = urlsplit(url).hostname or ''
+    return any(host == allowed or host.endswith(f".{allowed}") for allowed in BROWSER_ALLOWED_HOSTS)
+
+async def filter_browser_request(route):
+    """Обработчик page.route: пропускает разрешенные запросы, остальные обрывает."""
+    request = route.request
+    if is_allowed_request(request.url, request.resource_type):
+        await route.continue_()
+    else:
+        await route.abort()
+
+# Выполняется в странице при каждом опросе wait_for_function; счетчик
+# хранится в window и обнуляется сам при перезагрузке страницы.
+LOG_READY_JS = """
+(stablePolls) => {
+    const count = document.querySelectorAll('#log [data-timestamp]').length;
+    const s = window.__arbyReady || (window.__arbyReady = {count: -1, polls: 0});
+    if (count > 0 && count === s.count) { s.polls += 1; } else { s.count = count; s.polls = 0; }
+    return s.polls >= stablePolls;
+}
+"""
+
+async def wait_for_log_ready(page):
+    """Ждет, пока #log заполнится и количество записей стабилизируется."""
+    await page.wait_for_function(
+        LOG_READY_JS, arg=LOG_STABLE_POLLS, polling=LOG_POLL_INTERVAL_MS, timeout=30000
+    )
+
+BROWSER = BrowserManager(URL)
+
+# Записи #log в HTML-ответе HTTP-источника (без BeautifulSoup)
+LOG_BLOCK_RE = re.compile(r'<div[^>]*\bid="log"')
+LOG_ENTRY_HTML_RE = re.compile(r'<(b|span)\b[^>]*?\bdata-timestamp="(\d+)"[^>]*>(.*?)</\1>', re.S)
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+def decode_source_payload(body: str, content_type: str = '') -> List[Sequence[Any]]:
+    """Разбирает ответ HTTP-источника в пары (timestamp, text).
+
+    Поддерживаются JSON (массив пар или объектов {timestamp, text}, в том
+    числе под ключом "entries") и HTML с элементами data-timestamp.
+    """
+    if 'json' in content_type or body.lstrip().startswith(('[', '{')):
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data.get('entries', [])
+        return [
+            (item['timestamp'], item['text']) if isinstance(item, dict) else (item[0], item[1])
+            for item in data
+        ]
+    block = LOG_BLOCK_RE.search(body)
+    if block:
+        body = body[block.start():]
+    return [
+        (timestamp, unescape(HTML_TAG_RE.sub('', inner)).strip())
+        for _, timestamp, inner in LOG_ENTRY_HTML_RE.findall(body)
+    ]
+
+class ScheduleSource(abc.ABC):
+    """Источник записей #log для parse_warframe_state.
+
+    fetch() возвращает список пар (timestamp, text) либо None, если данные
+    не изменились с прошлого запроса. Ошибки пробрасываются вызывающему.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def fetch(self) -> Optional[List[Sequence[Any]]]:
+        """Запрашивает записи #log."""
+
+    async def reset(self):
+        """Сбрасывает соединения после ошибки или таймаута."""
+
+    async def close(self):
+        """Освобождает ресурсы при остановке бота."""
+
+class PlaywrightSource(ScheduleSource):
+    """Рендерит browse.wf в «тёплом» Chromium и читает #log со страницы."""
+
+    name = "browser"
+
+    def __init__(self, browser: BrowserManager):
+        self.browser = browser
+
+    async def fetch(self) -> Optional[List[Sequence[Any]]]:
+        page = await self.browser.load_page()
+        with METRICS.span("wait_log_ready"):
+            await wait_for_log_ready(page)
+        with METRICS.span("extract"):
+            if EXTRACTION_MODE == 'html' and BeautifulSoup is not None:
+                html = await page.content()
+                # Разбор HTML — чистый CPU, уводим его из event loop бота
+                soup = await asyncio.to_thread(BeautifulSoup, html, 'html.parser')
+                return await asyncio.to_thread(extract_log_entries, soup)
+            return await page.evaluate(LOG_EXTRACT_JS)
+
+    async def reset(self):
+        # Зависшую страницу проще перезапустить, чем пытаться оживить
+        await self.browser.reset()
+
+    async def close(self):
+        await self.browser.close()
+
+# Одна aiohttp-сессия с пулом keep-alive соединений на весь бот: ее делят
+# источник расписания и ленты (трещины, Стальной Путь, каскады).
+HTTP_SESSION: Optional[aiohttp.ClientSession] = None
+
+def http_session() -> aiohttp.ClientSession:
+    """Общая HTTP-сессия (создается при первом запросе и после закрытия)."""
+    global HTTP_SESSION
+    if HTTP_SESSION is None or HTTP_SESSION.closed:
+        HTTP_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=HTTP_KEEPALIVE_SECONDS),
+            timeout=aiohttp.ClientTimeout(total=HTTP_SOURCE_TIMEOUT_SECONDS),
+        )
+    return HTTP_SESSION
+
+async def close_http_session():
+    """Закрывает общую HTTP-сессию при остановке бота."""
+    global HTTP_SESSION
+    session, HTTP_SESSION = HTTP_SESSION, None
+    if session is not None and not session.closed:
+        await session.close()
+
+async def conditional_get(url: str, validators: Dict[str, str],
+                          accept: str = "application/json") -> Optional[Tuple[str, str, Dict[str, str]]]:
+    """GET с If-None-Match / If-Modified-Since из validators.
+
+    Возвращает (тело, content-type, новые валидаторы) или None на 304.
+    Ошибки HTTP пробрасываются вызывающему.
+    """
+    headers = {"Accept": accept}
+    if 'etag' in validators:
+        headers['If-None-Match'] = validators['etag']
+    if 'last_modified' in validators:
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    async with http_session().get(url, headers=headers) as response:
+        if response.status == 304:
+            return None
+        response.raise_for_status()
+        body = await response.text()
+        fresh = {}
+        if response.headers.get('ETag'):
+            fresh['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            fresh['last_modified'] = response.headers['Last-Modified']
+        return body, response.content_type, fresh
+
+class HttpSource(ScheduleSource):
+    """Забирает данные обычным HTTP-запросом, без браузера.
+
+    Запросы идут через общую сессию http_session(). ETag и Last-Modified
+    последнего ответа отправляются как условные заголовки: на 304 fetch()
+    возвращает None и парсинг пропускается.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str):
+        self.url = url
+        self._validators: Dict[str, str] = {}
+
+    async def fetch(self) -> Optional[List[Sequence[Any]]]:
+        with METRICS.span("http_fetch"):
+            result = await conditional_get(self.url, self._validators, accept="application/json, text/html;q=0.9")
+        if result is None:
+            return None
+        body, content_type, validators = result
+
+        with METRICS.span("extract"):
+            entries = decode_source_payload(body, content_type)
+        # Валидаторы запоминаем только для непустого ответа, иначе 304 закрепил бы пустоту
+        if entries:
+            self._validators = validators
+        return entries
+
+    async def reset(self):
+        # Сессия общая с лентами; оборванные соединения aiohttp выбрасывает из пула сам
+        self._validators = {}
+
+class FallbackSource(ScheduleSource):
+    """Основной источник с откатом на запасной при ошибке или пустом ответе."""
+
+    def __init__(self, primary: ScheduleSource, fallback: ScheduleSource):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    async def fetch(self) -> Optional[List[Sequence[Any]]]:
+        try:
+            entries = await self.primary.fetch()
+        except Exception as e:
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Источник {self.primary.name} недоступен ({e!r}), откат на {self.fallback.name}.")
+            await self.primary.reset()
+            entries = []
+        if entries is not None and not entries:
+            METRICS.inc("arbys_source_fallbacks_total", source=self.primary.name)
+            return await self.fallback.fetch()
+        return entries
+
+    async def reset(self):
+        await self.primary.reset()
+        await self.fallback.reset()
+
+    async def close(self):
+        await self.primary.close()
+        await self.fallback.close()
+
+class ScrapeWorkerError(RuntimeError):
+    """Процесс скрапинга упал, завис или вернул ошибку."""
+
+class WorkerSource(ScheduleSource):
+    """Источник, который скрапит в дочернем процессе `main_bot.py --scrape-worker`.
+
+    Процесс запускается при первом fetch() и держится «тёплым» между
+    скрапингами. Протокол — JSON-строки: бот шлет {"op": "scrape", "id": n},
+    воркер отвечает {"op": "result", "id": n, "entries": [...]} (null на 304)
+    или {"op": "error", ...} и раз в SCRAPE_WORKER_HEARTBEAT_SECONDS шлет
+    пульс. Сторож убивает процесс вместе с Chromium, если пропал пульс или
+    RSS превысил SCRAPE_WORKER_MAX_RSS_MB; скрапинг дольше
+    SCRAPE_WORKER_WALL_SECONDS тоже убивает процесс. Плановый перезапуск
+    (после SCRAPE_WORKER_MAX_SCRAPES скрапингов или SCRAPE_WORKER_RECYCLE_MB)
+    делается только между скрапингами и штатной командой stop.
+    """
+
+    def __init__(self, name: str):
+        self.name = f"{name}@worker"
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._last_heartbeat = 0.0
+        self._scrapes = 0
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    def rss_bytes(self) -> int:
+        """RSS воркера вместе с драйвером Playwright и Chromium (0, если не запущен)."""
+        if not self.is_alive():
+            return 0
+        pid = self._process.pid
+        return read_rss_bytes(pid) + sum(read_rss_bytes(p) for p in descendant_pids(pid))
+
+    def _recycle_reason(self) -> Optional[str]:
+        if self._scrapes >= SCRAPE_WORKER_MAX_SCRAPES:
+            return "recycle_scrapes"
+        if self.rss_bytes() >= SCRAPE_WORKER_RECYCLE_MB * 2**20:
+            return "recycle_rss"
+        return None
+
+    async def _spawn(self):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), '--scrape-worker',
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=SCRAPE_WORKER_IPC_LIMIT,
+        )
+        self._process = process
+        self._last_heartbeat = time.monotonic()
+        self._scrapes = 0
+        self._tasks = [asyncio.create_task(self._read(process)), asyncio.create_task(self._watch(process))]
+        METRICS.inc("arbys_scrape_worker_starts_total")
+        print(f"[{time.strftime('%H:%M:%S')}] 🧩 Запущен процесс скрапинга (pid {process.pid}).")
+
+    def _send(self, process: asyncio.subprocess.Process, message: Dict[str, Any]):
+        try:
+            process.stdin.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+        except (ConnectionError, RuntimeError) as e:
+            raise ScrapeWorkerError(f"канал IPC закрыт: {e!r}") from e
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _read(self, process: asyncio.subprocess.Process):
+        """Читает ответы и пульс воркера; при выходе процесса будит ожидающих ошибкой."""
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                self._last_heartbeat = time.monotonic()
+                future = self._pending.pop(message.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (ValueError, ConnectionError) as e:
+            # ValueError — строка длиннее SCRAPE_WORKER_IPC_LIMIT; поток уже не разобрать
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Канал IPC процесса скрапинга сломан: {e!r}")
+        if process is self._process:
+            returncode = await process.wait()
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Процесс скрапинга завершился (код {returncode}).")
+            await self._stop("exited")
+
+    async def _watch(self, process: asyncio.subprocess.Process):
+        """Сторож: пропавший пульс или RSS выше предела — убиваем сразу;
+        плановый перезапуск — только пока воркер простаивает."""
+        while process.returncode is None:
+            await asyncio.sleep(SCRAPE_WORKER_HEARTBEAT_SECONDS)
+            if process is not self._process or process.returncode is not None:
+                return
+            silent = time.monotonic() - self._last_heartbeat
+            rss = self.rss_bytes()
+            if silent > SCRAPE_WORKER_HEARTBEAT_TIMEOUT_SECONDS:
+                print(f"[{time.strftime('%H:%M:%S')}] 🚨 Процесс скрапинга молчит {silent:.0f}с, перезапуск.")
+                await self._stop("heartbeat", graceful=False)
+            elif rss > SCRAPE_WORKER_MAX_RSS_MB * 2**20:
+                print(f"[{time.strftime('%H:%M:%S')}] 🚨 Процесс скрапинга занял {rss // 2**20} МБ, перезапуск.")
+                await self._stop("rss_limit", graceful=False)
+            elif not self._pending:
+                reason = self._recycle_reason()
+                if reason:
+                    await self._stop(reason)
+
+    async def _stop(self, reason: str, graceful: bool = True):
+        """Останавливает воркер: штатно (stop и ожидание) или сразу SIGKILL всему дереву."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        METRICS.inc("arbys_scrape_worker_stops_total", reason=reason)
+        if process.returncode is None and graceful:
+            try:
+                self._send(process, {"op": "stop"})
+                await asyncio.wait_for(process.wait(), timeout=SCRAPE_WORKER_STOP_SECONDS)
+            except (ScrapeWorkerError, asyncio.TimeoutError):
+                pass
+        if process.returncode is None:
+            # Потомков собираем до kill: после смерти воркера Chromium осиротеет
+            for pid in descendant_pids(process.pid) + [process.pid]:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            await process.wait()
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+        self._tasks = []
+        self._fail_pending(ScrapeWorkerError(f"процесс скрапинга остановлен ({reason})"))
+        if reason.startswith("recycle"):
+            print(f"[{time.strftime('%H:%M:%S')}] ♻️ Плановый перезапуск процесса скрапинга ({reason}).")
+
+    async def fetch(self) -> Optional[List[Sequence[Any]]]:
+        reason = self._recycle_reason() if self.is_alive() else None
+        if reason:
+            await self._stop(reason)
+        if not self.is_alive():
+            await self._spawn()
+        process = self._process
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._send(process, {"op": "scrape", "id": request_id})
+            message = await asyncio.wait_for(future, timeout=SCRAPE_WORKER_WALL_SECONDS)
+        except asyncio.TimeoutError:
+            if process is self._process:
+                await self._stop("wall_time", graceful=False)
+            raise ScrapeWorkerError(f"скрапинг не уложился в {SCRAPE_WORKER_WALL_SECONDS}с, процесс убит")
+        finally:
+            self._pending.pop(request_id, None)
+        self._scrapes += 1
+        if message.get('op') == 'error':
+            if message.get('timeout'):
+                raise PlaywrightTimeoutError(message.get('error', ''))
+            raise ScrapeWorkerError(message.get('error', ''))
+        return message.get('entries')
+
+    async def reset(self):
+        # Источник внутри воркера уже сброшен им самим (как без воркера);
+        # убивать процесс из-за обычной ошибки незачем — зависания и
+        # перерасход памяти обрабатывают сторож и fetch()
+        pass
+
+    async def close(self):
+        await self._stop("shutdown")
+
+def build_direct_source() -> ScheduleSource:
+    """Собирает источник данных по SCRAPE_SOURCE / HTTP_SOURCE_URL."""
+    browser_source = PlaywrightSource(BROWSER)
+    if SCRAPE_SOURCE == 'http' and HTTP_SOURCE_URL:
+        return FallbackSource(HttpSource(HTTP_SOURCE_URL), browser_source)
+    if SCRAPE_SOURCE == 'http':
+        print("⚠️ SCRAPE_SOURCE=http, но HTTP_SOURCE_URL не задан — используется браузер.")
+    return browser_source
+
+def build_schedule_source() -> ScheduleSource:
+    """Источник данных бота: в процессе скрапинга (или при SCRAPE_WORKER=0) —
+    сам источник, иначе — его обертка над дочерним процессом."""
+    source = build_direct_source()
+    if SCRAPE_WORKER and not SCRAPE_WORKER_MODE:
+        return WorkerSource(source.name)
+    return source
+
+SCHEDULE_SOURCE = build_schedule_source()
+METRICS.gauge("arbys_scrape_worker_rss_bytes",
+              lambda: SCHEDULE_SOURCE.rss_bytes() if isinstance(SCHEDULE_SOURCE, WorkerSource) else 0)
+
+async def run_scrape_worker():
+    """Главный цикл процесса скрапинга: команды из stdin, ответы и пульс в
+    SCRAPE_WORKER_IPC (бывший stdout). Закрытый stdin значит, что бот
+    завершился, — воркер закрывает источник и выходит.
+    """
+    def send(message: Dict[str, Any]):
+        SCRAPE_WORKER_IPC.write(json.dumps(message, ensure_ascii=False, separators=(',', ':')) + '\n')
+        SCRAPE_WORKER_IPC.flush()
+
+    loop = asyncio.get_running_loop()
+    commands_in = asyncio.StreamReader(limit=SCRAPE_WORKER_IPC_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(commands_in), sys.stdin)
+
+    async def heartbeat():
+        # Пульс идет из того же event loop, что и скрапинг: зависший loop замолчит
+        while True:
+            send({"op": "heartbeat"})
+            await asyncio.sleep(SCRAPE_WORKER_HEARTBEAT_SECONDS)
+
+    beat = asyncio.create_task(heartbeat())
+    try:
+        while True:
+            line = await commands_in.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message.get('op') == 'stop':
+                break
+            if message.get('op') != 'scrape':
+                continue
+            try:
+                entries = await SCHEDULE_SOURCE.fetch()
+            except Exception as e:
+                await SCHEDULE_SOURCE.reset()
+                send({"op": "error", "id": message['id'], "error": repr(e),
+                      "timeout": isinstance(e, PlaywrightTimeoutError)})
+                continue
+            send({"op": "result", "id": message['id'],
+                  "entries": None if entries is None else [list(entry) for entry in entries]})
+    finally:
+        beat.cancel()
+        await SCHEDULE_SOURCE.close()
+        await close_http_session()
+
+async def parse_warframe_state():
+    """Получение данных из источника и парсинг Арбитражей."""
+    print(f"[{time.strftime('%H:%M:%S')}] 🔄 Запуск скрапинга Арбитража ({SCHEDULE_SOURCE.name})...")
+    current_scrape_time = time.time()
+    try:
+        entries = await SCHEDULE_SOURCE.fetch()
+    except PlaywrightTimeoutError:
+        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Таймаут при загрузке данных.")
+        METRICS.inc("arbys_scrapes_total", result="timeout")
+        await SCHEDULE_SOURCE.reset()
+        return None
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] 🚨 Критическая ошибка скрапинга: {e}")
+        METRICS.inc("arbys_scrapes_total", result="error")
+        await SCHEDULE_SOURCE.reset()
+        return None
+
+    if entries is None:
+        # 304: расписание не изменилось — парсинг не нужен, кэш просто считается свежим
+        print(f"[{time.strftime('%H:%M:%S')}] ✅ Данные не изменились (304), используется кэш.")
+        METRICS.inc("arbys_scrapes_total", result="not_modified")
+        snapshot = publish_schedule(CURRENT_SCHEDULE.store, current_scrape_time)
+        if len(snapshot.store):
+            save_schedule_snapshot(snapshot)
+        return snapshot
+
+    with METRICS.span("parse"):
+        timeline = parse_arbitration_entries(entries)
+
+    if not timeline:
+        # Пустой результат не должен затирать уже закэшированное расписание
+        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Скрапинг не дал данных, используется кэш.")
+        METRICS.inc("arbys_scrapes_total", result="empty")
+        return None
+
+    METRICS.inc("arbys_scrapes_total", result="ok")
+
+    horizon = time.strftime('%d.%m %H:%M', time.gmtime(timeline[-1]['EndTimestamp']))
+    print(f"[{time.strftime('%H:%M:%S')}] ✅ Скрапинг завершен. Миссий: {len(timeline)}, горизонт до {horizon} UTC.")
+    snapshot = publish_schedule(ScheduleStore.from_missions(timeline), current_scrape_time)
+    save_schedule_snapshot(snapshot)
+    return snapshot
+
+async def run_scrape_cycle():
+    """Один скрапинг с общим таймаутом; зависший браузер сбрасывается.
+
+    Неудача не трогает кэш: канал продолжает показывать последнее удачное
+    расписание, а следующая попытка откладывается по SCRAPE_BACKOFF.
+    """
+    snapshot = None
+    try:
+        with METRICS.span("scrape"):
+            snapshot = await asyncio.wait_for(parse_warframe_state(), timeout=SCRAPE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Скрапинг не уложился в {SCRAPE_TIMEOUT_SECONDS}с, сброс источника данных.")
+        METRICS.inc("arbys_scrapes_total", result="timeout")
+        await SCHEDULE_SOURCE.reset()
+    if snapshot is not None:
+        SCRAPE_BACKOFF.record_success()
+        await archive_schedule(snapshot)
+    elif SCRAPE_BACKOFF.record_failure(time.time()):
+        # На время разомкнутой цепи браузер не нужен — освобождаем память
+        await SCHEDULE_SOURCE.reset()
+    return snapshot
+
+SCRAPE_TASK: Optional[asyncio.Task] = None
+
+def start_background_scrape() -> asyncio.Task:
+    """Запускает скрапинг фоновой задачей, если он еще не идет."""
+    global SCRAPE_TASK
+    if SCRAPE_TASK is None or SCRAPE_TASK.done():
+        SCRAPE_TASK = asyncio.create_task(run_scrape_cycle())
+    return SCRAPE_TASK
+
+
+# =================================================================
+# 4. ЛОГИКА ОБНОВЛЕНИЯ КАНАЛА
+# =================================================================
+
+# Кэш дескрипторов сообщений (без fetch_message) и хэшей последнего
+# отправленного содержимого: (channel_id, ключ сообщения) -> PartialMessage /
+# хэш рендера. Ключ сообщения различает ленты, публикуемые в один канал.
+MESSAGE_HANDLES: Dict[Tuple[int, str], discord.PartialMessage] = {}
+RENDER_HASHES: Dict[Tuple[int, str], str] = {}
+# Последняя задержка публикации по каналам (channel_id -> секунды)
+PUBLISH_LATENCIES: Dict[int, float] = {}
+
+def embed_fingerprint(embed: discord.Embed) -> str:
+    """Стабильный хэш embed (без поля timestamp); считается один раз на профиль."""
+    payload = embed.to_dict()
+    # Время обновления меняется каждый тик, но не является изменением данных
+    payload.pop('timestamp', None)
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def render_hash(content: Optional[str], embed: discord.Embed, fingerprint: Optional[str] = None) -> str:
+    """Стабильный хэш содержимого сообщения и embed."""
+    fingerprint = fingerprint or embed_fingerprint(embed)
+    return hashlib.sha1(f"{fingerprint}|{content or ''}".encode('utf-8')).hexdigest()
+
+class TokenBucket:
+    """Простой асинхронный token bucket для глобального лимита запросов к API."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# Глобальный лимит Discord — 50 запросов/с на бота; держимся с запасом.
+# Лимиты отдельных маршрутов (bucket на канал) discord.py соблюдает сам.
+DISCORD_RATE_LIMITER = TokenBucket(rate=DISCORD_GLOBAL_RATE_PER_SECOND, capacity=DISCORD_GLOBAL_RATE_PER_SECOND)
+
+def normalize_content(content: Optional[str]) -> Optional[str]:
+    """Пустой content не отправляем, чтобы не редактировать сообщение без необходимости."""
+    if content is None or content.strip() == "":
+        return None
+    return content
+
+async def send_or_edit_message(message_id_key: str, channel: discord.TextChannel, embed: discord.Embed, content: str = None,
+                               state: Optional[Dict[str, Any]] = None, digest: Optional[str] = None) -> str:
+    """Отправляет или редактирует сообщение в канале, если его содержимое изменилось.
+
+    ID сообщения хранится в state[message_id_key] (по умолчанию — общий STATE).
+    Возвращает 'skipped', 'edited', 'sent' или 'failed'.
+    """
+    state = STATE if state is None else state
+    content = normalize_content(content)
+    cache_key = (channel.id, message_id_key)
+    
+    try:
+        message_id = state.get(message_id_key) 
+        digest = digest or render_hash(content, embed)
+        
+        if message_id:
+            if RENDER_HASHES.get(cache_key) == digest:
+                METRICS.inc("arbys_discord_messages_total", result="skipped")
+                return 'skipped'  # Ничего не изменилось — запрос к API не нужен
+            
+            handle = MESSAGE_HANDLES.get(cache_key)
+            if handle is None or handle.id != message_id:
+                handle = channel.get_partial_message(message_id)
+                MESSAGE_HANDLES[cache_key] = handle
+            try:
+                await DISCORD_RATE_LIMITER.acquire()
+                with METRICS.span("discord_edit"):
+                    await handle.edit(content=content, embed=embed, view=None)
+                RENDER_HASHES[cache_key] = digest
+                METRICS.inc("arbys_discord_messages_total", result="edited")
+                return 'edited'
+            except discord.NotFound:
+                MESSAGE_HANDLES.pop(cache_key, None)
+                RENDER_HASHES.pop(cache_key, None)
+        
+        # Передаем content здесь
+        await DISCORD_RATE_LIMITER.acquire()
+        with METRICS.span("discord_send"):
+            sent_message = await channel.send(content=content, embed=embed)
+        state[message_id_key] = sent_message.id
+        MESSAGE_HANDLES[cache_key] = channel.get_partial_message(sent_message.id)
+        RENDER_HASHES[cache_key] = digest
+        save_state()
+        METRICS.inc("arbys_discord_messages_total", result="sent")
+        return 'sent'
+        
+    except discord.Forbidden:
+        print(f"[{time.strftime('%H:%M:%S')}] ❌ Нет прав для отправки/редактирования в канале {channel.name}.")
+    except Exception as e:
+        print(f"[{time.strftime('%H:%M:%S')}] 🚨 Ошибка при обновлении канала {channel.name}: {e}")
+        if isinstance(e, discord.HTTPException) and e.status == 400:
+             print(f"[{time.strftime('%H:%M:%S')}] 🚨 Ошибка HTTP 400: {e.text}")
+        if isinstance(e, discord.HTTPException) and e.status == 429:
+            METRICS.inc("arbys_discord_rate_limited_total")
+    METRICS.inc("arbys_discord_messages_total", result="failed")
+    return 'failed'
+
+
+def guild_settings(guild_id: int) -> Dict[str, Any]:
+    """Настройки гильдии из config.json (создаются при первом обращении)."""
+    return CONFIG.setdefault('GUILDS', {}).setdefault(str(guild_id), {})
+
+def guild_state(guild_id: int) -> Dict[str, Any]:
+    """Горячее состояние гильдии из state.json: ID сообщения, последняя нода."""
+    return STATE.setdefault('GUILDS', {}).setdefault(str(guild_id), {})
+
+def migrate_legacy_arbitration_channel(bot: commands.Bot):
+    """Переносит единственный глобальный ARBITRATION_CHANNEL_ID в настройки гильдии."""
+    legacy_id = CONFIG.get('ARBITRATION_CHANNEL_ID')
+    if not legacy_id:
+        return
+    channel = bot.get_channel(legacy_id)
+    if not channel or not getattr(channel, 'guild', None):
+        return  # Канал недоступен — попробуем при следующем on_ready
+    guild_settings(channel.guild.id).setdefault('ARBITRATION_CHANNEL_ID', legacy_id)
+    gstate = guild_state(channel.guild.id)
+    gstate.setdefault('ARBITRATION_MESSAGE_ID', STATE.pop('LAST_ARBITRATION_MESSAGE_ID', None))
+    gstate.setdefault('LAST_MENTIONED_NODE', STATE.pop('LAST_MENTIONED_NODE', None))
+    del CONFIG['ARBITRATION_CHANNEL_ID']
+    save_config()
+    save_state()
+    print(f"Канал Арбитража {legacy_id} перенесен в настройки гильдии {channel.guild.id}.")
+
+def arbitration_targets(bot: commands.Bot, guild_ids: Optional[Iterable[int]] = None) -> List[discord.TextChannel]:
+    """Все доступные каналы Арбитража по гильдиям (или только по указанным)."""
+    return channel_targets(bot, 'ARBITRATION_CHANNEL_ID', guild_ids)
+
+def channel_targets(bot: commands.Bot, channel_key: str,
+                    guild_ids: Optional[Iterable[int]] = None) -> List[discord.TextChannel]:
+    """Доступные каналы из настройки гильдий channel_key (или только по указанным гильдиям)."""
+    wanted = {str(g) for g in guild_ids} if guild_ids is not None else None
+    channels = []
+    for guild_id, settings in CONFIG.get('GUILDS', {}).items():
+        if wanted is not None and guild_id not in wanted:
+            continue
+        channel_id = settings.get(channel_key)
+        channel = bot.get_channel(channel_id) if channel_id else None
+        if channel and getattr(channel, 'guild', None):
+            channels.append(channel)
+    return channels
+
+# --- ПРОФИЛИ ОТРИСОВКИ (язык и часовой пояс гильдии) ---
+
+RenderProfile = Tuple[str, str]  # (язык, часовой пояс)
+TZ_OFFSET_RE = re.compile(r'^(?:UTC|GMT)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=None)
+def resolve_timezone(name: str) -> tzinfo:
+    """'UTC', 'UTC+3', '+05:30' или имя IANA ('Europe/Berlin'); ValueError для неизвестного."""
+    name = name.strip()
+    if name.upper() in ('UTC', 'GMT', 'Z'):
+        return timezone.utc
+    match = TZ_OFFSET_RE.match(name)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        # Настоящие пояса лежат в диапазоне UTC-12:00 … UTC+14:00
+        if int(minutes or 0) >= 60 or offset > timedelta(hours=14 if sign == '+' else 12):
+            raise ValueError(f"смещение вне диапазона: {name}")
+        return timezone(offset if sign == '+' else -offset)
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"неизвестный часовой пояс: {name}")
+
+def rendering_profile(guild_id: Optional[int]) -> RenderProfile:
+    """Профиль отрисовки гильдии: гильдии с одинаковым профилем делят один embed."""
+    settings = CONFIG.get('GUILDS', {}).get(str(guild_id), {}) if guild_id else {}
+    return settings.get('LOCALE', DEFAULT_LOCALE), settings.get('TIMEZONE', DEFAULT_TIMEZONE)
+
+def profile_strings(profile: RenderProfile) -> Dict[str, Any]:
+    return LOCALES.get(profile[0]) or LOCALES.get(DEFAULT_LOCALE) or LOCALES['ru']
+
+def profile_timezone(profile: RenderProfile) -> tzinfo:
+    try:
+        return resolve_timezone(profile[1])
+    except ValueError:
+        return resolve_timezone(DEFAULT_TIMEZONE)
+
+def timezone_label(profile: RenderProfile) -> str:
+    return profile_strings(profile)['timezones'].get(profile[1], profile[1])
+
+def localize_mission_type(mission_type: str, strings: Dict[str, Any]) -> str:
+    return strings['mission_types'].get(mission_type, mission_type)
+
+def localize_faction(faction: str, strings: Dict[str, Any]) -> str:
+    return strings['factions'].get(faction, faction)
+
+# --- ИНДЕКС «НОДА → РОЛЬ» ---
+
+def normalize_node_key(name: str) -> str:
+    """Ключ ноды для сопоставления: без регистра, диакритики, пробелов и знаков."""
+    folded = unicodedata.normalize('NFKD', name or '')
+    folded = ''.join(ch for ch in folded if not unicodedata.combining(ch))
+    return NON_ALNUM_RE.sub('', folded.lower())
+
+def role_node_key(role_name: str) -> str:
+    """Ключ ноды по соглашению об именах ролей: "Casta", "Арби Casta", "arby-casta (Ceres)"."""
+    name = ROLE_PLANET_SUFFIX_RE.sub('', role_name or '')
+    name = ROLE_NAME_PREFIX_RE.sub('', name)
+    return normalize_node_key(name)
+
+class NodeRoleIndex:
+    """Индекс ролей одной гильдии: поиск роли ноды за O(1).
+
+    Явные привязки из MAP_ROLES (глобальной и гильдии) важнее ролей,
+    найденных по соглашению об именах. Индекс обновляется точечно по
+    событиям создания/изменения/удаления ролей.
+    """
+
+    def __init__(self, guild: discord.Guild):
+        self.guild_id = guild.id
+        self.by_name: Dict[str, int] = {}    # ключ ноды -> роль (по имени роли)
+        self.explicit: Dict[str, int] = {}   # ключ ноды -> роль (ID из MAP_ROLES)
+        self.aliases: Dict[str, str] = {}    # ключ имени роли -> ключ ноды (имя роли из MAP_ROLES)
+        self.alias_roles: Dict[str, int] = {}  # ключ ноды -> роль, найденная по алиасу
+        self.role_keys: Dict[int, str] = {}  # роль -> ключ ноды в by_name
+        self.missing_reported: Set[str] = set()   # ноды без роли, о которых уже написали в лог
+
+        mapping = {**CONFIG.get('MAP_ROLES', {}), **guild_settings(guild.id).get('MAP_ROLES', {})}
+        role_ids = {role.id for role in guild.roles}
+        for node, target in mapping.items():
+            node_key = normalize_node_key(node)
+            if isinstance(target, int) or str(target).isdigit():
+                # ID роли другой гильдии (из глобальной MAP_ROLES) здесь не действует
+                if int(target) in role_ids:
+                    self.explicit[node_key] = int(target)
+            else:
+                self.aliases[normalize_node_key(str(target))] = node_key
+        for role in guild.roles:
+            self.add_role(role)
+
+    def add_role(self, role: discord.Role):
+        if role.is_default():
+            return
+        key = role_node_key(role.name)
+        if not key:
+            return
+        self.role_keys[role.id] = key
+        # При совпадении имен выигрывает первая роль, как и у discord.utils.get
+        self.by_name.setdefault(key, role.id)
+        alias_node = self.aliases.get(normalize_node_key(role.name))
+        if alias_node:
+            self.alias_roles[alias_node] = role.id
+
+    def remove_role(self, role: discord.Role, deleted: bool = True):
+        """Убирает роль из индекса; при переименовании (deleted=False) ID из MAP_ROLES остаются."""
+        key = self.role_keys.pop(role.id, None)
+        if key and self.by_name.get(key) == role.id:
+            del self.by_name[key]
+            # На это имя могла претендовать другая роль
+            for other_id, other_key in self.role_keys.items():
+                if other_key == key:
+                    self.by_name[key] = other_id
+                    break
+        for mapping in (self.alias_roles, self.explicit) if deleted else (self.alias_roles,):
+            for node_key, role_id in list(mapping.items()):
+                if role_id == role.id:
+                    del mapping[node_key]
+
+    def lookup(self, node_name: str) -> Optional[int]:
+        key = normalize_node_key(node_name)
+        return self.explicit.get(key) or self.alias_roles.get(key) or self.by_name.get(key)
+
+
+NODE_ROLE_INDEXES: Dict[int, NodeRoleIndex] = {}
+
+def node_role_index(guild: discord.Guild) -> NodeRoleIndex:
+    """Индекс гильдии; строится при первом обращении."""
+    index = NODE_ROLE_INDEXES.get(guild.id)
+    if index is None:
+        index = NODE_ROLE_INDEXES[guild.id] = NodeRoleIndex(guild)
+    return index
+
+def find_node_role_id(guild: discord.Guild, node_name: str) -> Optional[int]:
+    """ID роли для ноды в гильдии или None."""
+    return node_role_index(guild).lookup(node_name)
+
+def resolve_arbitration_mention(guild: discord.Guild, current_arb: Dict[str, Any]) -> Optional[str]:
+    """Упоминание роли ноды для активной миссии с учетом состояния гильдии."""
+    gstate = guild_state(guild.id)
+    is_active = current_arb.get('IsActive', False)
+    content_to_send: Optional[str] = None
+    node_name = current_arb.get('Node') 
+    
+    # --- Логика Уведомления и Удержания ---
+    current_node_key = f"{node_name}_{current_arb.get('StartTimestamp')}" if is_active else None
+    last_mentioned_key = gstate.get('LAST_MENTIONED_NODE')
+    
+    should_find_role = False
+    
+    if is_active and node_name:
+        
+        if current_node_key != last_mentioned_key:
+            # СЛУЧАЙ 1: НОВАЯ АКТИВНАЯ МИССИЯ (нужно уведомить и сохранить ключ)
+            should_find_role = True
+            gstate['LAST_MENTIONED_NODE'] = current_node_key
+            save_state()
+            
+        elif current_node_key == last_mentioned_key:
+            # СЛУЧАЙ 2: МИССИЯ ПРОДОЛЖАЕТСЯ (нужно только сохранить упоминание в сообщении)
+            should_find_role = True
+            
+    elif not is_active and last_mentioned_key:
+        # СЛУЧАЙ 3: МИССИЯ ЗАКОНЧИЛАСЬ (сбрасываем ключ, чтобы очистить упоминание)
+        gstate['LAST_MENTIONED_NODE'] = None
+        save_state()
+
+    
+    if should_find_role and node_name:
+        # Поиск по индексу гильдии (MAP_ROLES, затем имена ролей) — O(1)
+        role_id = find_node_role_id(guild, node_name)
+        
+        if role_id:
+            # Устанавливаем упоминание, которое будет отображаться (и уведомит только в СЛУЧАЕ 1)
+            content_to_send = f"<@&{role_id}>" 
+        else:
+            report_missing_node_role(guild, node_name)
+    return content_to_send
+
+def report_missing_node_role(guild: discord.Guild, node_name: str):
+    """Пишет в лог об отсутствии роли ноды — один раз на гильдию и ноду
+    (до перестройки индекса, например после смены MAP_ROLES)."""
+    index = node_role_index(guild)
+    node_key = normalize_node_key(node_name)
+    if node_key in index.missing_reported:
+        return
+    index.missing_reported.add(node_key)
+    print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Роль не найдена для ноды: {node_name} (гильдия {guild.id}). Добавьте ее в MAP_ROLES или назовите роль по ноде.")
+
+def build_arbitration_embed(data: Dict[str, Any], profile: Optional[RenderProfile] = None) -> discord.Embed:
+    """Строит embed Расписания Арбитражей из Current/Upcoming/Notable.
+
+    Язык подписей и часовой пояс времени берутся из профиля отрисовки
+    (по умолчанию — DEFAULT_LOCALE / DEFAULT_TIMEZONE).
+    """
+    profile = profile or (DEFAULT_LOCALE, DEFAULT_TIMEZONE)
+    strings = profile_strings(profile)
+    tz = profile_timezone(profile)
+    current_arb = data.get("Current", {})
+    upcoming = data.get("Upcoming", [])
+    
+    # 1. Определение цвета, тира и статуса
+    embed_tier = current_arb.get("Tier", "N/A").upper()
+    embed_color = TIER_COLORS.get(embed_tier, FALLBACK_COLOR)
+    tier_emoji = TIER_EMOJIS_FINAL.get(embed_tier, embed_tier) 
+    is_active = current_arb.get('IsActive', False)
+    target_ts = current_arb.get('TargetTimestamp')
+    
+    # 2. Эмодзи и Изображение Фракции
+    faction_code = current_arb.get('Tileset', 'N/A')
+    faction_emoji = FACTION_EMOJIS_FINAL.get(faction_code, FALLBACK_EMOJI)
+    faction_url = get_faction_image_url(faction_code)
+    
+    # 3. Получение эмодзи Кувы и Витуса
+    vitus_emoji_name = EMOJI_NAMES.get(VITUS_EMOJI_KEY)
+    kuva_emoji_name = EMOJI_NAMES.get(KUVA_EMOJI_KEY)
+    vitus_emoji = RESOLVED_EMOJIS.get(vitus_emoji_name, "⭐")
+    kuva_emoji = RESOLVED_EMOJIS.get(kuva_emoji_name, "⚡️")
+
+    # --- 3. EMBED CONSTRUCTION ---
+    embed = discord.Embed(
+        title=f"{vitus_emoji} {strings['title']}",
+        url="https://browse.wf/arbys", 
+        color=embed_color
+    )
+    
+    # --- A. Current / Next Active Mission ---
+    if current_arb.get("Name"):
+        
+        tier_display = f"{tier_emoji} {strings['tier']}" if embed_tier != "N/A" else ""
+        
+        # Нативный Discord-таймер: относительное время рисует клиент ("через 5 минут")
+        discord_timer = f"<t:{target_ts}:R>"
+        time_line = strings['ends' if is_active else 'starts'].format(timer=discord_timer)
+        title_line = f"{kuva_emoji} **{strings['current' if is_active else 'next']} ({tier_display}):**"
+            
+        description_value = (
+            f"**{localize_mission_type(current_arb['Name'], strings)}**\n"
+            f"{strings['location']}: **{current_arb.get('Location', 'N/A')}**\n"
+            f"{strings['enemy']}: {faction_emoji} **{localize_faction(faction_code, strings)}**\n"
+            f"{strings['bonus']}: **{current_arb.get('Bonus', 'N/A')}**\n"
+            f"{strings['time']}: **{time_line}**"
+        )
+        embed.add_field(name=title_line, value=description_value, inline=False)
+        
+        if faction_url:
+            embed.set_thumbnail(url=faction_url)
+        
+    else:
+        embed.description = strings['no_schedule']
+        embed.color = discord.Color.red()
+
+    # Источник недоступен давно: расписание детерминировано и остается верным,
+    # но показываем, от какого скрапинга оно
+    stale_since = data.get("StaleSince")
+    if stale_since:
+        stale_line = strings['stale'].format(when=f"<t:{stale_since}:R>")
+        embed.description = f"{embed.description}\n\n{stale_line}" if embed.description else stale_line
+        
+    # --- B. Upcoming Missions ---
+    upcoming_lines = []
+    UPCOMING_LIMIT = 5 
+    
+    for m in upcoming[:UPCOMING_LIMIT]:
+        upc_tier_emoji = TIER_EMOJIS_FINAL.get(m['Tier'], m['Tier'])
+        upc_faction_emoji = FACTION_EMOJIS_FINAL.get(m['Faction'], FALLBACK_EMOJI)
+        start_display = format_display_time(m['TargetTimestamp'], tz)
+        upcoming_lines.append(
+            f"{upc_tier_emoji} | {start_display} • {upc_faction_emoji} ({m['Location']}) <t:{m['TargetTimestamp']}:R>"
+        )
+        
+    embed.add_field(
+        name=f"\u200b\n{strings['upcoming_header']}", 
+        value="\n".join(upcoming_lines) if upcoming_lines else strings['no_upcoming'],
+        inline=False
+    )
+    
+    # --- C. Tier-Specific Highlights ---
+    notable = data.get("Notable", [])
+
+    embed.add_field(name="\u200b", value=strings['highlight_header'], inline=False)
+
+    for tier in HIGHLIGHT_TIERS:
+        next_mission = next((m for m in notable if m['Tier'].upper() == tier), None)
+        
+        tier_emoji = TIER_EMOJIS_FINAL.get(tier, tier)
+        field_name = strings['highlight_name'].format(tier=tier_emoji)
+        
+        if next_mission:
+            upc_faction_emoji = FACTION_EMOJIS_FINAL.get(next_mission['Faction'], FALLBACK_EMOJI)
+            next_timer = f"<t:{next_mission['TargetTimestamp']}:R>"
             field_value = (
                 f"{upc_faction_emoji} ({next_mission['Location']})\n"
-                f"начнется {next_timer}"
+                f"{strings['starts'].format(timer=next_timer)}"
             )
             embed.add_field(name=field_name, value=field_value, inline=True)
         else:
-            embed.add_field(name=field_name, value="Нет в ближайшем логе.", inline=True)
+            embed.add_field(name=field_name, value=strings['not_scheduled'], inline=True)
 
 
-    embed.set_footer(text=f"Обновлено: {time.strftime('%H:%M:%S')} | Данные: browse.wf/arbys | Время: МСК (UTC+3)")
-    
-    # ОТПРАВКА: content_to_send будет содержать упоминание, если миссия активна
-    await send_or_edit_message('LAST_ARBITRATION_MESSAGE_ID', arb_channel, embed, content=content_to_send)
+    # Время обновления показывает сам Discord (timestamp embed); в хэш рендера оно не входит
+    embed.timestamp = datetime.now(timezone.utc)
+    embed.set_footer(text=strings['footer'].format(tz=timezone_label(profile)))
+    return embed
+
+EMBED_RENDER_CACHE: "OrderedDict[tuple, Tuple[discord.Embed, str]]" = OrderedDict()
+SCHEDULE_DATA_CACHE: Dict[tuple, Dict[str, Any]] = {}  # Current/Upcoming для последнего schedule_key
+
+def cached_embed(content_key: tuple, profile: RenderProfile,
+                 render: Callable[[], discord.Embed]) -> Tuple[discord.Embed, str]:
+    """Embed и его отпечаток: один рендер на профиль, пока не сменится content_key."""
+    key = (content_key, profile)
+    cached = EMBED_RENDER_CACHE.get(key)
+    if cached is not None:
+        EMBED_RENDER_CACHE.move_to_end(key)
+        return cached
+    with METRICS.span("embed_render"):
+        embed = render()
+        cached = EMBED_RENDER_CACHE[key] = (embed, embed_fingerprint(embed))
+    if len(EMBED_RENDER_CACHE) > EMBED_CACHE_LIMIT:
+        EMBED_RENDER_CACHE.popitem(last=False)
+    return cached
+
+def cached_arbitration_embed(data: Dict[str, Any], schedule_key: tuple, profile: RenderProfile) -> Tuple[discord.Embed, str]:
+    """Embed канала Арбитражей: один рендер на профиль, пока не сменится schedule_key."""
+    return cached_embed(schedule_key, profile, lambda: build_arbitration_embed(data, profile))
+
+async def publish_messages(message_id_key: str, jobs: Sequence[tuple]) -> Tuple[List[str], Dict[int, float]]:
+    """Параллельно отправляет/редактирует сообщения (channel, embed, content, gstate, digest).
+
+    Возвращает статусы send_or_edit_message и задержку по каналам.
+    """
+    semaphore = asyncio.Semaphore(PUBLISH_CONCURRENCY)
+    latencies: Dict[int, float] = {}
+
+    async def publish(channel, embed, content, gstate, digest):
+        async with semaphore:
+            started = time.perf_counter()
+            status = await send_or_edit_message(message_id_key, channel, embed, content, state=gstate, digest=digest)
+            latencies[channel.id] = time.perf_counter() - started
+            return status
+
+    with METRICS.span("publish"):
+        statuses = await asyncio.gather(*(publish(*job) for job in jobs))
+    return list(statuses), latencies
+
+async def update_arbitration_channel(bot: commands.Bot, guild_ids: Optional[Iterable[int]] = None):
+    """Публикует Расписание Арбитражей во все настроенные каналы всех гильдий.
+
+    Embed строится один раз на профиль отрисовки (язык, часовой пояс) и
+    переиспользуется между итерациями; каналы, где содержимое не
+    изменилось, пропускаются без запросов к API, остальные обновляются
+    параллельно с ограничением PUBLISH_CONCURRENCY и глобальным лимитом.
+    """
+    channels = arbitration_targets(bot, guild_ids)
+    if not channels: return
+
+    now = time.time()
+    schedule = CURRENT_SCHEDULE
+    store = schedule.store
+    stale_since = schedule_stale_since(schedule, now)
+    # Embed меняется только вместе с версией расписания, текущей/следующей
+    # миссией, набором эмодзи и пометкой устаревания — это и есть ключ кэша
+    # вместе с профилем; пока он тот же, Current/Upcoming не пересчитываются
+    schedule_key = (
+        schedule.version, store.first_after(now), store.current_index(now) is not None,
+        EMOJI_SET_VERSION, stale_since,
+    )
+    data = SCHEDULE_DATA_CACHE.get(schedule_key)
+    if data is None:
+        with METRICS.span("schedule_build"):
+            data = build_arbitration_schedule(store, now)
+        data["StaleSince"] = stale_since
+        SCHEDULE_DATA_CACHE.clear()
+        SCHEDULE_DATA_CACHE[schedule_key] = data
+    current_arb = data.get("Current", {})
+    changed = []
+    skipped = 0
+
+    for channel in channels:
+        embed, fingerprint = cached_arbitration_embed(data, schedule_key, rendering_profile(channel.guild.id))
+        
+        # content будет содержать упоминание, если миссия активна
+        content = normalize_content(resolve_arbitration_mention(channel.guild, current_arb))
+        digest = render_hash(content, embed, fingerprint)
+        gstate = guild_state(channel.guild.id)
+        if gstate.get('ARBITRATION_MESSAGE_ID') and RENDER_HASHES.get((channel.id, 'ARBITRATION_MESSAGE_ID')) == digest:
+            skipped += 1
+            METRICS.inc("arbys_discord_messages_total", result="skipped")
+            continue
+        changed.append((channel, embed, content, gstate, digest))
+
+    if not changed: return
+
+    # Сначала каналы, где появилось/сменилось упоминание роли — это самые срочные правки
+    changed.sort(key=lambda job: job[2] is None)
+    statuses, latencies = await publish_messages('ARBITRATION_MESSAGE_ID', changed)
+
+    failed = statuses.count('failed')
+    slowest_id = max(latencies, key=latencies.get)
+    print(
+        f"[{time.strftime('%H:%M:%S')}] 📤 Публикация: каналов {len(channels)}, обновлено {len(changed) - failed}, "
+        f"без изменений {skipped}, ошибок {failed}. Самый медленный канал {slowest_id}: {latencies[slowest_id]:.2f}с"
+    )
+    PUBLISH_LATENCIES.update(latencies)
+
+def next_update_time(now: float) -> float:
+    """Когда снова обновлять канал: ближайшая граница миссии, срок скрапинга
+    (плановый или после паузы; пока кэш ждет скрапинга — через минуту),
+    уведомление или страховочный интервал — что наступит раньше."""
+    store = CURRENT_SCHEDULE.store
+    candidates = [now + UPDATE_SAFETY_INTERVAL_SECONDS]
+    if len(store):
+        current_pos = store.current_index(now)
+        if current_pos is not None:
+            candidates.append(store.starts[current_pos] + MISSION_DURATION_SECONDS)
+        next_pos = store.first_after(now)
+        if next_pos < len(store):
+            candidates.append(store.starts[next_pos])
+    # Плановый скрапинг или повтор после паузы; пока скрапинг идет в фоне,
+    # цикл разбудит watch_scrape, а если срок уже прошел — перепроверяем
+    # каждую минуту, не дожидаясь страховочного интервала
+    scrape_at = next_scrape_time(now)
+    candidates.append(scrape_at if scrape_at > now else now + UPDATE_RECHECK_SECONDS)
+    notify_at = NOTIFIER.next_due(now)
+    if notify_at is not None:
+        candidates.append(notify_at)
+    return min(t for t in candidates if t > now) + UPDATE_BOUNDARY_LAG_SECONDS
+
+class UpdateScheduler:
+    """Фоновый цикл обновления канала, управляемый событиями.
+
+    Вместо опроса раз в N секунд цикл спит до ближайшей границы миссии или
+    срока уведомления (next_update_time) и просыпается раньше, если фоновый
+    скрапинг принес изменившееся расписание.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running():
+            self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """Досрочно запускает следующую итерацию."""
+        self._wakeup.set()
+
+    def watch_scrape(self, scrape: asyncio.Task):
+        """Будит цикл, когда скрапинг завершится с изменившимся расписанием
+        или неудачей (чтобы пересчитать срок повтора и пометку устаревания)."""
+        previous_version = CURRENT_SCHEDULE.version
+
+        def on_done(task: asyncio.Task):
+            if task.cancelled():
+                return
+            if task.exception() is not None or task.result() is None:
+                METRICS.inc("arbys_update_wakeups_total", reason="scrape_failed")
+                self.wake()
+                return
+            if task.result().version != previous_version:
+                METRICS.inc("arbys_update_wakeups_total", reason="schedule_changed")
+                self.wake()
+
+        scrape.add_done_callback(on_done)
+
+    async def _update(self):
+        """Одна итерация: при необходимости скрапинг, затем обновление канала."""
+        if timeline_needs_refresh(time.time()):
+            scrape = SCRAPE_TASK
+            if scrape is None or scrape.done():
+                scrape = start_background_scrape()
+                self.watch_scrape(scrape)
+            # С кэшем (в том числе из снимка) канал обновляется сразу, а скрапинг
+            # идет в фоне; без кэша показывать нечего — ждем первый скрапинг.
+            if not len(CURRENT_SCHEDULE.store):
+                await scrape
+        await update_arbitration_channel(self.bot)
+        await NOTIFIER.run(self.bot, time.time())
+
+    async def _run(self):
+        while True:
+            # Сигнал, пришедший во время итерации, не теряется: wait() вернется сразу
+            self._wakeup.clear()
+            try:
+                await self._update()
+            except Exception as e:
+                # Одна неудачная итерация не должна останавливать конвейер навсегда
+                print(f"[{time.strftime('%H:%M:%S')}] 🚨 Ошибка конвейера обновления: {e}")
+
+            now = time.time()
+            wake_at = next_update_time(now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wake_at - now)
+            except asyncio.TimeoutError:
+                METRICS.inc("arbys_update_wakeups_total", reason="timer")
+
+    async def stop(self):
+        """Останавливает цикл и фоновый скрапинг, закрывает источник данных."""
+        tasks = [t for t in (self._task, SCRAPE_TASK) if t is not None and not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        await SCHEDULE_SOURCE.close()
+
+
+# --- ПОИСК ПО РАСПИСАНИЮ (!arbys / /arbys) ---
+
+# Фильтр команды -> поле ScheduleStore (нода и планета хранятся одной парой)
+QUERY_FILTER_FIELDS = {
+    "tier": "Tier", "type": "Type", "faction": "Faction",
+    "node": "Node", "planet": "Node", "bonus": "Bonus",
+}
+# Любое известное название типа (английское, сокращение, русское) -> имя в расписании
+MISSION_TYPE_LOOKUP = {
+    **{translated.lower(): MISSION_TYPE_ALIASES.get(name, name) for name, translated in MISSION_TYPE_TRANSLATIONS.items()},
+    **{name.lower(): MISSION_TYPE_ALIASES.get(name, name) for name in MISSION_TYPE_TRANSLATIONS},
+}
+QUERY_RENDER_CACHE: "OrderedDict[tuple, List[discord.Embed]]" = OrderedDict()
+
+def normalize_mission_type(value: str) -> str:
+    """Тип миссии в виде, в котором он лежит в расписании (английское имя)."""
+    return MISSION_TYPE_LOOKUP.get(value.strip().lower(), value.strip())
+
+def match_query_codes(store: ScheduleStore, name: str, value: str) -> List[int]:
+    """Коды значений поля, подходящие под пользовательский фильтр name=value."""
+    field = QUERY_FILTER_FIELDS[name]
+    needle = value.strip().lower()
+    table = store.tables[field]
+    if name == "tier":
+        wanted = set(needle.upper().replace(',', ' ').split())
+        return [code for code, tier in enumerate(table) if tier in wanted]
+    if name == "type":
+        # Принимаем и русское, и английское название; точное совпадение важнее частичного
+        canonical = normalize_mission_type(value).lower()
+        exact = [code for code, mission_type in enumerate(table) if mission_type.lower() == canonical]
+        return exact or [
+            code for code, mission_type in enumerate(table)
+            if needle in mission_type.lower() or needle in MISSION_TYPE_TRANSLATIONS.get(mission_type, '').lower()
+        ]
+    if name == "faction":
+        canonical = normalize_faction_name(value, '')
+        return [code for code, faction in enumerate(table) if faction == canonical or faction.lower().startswith(needle)]
+    if name in ("node", "planet"):
+        part = 0 if name == "node" else 1
+        return [code for code, pair in enumerate(table) if pair[part].lower().startswith(needle)]
+    return [code for code, bonus in enumerate(table) if needle in bonus.lower()]
+
+def query_schedule(store: ScheduleStore, filters: Dict[str, str], now: float) -> List[int]:
+    """Позиции миссий (текущей и будущих), подходящих под все фильтры."""
+    criteria: Dict[str, set] = {}
+    for name, value in filters.items():
+        field = QUERY_FILTER_FIELDS[name]
+        codes = set(match_query_codes(store, name, value))
+        criteria[field] = criteria[field] & codes if field in criteria else codes
+    return store.find(now, criteria)
+
+def query_result_line(mission: Dict[str, Any], profile: RenderProfile) -> str:
+    strings = profile_strings(profile)
+    tier_emoji = TIER_EMOJIS_FINAL.get(mission['Tier'], mission['Tier'])
+    faction_emoji = FACTION_EMOJIS_FINAL.get(mission['Faction'], FALLBACK_EMOJI)
+    start_display = format_display_time(mission['StartTimestamp'], profile_timezone(profile), '%d.%m %H:%M')
+    bonus = f" • {mission['Bonus']}" if mission['Bonus'] != 'N/A' else ""
+    return (
+        f"{tier_emoji} | {start_display} • **{localize_mission_type(mission['Type'], strings)}** • "
+        f"{faction_emoji} ({mission['Location']}){bonus} <t:{mission['StartTimestamp']}:R>"
+    )
+
+def render_query_pages(store: ScheduleStore, positions: Sequence[int], filters: Dict[str, str],
+                       profile: RenderProfile) -> List[discord.Embed]:
+    """Страницы результата запроса: по QUERY_PAGE_SIZE миссий на embed."""
+    strings = profile_strings(profile)
+    label = ", ".join(f"{strings['filters'][name]}: {value}" for name, value in filters.items()) or strings['query_all']
+    color = TIER_COLORS.get(store.mission(positions[0])['Tier'], FALLBACK_COLOR) if positions else FALLBACK_COLOR
+    page_count = max(1, math.ceil(len(positions) / QUERY_PAGE_SIZE))
+    pages = []
+    for page in range(page_count):
+        chunk = positions[page * QUERY_PAGE_SIZE:(page + 1) * QUERY_PAGE_SIZE]
+        embed = discord.Embed(
+            title=strings['query_title'].format(label=label),
+            url="https://browse.wf/arbys",
+            color=color,
+            description="\n".join(query_result_line(store.mission(pos), profile) for pos in chunk)
+            or strings['query_empty'],
+        )
+        embed.set_footer(text=strings['query_footer'].format(
+            page=page + 1, pages=page_count, found=len(positions), tz=timezone_label(profile)
+        ))
+        pages.append(embed)
+    return pages
+
+def render_schedule_query(filters: Dict[str, Optional[str]], now: float,
+                          profile: Optional[RenderProfile] = None) -> List[discord.Embed]:
+    """Результат запроса из LRU-кэша или свежая отрисовка.
+
+    Ключ — (нормализованный запрос, версия расписания, первая незавершенная
+    миссия, профиль отрисовки, набор эмодзи): пока расписание то же и ни
+    одна миссия не закончилась, одинаковые запросы не фильтруются и не
+    отрисовываются заново.
+    """
+    profile = profile or (DEFAULT_LOCALE, DEFAULT_TIMEZONE)
+    filters = {name: value.strip() for name, value in filters.items() if value and value.strip()}
+    schedule = CURRENT_SCHEDULE
+    store = schedule.store
+    key = (
+        tuple(sorted((name, value.lower()) for name, value in filters.items())),
+        schedule.version,
+        bisect_right(store.starts, now - MISSION_DURATION_SECONDS),
+        profile,
+        EMOJI_SET_VERSION,
+    )
+    pages = QUERY_RENDER_CACHE.get(key)
+    if pages is not None:
+        QUERY_RENDER_CACHE.move_to_end(key)
+        METRICS.inc("arbys_query_cache_total", result="hit")
+        return pages
+
+    METRICS.inc("arbys_query_cache_total", result="miss")
+    pages = render_query_pages(store, query_schedule(store, filters, now), filters, profile)
+    QUERY_RENDER_CACHE[key] = pages
+    if len(QUERY_RENDER_CACHE) > QUERY_CACHE_LIMIT:
+        QUERY_RENDER_CACHE.popitem(last=False)
+    return pages
+
+class QueryResultView(discord.ui.View):
+    """Кнопки листания страниц результата; нажимать их может только автор запроса."""
+
+    def __init__(self, pages: List[discord.Embed], author_id: int):
+        super().__init__(timeout=QUERY_VIEW_TIMEOUT_SECONDS)
+        self.pages = pages
+        self.author_id = author_id
+        self.page = 0
+        self.message: Optional[discord.Message] = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Листать может только автор запроса — используйте /arbys.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.pages[page], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+
+# --- ПОДПИСКИ И УВЕДОМЛЕНИЯ (!subscribe) ---
+
+def subscription_rules(config: Dict[str, Any]) -> Iterable[tuple]:
+    """Все правила подписок: ((guild_id, rule_id), правило)."""
+    for guild_id, settings in config.get('GUILDS', {}).items():
+        for rule_id, rule in settings.get('SUBSCRIPTIONS', {}).items():
+            yield (guild_id, rule_id), rule
+
+class SubscriptionIndex:
+    """Индекс правил подписок: миссия сверяется со всеми правилами за один проход.
+
+    Правило лежит в корзинах тех полей, которые оно ограничивает (тир, нода,
+    фракция, тип). Миссия собирает кандидатов из корзин своих значений, и
+    правило срабатывает, если совпали все его условия; перебора правил нет.
+    """
+
+    RULE_FIELDS = (('Tier', 'TIERS'), ('Node', 'NODE'), ('Faction', 'FACTION'), ('Type', 'TYPE'))
+
+    def __init__(self, rules: Iterable[tuple] = ()):
+        self.rules: Dict[tuple, Dict[str, Any]] = {}
+        self.buckets: Dict[str, Dict[str, List[tuple]]] = {field: {} for field, _ in self.RULE_FIELDS}
+        self.required: Dict[tuple, int] = {}
+        self.max_lead_seconds = 0
+        for key, rule in rules:
+            self.add(key, rule)
+
+    @staticmethod
+    def mission_value(field: str, mission: Dict[str, Any]) -> str:
+        value = mission[field]
+        return value.upper() if field == 'Tier' else value if field == 'Faction' else value.lower()
+
+    @staticmethod
+    def rule_value(field: str, value: str) -> str:
+        """Значение условия в том же виде, что mission_value (правила могли быть сохранены на русском)."""
+        if field == 'Faction':
+            return normalize_faction_name(value, '')
+        if field == 'Type':
+            return normalize_mission_type(value).lower()
+        return value.upper() if field == 'Tier' else value.lower()
+
+    def add(self, key: tuple, rule: Dict[str, Any]):
+        self.rules[key] = rule
+        required = 0
+        for field, rule_key in self.RULE_FIELDS:
+            values = rule.get(rule_key)
+            if not values:
+                continue
+            # Одно поле — одно совпадение: повторы после нормализации ('S' и 's',
+            # 'Оборона' и 'Defense') иначе засчитались бы в hits несколько раз
+            normalized = {self.rule_value(field, value) for value in (values if isinstance(values, list) else [values])}
+            for value in normalized:
+                self.buckets[field].setdefault(value, []).append(key)
+            required += 1
+        self.required[key] = required
+        self.max_lead_seconds = max(self.max_lead_seconds, rule.get('LEAD_MINUTES', 0) * 60)
+
+    def match(self, mission: Dict[str, Any]) -> List[tuple]:
+        hits: Dict[tuple, int] = {}
+        for field, _ in self.RULE_FIELDS:
+            for key in self.buckets[field].get(self.mission_value(field, mission), ()):
+                hits[key] = hits.get(key, 0) + 1
+        return [key for key, count in hits.items() if count == self.required[key]]
+
+class NotificationEngine:
+    """Сопоставляет миссии с подписками и доставляет уведомления через очередь.
+
+    Каждая миссия сверяется с правилами один раз на версию расписания и
+    набор правил. Сработавшие уведомления копятся в STATE['OUTBOX'] по
+    адресату (личка пользователя или канал Арбитража для ролей): несколько
+    совпадений для одного адресата уходят одним сообщением. Очередь
+    переживает перезапуск и отправляется с учетом глобального лимита.
+    """
+
+    def __init__(self):
+        self._index: Optional[SubscriptionIndex] = None
+        self._matches: Dict[int, List[tuple]] = {}
+        self._matches_version: Optional[int] = None
+
+    def invalidate(self):
+        """Сбрасывает индекс после изменения правил."""
+        self._index = None
+        self._matches_version = None
+
+    def _prepare(self, schedule: ScheduleSnapshot) -> SubscriptionIndex:
+        if self._index is None:
+            self._index = SubscriptionIndex(subscription_rules(CONFIG))
+        if self._matches_version != schedule.version:
+            self._matches = {}
+            self._matches_version = schedule.version
+        return self._index
+
+    def _candidates(self, schedule: ScheduleSnapshot, now: float, horizon: float) -> Iterable[tuple]:
+        """(позиция, ключ правила, срок уведомления) для незакончившихся миссий,
+        стартующих до horizon (идущая тоже: при lead 0 цикл просыпается после старта)."""
+        index = self._prepare(schedule)
+        store = schedule.store
+        first = bisect_right(store.starts, now - MISSION_DURATION_SECONDS)
+        for pos in range(first, bisect_right(store.starts, horizon)):
+            matched = self._matches.get(pos)
+            if matched is None:
+                matched = self._matches[pos] = index.match(store.mission(pos))
+            for key in matched:
+                yield pos, key, store.starts[pos] - index.rules[key].get('LEAD_MINUTES', 0) * 60
+
+    def next_due(self, now: float) -> Optional[float]:
+        """Ближайший будущий срок уведомления (не дальше следующей границы часа)."""
+        schedule = CURRENT_SCHEDULE
+        index = self._prepare(schedule)
+        if not index.rules:
+            return None
+        horizon = now + index.max_lead_seconds + MISSION_DURATION_SECONDS
+        due = [at for _, _, at in self._candidates(schedule, now, horizon) if at > now]
+        return min(due) if due else None
+
+    def collect(self, now: float) -> int:
+        """Кладет наступившие уведомления в очередь; возвращает их число."""
+        schedule = CURRENT_SCHEDULE
+        store = schedule.store
+        index = self._prepare(schedule)
+        if not index.rules:
+            return 0
+        outbox = STATE.setdefault('OUTBOX', {})
+        queued = 0
+        for pos, key, due_at in list(self._candidates(schedule, now, now + index.max_lead_seconds)):
+            start = store.starts[pos]
+            guild_id, rule_id = key
+            notified = guild_state(guild_id).setdefault('NOTIFIED', {})
+            if due_at > now or notified.get(rule_id, 0) >= start:
+                continue
+            rule = index.rules[key]
+            if rule['OWNER'] == 'role':
+                channel_id = guild_settings(guild_id).get('ARBITRATION_CHANNEL_ID')
+                if not channel_id:
+                    continue  # Не помечаем: уведомление уйдет, как только канал появится
+                target = f"channel:{channel_id}"
+            else:
+                target = f"user:{rule['TARGET_ID']}"
+            # Язык и пояс уведомления — по гильдии, где создано правило
+            entry = outbox.setdefault(target, {"GUILD": guild_id, "MISSIONS": [], "MENTIONS": [], "ATTEMPTS": 0})
+            if start not in entry["MISSIONS"]:
+                entry["MISSIONS"].append(start)
+            if rule['OWNER'] == 'role' and rule['TARGET_ID'] not in entry["MENTIONS"]:
+                entry["MENTIONS"].append(rule['TARGET_ID'])
+            notified[rule_id] = start
+            queued += 1
+        if queued:
+            save_state()
+        return queued
+
+    async def _deliver(self, bot: commands.Bot, target: str, entry: Dict[str, Any], now: float) -> str:
+        """Отправляет одно объединенное уведомление; 'sent', 'dropped' или 'retry'."""
+        store = CURRENT_SCHEDULE.store
+        missions = []
+        for start in sorted(entry["MISSIONS"]):
+            pos = bisect_left(store.starts, start)
+            if start + MISSION_DURATION_SECONDS > now and pos < len(store) and store.starts[pos] == start:
+                missions.append(store.mission(pos))
+        if not missions:
+            return 'dropped'  # Пока уведомление ждало, миссии уже закончились
+
+        profile = rendering_profile(entry.get("GUILD"))
+        strings = profile_strings(profile)
+        embed = discord.Embed(
+            title=strings['notify_title'],
+            url="https://browse.wf/arbys",
+            color=TIER_COLORS.get(missions[0]['Tier'], FALLBACK_COLOR),
+            description="\n".join(query_result_line(mission, profile) for mission in missions),
+        )
+        embed.set_footer(text=strings['notify_footer'].format(tz=timezone_label(profile)))
+        content = " ".join(f"<@&{role_id}>" for role_id in entry["MENTIONS"]) or None
+        kind, _, raw_id = target.partition(':')
+        try:
+            if kind == 'user':
+                # create_dm кэширует канал: повторные уведомления не тратят лишний запрос
+                channel = await bot.create_dm(discord.Object(id=int(raw_id)))
+            else:
+                channel = bot.get_channel(int(raw_id))
+                if channel is None:
+                    return 'dropped'
+            await DISCORD_RATE_LIMITER.acquire()
+            with METRICS.span("notify_send"):
+                await channel.send(content=content, embed=embed)
+            return 'sent'
+        except (discord.Forbidden, discord.NotFound):
+            return 'dropped'  # Закрытая личка или удаленный канал — повтор не поможет
+        except discord.HTTPException as e:
+            if e.status == 429:
+                METRICS.inc("arbys_discord_rate_limited_total")
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Не удалось отправить уведомление {target}: {e}")
+            return 'retry'
+
+    async def flush(self, bot: commands.Bot, now: float):
+        """Отправляет очередь уведомлений пачкой с ограничением параллельности."""
+        outbox = STATE.get('OUTBOX')
+        if not outbox:
+            return
+        semaphore = asyncio.Semaphore(PUBLISH_CONCURRENCY)
+        pending = list(outbox.items())
+
+        async def deliver(target, entry):
+            async with semaphore:
+                return await self._deliver(bot, target, entry, now)
+
+        results = await asyncio.gather(*(deliver(target, entry) for target, entry in pending))
+        for (target, entry), result in zip(pending, results):
+            if result == 'retry':
+                entry["ATTEMPTS"] += 1
+                if entry["ATTEMPTS"] < NOTIFY_MAX_ATTEMPTS:
+                    METRICS.inc("arbys_notifications_total", result="retry")
+                    continue
+                result = 'dropped'
+            METRICS.inc("arbys_notifications_total", result=result)
+            del outbox[target]
+        save_state()
+        sent = results.count('sent')
+        print(f"[{time.strftime('%H:%M:%S')}] 🔔 Уведомления: адресатов {len(pending)}, отправлено {sent}.")
+
+    async def run(self, bot: commands.Bot, now: float):
+        self.collect(now)
+        await self.flush(bot, now)
+
+NOTIFIER = NotificationEngine()
+
+
+# --- СТАТИСТИКА ПО АРХИВУ (!stats) ---
+
+STATS_TIERS = ("S", "A", "B", "C", "D", "F")
+STATS_CACHE: "OrderedDict[tuple, discord.Embed]" = OrderedDict()
+
+def stats_footer(profile: RenderProfile) -> Optional[str]:
+    span = ARCHIVE.span()
+    if span is None:
+        return None
+    first, last, count = span
+    tz = profile_timezone(profile)
+    return profile_strings(profile)['stats_footer'].format(
+        count=count, first=format_display_time(first, tz, '%d.%m.%Y'), last=format_display_time(last, tz, '%d.%m.%Y'),
+    )
+
+def render_tier_stats(node: Optional[str], profile: RenderProfile) -> discord.Embed:
+    strings = profile_strings(profile)
+    rows = ARCHIVE.tier_frequency(node)
+    title = strings['stats_tiers_node'].format(node=rows[0][0]) if node and rows else strings['stats_tiers_title']
+    embed = discord.Embed(title=title, color=TIER_COLORS["S"])
+    lines = [
+        f"**{name}** — " + " • ".join(f"{tier} {tiers[tier]}" for tier in STATS_TIERS if tiers.get(tier))
+        for name, tiers in rows
+    ]
+    embed.description = "\n".join(lines) if lines else strings['stats_empty']
+    return embed
+
+def render_gap_stats(tier: str, profile: RenderProfile) -> discord.Embed:
+    strings = profile_strings(profile)
+    gaps = ARCHIVE.tier_gaps(tier)
+    embed = discord.Embed(title=strings['stats_gaps_title'].format(tier=tier), color=TIER_COLORS.get(tier, FALLBACK_COLOR))
+    embed.description = strings['stats_gaps_body'].format(**gaps) if gaps else strings['stats_empty']
+    return embed
+
+def render_faction_stats(since: int, profile: RenderProfile) -> discord.Embed:
+    strings = profile_strings(profile)
+    rows = ARCHIVE.faction_mix(since)
+    tz = profile_timezone(profile)
+    embed = discord.Embed(
+        title=strings['stats_factions_title'].format(since=format_display_time(since, tz, '%d.%m.%Y')), color=FALLBACK_COLOR,
+    )
+    total = sum(count for _, count in rows)
+    embed.description = "\n".join(
+        f"{FACTION_EMOJIS_FINAL.get(faction, FALLBACK_EMOJI)} {localize_faction(faction, strings)}: "
+        f"**{count}** ({count * 100 / total:.0f}%)"
+        for faction, count in rows
+    ) if rows else strings['stats_empty']
+    return embed
+
+STATS_RENDERERS: Dict[str, Callable[[Any, RenderProfile], discord.Embed]] = {
+    "tiers": render_tier_stats, "gaps": render_gap_stats, "factions": render_faction_stats,
+}
+
+async def render_stats(kind: str, arg: Any, profile: RenderProfile) -> discord.Embed:
+    """Embed статистики архива; кэшируется, пока не изменится версия архива."""
+    key = (kind, arg, ARCHIVE.version, profile, EMOJI_SET_VERSION)
+    embed = STATS_CACHE.get(key)
+    if embed is not None:
+        STATS_CACHE.move_to_end(key)
+        METRICS.inc("arbys_stats_cache_total", result="hit")
+        return embed
+    METRICS.inc("arbys_stats_cache_total", result="miss")
+
+    def build() -> discord.Embed:
+        result = STATS_RENDERERS[kind](arg, profile)
+        footer = stats_footer(profile)
+        if footer:
+            result.set_footer(text=footer)
+        return result
+
+    with METRICS.span("stats_query"):
+        embed = STATS_CACHE[key] = await asyncio.to_thread(build)
+    if len(STATS_CACHE) > QUERY_CACHE_LIMIT:
+        STATS_CACHE.popitem(last=False)
+    return embed
+
+
+# --- ЛЕНТЫ: ТРЕЩИНЫ, КАСКАДЫ, СТАЛЬНОЙ ПУТЬ ---
+
+RELIC_TIERS = ("Lith", "Meso", "Neo", "Axi", "Requiem", "Omnia")
+
+class FissureItem(NamedTuple):
+    tier: str
+    mission_type: str
+    node: str
+    faction: str
+    steel_path: bool
+    expiry: int
+
+class SteelPathReward(NamedTuple):
+    reward: str
+    cost: Optional[int]
+    next_reward: Optional[str]
+    expiry: int
+
+def parse_iso_timestamp(value: Optional[str]) -> Optional[int]:
+    """UNIX-время из ISO-строки API ('2025-01-01T12:00:00.000Z'); None, если не разобрать."""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp())
+    except ValueError:
+        return None
+
+def truncate_lines(lines: Sequence[str], limit: int) -> str:
+    """Склеивает строки, пока влезают в limit символов (остаток — «…»)."""
+    result, length = [], 0
+    for line in lines:
+        if length + len(line) + 1 > limit:
+            result.append("…")
+            break
+        result.append(line)
+        length += len(line) + 1
+    return "\n".join(result)
+
+class Feed(abc.ABC):
+    """Лента, которая публикуется в собственный канал гильдии.
+
+    Лента объявляет путь в FEEDS_API_URL (ленты с общим путем получают один
+    ответ на всех), разбор ответа в кортеж элементов (extract), видимую на
+    момент now часть (view) и отрисовку (render). Канал берется из настройки
+    гильдии channel_key, ID сообщения хранится в ее состоянии под
+    message_key; отправка идет через send_or_edit_message, как у Арбитражей.
+    """
+
+    name = "base"
+    path = ""
+    channel_key = ""
+    message_key = ""
+    refresh_seconds = FISSURE_REFRESH_SECONDS
+
+    @abc.abstractmethod
+    def extract(self, payload: Any) -> tuple:
+        """Кортеж элементов ленты из ответа API."""
+
+    def view(self, data: tuple, now: float) -> tuple:
+        """Элементы, еще не истекшие к моменту now."""
+        return tuple(item for item in data if item.expiry > now)
+
+    def next_change(self, data: tuple, now: float) -> Optional[float]:
+        """Ближайшее истечение элемента (после него view меняется)."""
+        return min((item.expiry for item in data if item.expiry > now), default=None)
+
+    @abc.abstractmethod
+    def render(self, items: tuple, profile: RenderProfile) -> discord.Embed:
+        """Embed для видимых элементов."""
+
+class FissureFeed(Feed):
+    """Обычные разрывы Бездны и разрывы Стального Пути, по тирам реликвий."""
+
+    name = "fissures"
+    path = "/fissures"
+    channel_key = "FISSURE_CHANNEL_ID"
+    message_key = "FISSURE_MESSAGE_ID"
+    title_key, empty_key = "fissures_title", "fissures_empty"
+    emoji, color = "🌀", 0x9B59B6
+
+    def accepts(self, raw: Dict[str, Any]) -> bool:
+        return not raw.get('isStorm') and raw.get('missionType') != 'Void Cascade'
+
+    def extract(self, payload: Any) -> tuple:
+        items = []
+        for raw in payload if isinstance(payload, list) else []:
+            expiry = parse_iso_timestamp(raw.get('expiry'))
+            if expiry is None or raw.get('expired') or not self.accepts(raw):
+                continue
+            node = raw.get('node') or 'N/A'
+            mission_type = raw.get('missionType') or 'Unknown Mission'
+            items.append(FissureItem(
+                raw.get('tier') or '?', MISSION_TYPE_ALIASES.get(mission_type, mission_type), node,
+                normalize_faction_name(raw.get('enemy', ''), node), bool(raw.get('isHard')), expiry,
+            ))
+        tier_order = {tier: i for i, tier in enumerate(RELIC_TIERS)}
+        items.sort(key=lambda item: (tier_order.get(item.tier, len(RELIC_TIERS)), item.steel_path, item.expiry))
+        return tuple(items)
+
+    def item_line(self, item: FissureItem, strings: Dict[str, Any]) -> str:
+        mark = f"**[{strings['steel_path_mark']}]** " if item.steel_path else ""
+        faction_emoji = FACTION_EMOJIS_FINAL.get(item.faction, FALLBACK_EMOJI)
+        timer = f"<t:{item.expiry}:R>"
+        return (
+            f"{mark}{localize_mission_type(item.mission_type, strings)} — {item.node} "
+            f"{faction_emoji} {strings['expires'].format(timer=timer)}"
+        )
+
+    def render(self, items: tuple, profile: RenderProfile) -> discord.Embed:
+        strings = profile_strings(profile)
+        embed = discord.Embed(title=f"{self.emoji} {strings[self.title_key]}", color=self.color)
+        if not items:
+            embed.description = strings[self.empty_key]
+        groups: Dict[str, List[str]] = {}
+        for item in items:
+            groups.setdefault(item.tier, []).append(self.item_line(item, strings))
+        for tier, lines in groups.items():
+            embed.add_field(name=tier, value=truncate_lines(lines, FEED_FIELD_LENGTH), inline=False)
+        embed.timestamp = datetime.now(timezone.utc)
+        embed.set_footer(text=strings['feed_footer'])
+        return embed
+
+class CascadeFeed(FissureFeed):
+    """Каскады Бездны — те же разрывы с типом Void Cascade, в отдельном канале."""
+
+    name = "cascades"
+    channel_key = "CASCADE_CHANNEL_ID"
+    message_key = "CASCADE_MESSAGE_ID"
+    title_key, empty_key = "cascades_title", "cascades_empty"
+    emoji, color = "🌊", 0x1ABC9C
+
+    def accepts(self, raw: Dict[str, Any]) -> bool:
+        return raw.get('missionType') == 'Void Cascade'
+
+class SteelPathFeed(Feed):
+    """Еженедельная награда Тешина на Стальном Пути."""
+
+    name = "steel_path"
+    path = "/steelPath"
+    channel_key = "STEEL_PATH_CHANNEL_ID"
+    message_key = "STEEL_PATH_MESSAGE_ID"
+    refresh_seconds = STEEL_PATH_REFRESH_SECONDS
+
+    def extract(self, payload: Any) -> tuple:
+        if not isinstance(payload, dict):
+            return ()
+        current = payload.get('currentReward') or {}
+        expiry = parse_iso_timestamp(payload.get('expiry'))
+        if not current.get('name') or expiry is None:
+            return ()
+        rotation = [reward.get('name') for reward in payload.get('rotation') or [] if reward.get('name')]
+        next_reward = None
+        if current['name'] in rotation:
+            next_reward = rotation[(rotation.index(current['name']) + 1) % len(rotation)]
+        return (SteelPathReward(current['name'], current.get('cost'), next_reward, expiry),)
+
+    def view(self, data: tuple, now: float) -> tuple:
+        # Истекшая награда остается в канале до следующего запроса (он придет сразу после смены)
+        return data
+
+    def render(self, items: tuple, profile: RenderProfile) -> discord.Embed:
+        strings = profile_strings(profile)
+        embed = discord.Embed(title=f"⚔️ {strings['steel_path_title']}", color=0xC0392B)
+        for item in items:
+            timer = f"<t:{item.expiry}:R>"
+            value = f"**{item.reward}**"
+            if item.cost is not None:
+                value += f"\n{strings['steel_path_cost'].format(cost=item.cost)}"
+            value += f"\n{strings['steel_path_rotation'].format(timer=timer)}"
+            embed.add_field(name=strings['steel_path_reward'], value=value, inline=False)
+            if item.next_reward:
+                embed.add_field(name=strings['steel_path_next'], value=item.next_reward, inline=False)
+        embed.timestamp = datetime.now(timezone.utc)
+        embed.set_footer(text=strings['feed_footer'])
+        return embed
+
+FEEDS: Tuple[Feed, ...] = (FissureFeed(), CascadeFeed(), SteelPathFeed())
+FEEDS_BY_NAME = {feed.name: feed for feed in FEEDS}
+
+def migrate_legacy_feed_channels(bot: commands.Bot):
+    """Переносит глобальные каналы лент из config.json в настройки их гильдий."""
+    moved = False
+    for feed in FEEDS:
+        legacy_id = CONFIG.get(feed.channel_key)
+        channel = bot.get_channel(legacy_id) if legacy_id else None
+        if not channel or not getattr(channel, 'guild', None):
+            continue  # Канал недоступен — попробуем при следующем on_ready
+        guild_settings(channel.guild.id).setdefault(feed.channel_key, legacy_id)
+        del CONFIG[feed.channel_key]
+        moved = True
+        print(f"Канал ленты {feed.name} {legacy_id} перенесен в настройки гильдии {channel.guild.id}.")
+    if moved:
+        save_config()
+
+async def publish_feed(bot: commands.Bot, feed: Feed, items: tuple, guild_ids: Optional[Iterable[int]] = None):
+    """Публикует ленту во все настроенные для нее каналы (без запросов, если ничего не изменилось)."""
+    jobs = []
+    for channel in channel_targets(bot, feed.channel_key, guild_ids):
+        profile = rendering_profile(channel.guild.id)
+        embed, fingerprint = cached_embed((feed.name, items, EMOJI_SET_VERSION), profile, lambda: feed.render(items, profile))
+        digest = render_hash(None, embed, fingerprint)
+        gstate = guild_state(channel.guild.id)
+        if gstate.get(feed.message_key) and RENDER_HASHES.get((channel.id, feed.message_key)) == digest:
+            METRICS.inc("arbys_discord_messages_total", result="skipped")
+            continue
+        jobs.append((channel, embed, None, gstate, digest))
+    if not jobs:
+        return
+    statuses, _ = await publish_messages(feed.message_key, jobs)
+    failed = statuses.count('failed')
+    print(f"[{time.strftime('%H:%M:%S')}] 📤 Лента {feed.name}: обновлено каналов {len(jobs) - failed}, ошибок {failed}.")
+
+class FeedScheduler:
+    """Фоновый цикл лент: общие запросы, свои интервалы, свои каналы.
+
+    Ленты с общим путем API получают один ответ на цикл, запросы разных путей
+    идут параллельно через общую HTTP-сессию. Цикл спит до ближайшего срока
+    запроса или истечения элемента какой-либо ленты; пока ни в одной гильдии
+    не настроен канал ленты, ее данные не запрашиваются. После ошибки в
+    канале остаются последние удачные данные.
+    """
+
+    def __init__(self, bot: commands.Bot, feeds: Sequence[Feed]):
+        self.bot = bot
+        self.feeds = feeds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._data: Dict[str, tuple] = {}  # feed.name -> последние разобранные элементы
+        self._next_fetch: Dict[str, float] = {feed.name: 0.0 for feed in feeds}
+        self._validators: Dict[str, Dict[str, str]] = {}  # путь -> ETag / Last-Modified
+
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.is_running():
+            self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        self._wakeup.set()
+
+    def active_feeds(self) -> List[Feed]:
+        return [feed for feed in self.feeds if channel_targets(self.bot, feed.channel_key)]
+
+    async def _fetch(self, path: str) -> Any:
+        """Разобранный JSON по пути или None, если ответ не изменился (304)."""
+        result = await conditional_get(FEEDS_API_URL + path, self._validators.get(path, {}))
+        if result is None:
+            return None
+        body, _, validators = result
+        payload = json.loads(body)
+        self._validators[path] = validators
+        return payload
+
+    async def refresh(self, now: float, feeds: Sequence[Feed]):
+        """Запрашивает пути лент, чей срок настал, и обновляет их данные."""
+        paths = sorted({feed.path for feed in feeds if now >= self._next_fetch[feed.name]})
+        if not paths:
+            return
+        with METRICS.span("feed_fetch"):
+            results = dict(zip(paths, await asyncio.gather(*(self._fetch(p) for p in paths), return_exceptions=True)))
+        for path, result in results.items():
+            status = "error" if isinstance(result, Exception) else "not_modified" if result is None else "ok"
+            METRICS.inc("arbys_feed_fetches_total", path=path, result=status)
+            if status == "error":
+                print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Лента {path} недоступна: {result!r}")
+
+        for feed in feeds:
+            if feed.path not in results:
+                continue
+            result = results[feed.path]
+            next_fetch = now + feed.refresh_seconds
+            if isinstance(result, Exception):
+                next_fetch = now + FEED_RETRY_SECONDS
+            elif result is not None:
+                try:
+                    self._data[feed.name] = feed.extract(result)
+                except (AttributeError, TypeError, ValueError) as e:
+                    print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Не удалось разобрать ленту {feed.name}: {e!r}")
+                    next_fetch = now + FEED_RETRY_SECONDS
+            change_at = feed.next_change(self._data.get(feed.name, ()), now)
+            if change_at is not None:
+                # Истек элемент — на его месте, скорее всего, уже новый
+                next_fetch = min(next_fetch, change_at + UPDATE_BOUNDARY_LAG_SECONDS)
+            self._next_fetch[feed.name] = next_fetch
+
+    def next_wake(self, now: float, feeds: Sequence[Feed]) -> float:
+        candidates = [now + UPDATE_SAFETY_INTERVAL_SECONDS]
+        for feed in feeds:
+            candidates.append(self._next_fetch[feed.name])
+            change_at = feed.next_change(self._data.get(feed.name, ()), now)
+            if change_at is not None:
+                candidates.append(change_at + UPDATE_BOUNDARY_LAG_SECONDS)
+        return max(now + UPDATE_BOUNDARY_LAG_SECONDS, min(candidates))
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            feeds = []
+            try:
+                feeds = self.active_feeds()
+                now = time.time()
+                await self.refresh(now, feeds)
+                for feed in feeds:
+                    # Пока лента ни разу не загрузилась, канал не трогаем
+                    if feed.name in self._data:
+                        await publish_feed(self.bot, feed, feed.view(self._data[feed.name], now))
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] 🚨 Ошибка конвейера лент: {e}")
+
+            now = time.time()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.next_wake(now, feeds) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
 
 # =================================================================
 # 5. ОСНОВНОЙ КОД БОТА И КОМАНДЫ
 # =================================================================
 
-# Запуск скрапинга в отдельном потоке
-start_scraper()
-
 # Убедитесь, что намерение 'guilds' включено
 intents = discord.Intents.default()
 intents.message_content = True 
 intents.guilds = True 
 intents.emojis_and_stickers = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
 
-@tasks.loop(seconds=MISSION_UPDATE_INTERVAL_SECONDS)
-async def mission_update_task():
-    """Задача Discord Tasks для периодического обновления только канала Арбитража (каждые 5 минут)."""
-    await update_arbitration_channel(bot)
+class ArbitrationBot(commands.Bot):
+    """Бот с корректным завершением конвейера скрапинга и браузера."""
+
+    metrics_runner: Optional[web.AppRunner] = None
+
+    def command_tree_hash(self) -> str:
+        """Отпечаток слэш-команд в том виде, в каком они уходят в Discord."""
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands()]
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    async def sync_command_tree(self, force: bool = False) -> bool:
+        """Синхронизирует слэш-команды, только если они изменились с прошлого раза.
+
+        Глобальная синхронизация жестко ограничена лимитами Discord, поэтому
+        отпечаток последнего отправленного дерева хранится в state.json.
+        Возвращает True, если запрос к Discord был.
+        """
+        tree_hash = self.command_tree_hash()
+        if not force and STATE.get('COMMAND_TREE_HASH') == tree_hash:
+            return False
+        await self.tree.sync()
+        STATE['COMMAND_TREE_HASH'] = tree_hash
+        save_state()
+        return True
+
+    async def setup_hook(self):
+        self.metrics_runner = await start_metrics_server()
+        try:
+            # Регистрирует слэш-версии гибридных команд (/arbys)
+            if await self.sync_command_tree():
+                print("Слэш-команды синхронизированы с Discord.")
+        except discord.HTTPException as e:
+            print(f"⚠️ Не удалось синхронизировать слэш-команды: {e}")
+
+    async def close(self):
+        # Останавливаем конвейер и ждем, пока закроется Chromium
+        await UPDATE_SCHEDULER.stop()
+        await FEED_SCHEDULER.stop()
+        await close_http_session()
+        # Сбрасываем на диск все, что еще ждет фонового сохранения
+        SETTINGS_STORE.flush()
+        STATE_STORE.flush()
+        SNAPSHOT_STORE.flush()
+        ARCHIVE.close()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        await super().close()
+
+
+bot = ArbitrationBot(command_prefix='!', intents=intents)
+
+UPDATE_SCHEDULER = UpdateScheduler(bot)
+FEED_SCHEDULER = FeedScheduler(bot, FEEDS)
 
 @bot.event
 async def on_ready():
     print(f'Бот готов: {bot.user}')
     
-    # 1. Разрешение эмодзи
+    # 1. Разрешение эмодзи и перенос старой глобальной настройки канала
     resolve_custom_emojis(bot)
+    migrate_legacy_arbitration_channel(bot)
+    migrate_legacy_feed_channels(bot)
     
-    # 2. Ожидаем завершения первого скрапинга
-    while LAST_SCRAPE_TIME == 0:
-        await asyncio.sleep(1) 
-        
-    # 3. Запуск цикла
-    if CONFIG.get('ARBITRATION_CHANNEL_ID'):
-        print(f"Канал Арбитража настроен. Запуск цикла обновления ({MISSION_UPDATE_INTERVAL_SECONDS}с)...")
-        if not mission_update_task.is_running():
-             mission_update_task.start()
+    # 2. Запуск конвейера (скрапинг → обновление канала)
+    if not UPDATE_SCHEDULER.is_running():
+        print("Запуск цикла обновления (по границам миссий)...")
+        UPDATE_SCHEDULER.start()
+    FEED_SCHEDULER.start()
+    configured = len(arbitration_targets(bot))
+    if configured:
+        print(f"Каналов Арбитража настроено: {configured}.")
     else:
         print("Канал Арбитража не настроен. Используйте !set_arbitration_channel.")
 
 
+@bot.event
+async def on_guild_join(guild):
+    NODE_ROLE_INDEXES[guild.id] = NodeRoleIndex(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    NODE_ROLE_INDEXES.pop(guild.id, None)
+
+@bot.event
+async def on_guild_role_create(role):
+    if role.guild.id in NODE_ROLE_INDEXES:
+        NODE_ROLE_INDEXES[role.guild.id].add_role(role)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name and after.guild.id in NODE_ROLE_INDEXES:
+        index = NODE_ROLE_INDEXES[after.guild.id]
+        index.remove_role(before, deleted=False)
+        index.add_role(after)
+
+@bot.event
+async def on_guild_role_delete(role):
+    if role.guild.id in NODE_ROLE_INDEXES:
+        NODE_ROLE_INDEXES[role.guild.id].remove_role(role)
+
+
 @bot.command(name='set_arbitration_channel')
+@commands.guild_only()
 @commands.has_permissions(manage_guild=True)
 async def set_arbitration_channel(ctx):
-    """Устанавливает текущий канал как канал Расписания Арбитражей."""
-    CONFIG['ARBITRATION_CHANNEL_ID'] = ctx.channel.id
-    save_config()
+    """Устанавливает текущий канал как канал Расписания Арбитражей этой гильдии."""
+    settings = guild_settings(ctx.guild.id)
+    if settings.get('ARBITRATION_CHANNEL_ID') != ctx.channel.id:
+        settings['ARBITRATION_CHANNEL_ID'] = ctx.channel.id
+        # Сообщение в старом канале больше не редактируем — в новом создастся свое
+        guild_state(ctx.guild.id).pop('ARBITRATION_MESSAGE_ID', None)
+        save_config()
+        save_state()
     
-    if not mission_update_task.is_running():
-        if not RESOLVED_EMOJIS: resolve_custom_emojis(bot) 
-        while LAST_SCRAPE_TIME == 0:
-            await asyncio.sleep(1)
-        mission_update_task.start()
-        
-    await update_arbitration_channel(bot)
+    if not RESOLVED_EMOJIS: resolve_custom_emojis(bot) 
+    UPDATE_SCHEDULER.start()
+    
+    # Если данных еще нет, конвейер сам обновит канал сразу после первого скрапинга
+    if CURRENT_SCHEDULE.scraped_at:
+        await update_arbitration_channel(bot, guild_ids=[ctx.guild.id])
     await ctx.send(f"✅ Канал **Расписания Арбитражей** установлен на: {ctx.channel.mention} и запущен.", delete_after=10)
 
+@bot.command(name='set_feed_channel')
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def set_feed_channel(ctx, feed_name: str):
+    """Публикует ленту (fissures, cascades, steel_path) в текущий канал гильдии."""
+    feed = FEEDS_BY_NAME.get(feed_name.strip().lower())
+    if feed is None:
+        await ctx.send(f"❌ Неизвестная лента `{feed_name}`. Доступны: {', '.join(FEEDS_BY_NAME)}.", delete_after=15)
+        return
+    settings = guild_settings(ctx.guild.id)
+    if settings.get(feed.channel_key) != ctx.channel.id:
+        settings[feed.channel_key] = ctx.channel.id
+        guild_state(ctx.guild.id).pop(feed.message_key, None)
+        save_config()
+        save_state()
+    FEED_SCHEDULER.start()
+    FEED_SCHEDULER.wake()
+    await ctx.send(f"✅ Лента **{feed.name}** публикуется в {ctx.channel.mention}.", delete_after=10)
+
+@bot.command(name='remove_feed_channel')
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def remove_feed_channel(ctx, feed_name: str):
+    """Отключает публикацию ленты в этой гильдии."""
+    feed = FEEDS_BY_NAME.get(feed_name.strip().lower())
+    if feed is None or guild_settings(ctx.guild.id).pop(feed.channel_key, None) is None:
+        await ctx.send(f"❌ Лента `{feed_name}` в этой гильдии не настроена.", delete_after=15)
+        return
+    guild_state(ctx.guild.id).pop(feed.message_key, None)
+    save_config()
+    save_state()
+    await ctx.send(f"✅ Лента **{feed.name}** отключена.", delete_after=10)
+
+@bot.command(name='set_timezone')
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def set_timezone(ctx, *, name: str):
+    """Часовой пояс расписания гильдии: UTC+3, +05:30 или имя IANA (Europe/Berlin)."""
+    try:
+        tz = resolve_timezone(name)
+    except ValueError:
+        await ctx.send(f"❌ Неизвестный часовой пояс `{name}`. Примеры: UTC+3, UTC-5, Europe/Berlin.", delete_after=15)
+        return
+    guild_settings(ctx.guild.id)['TIMEZONE'] = name.strip()
+    save_config()
+    await update_arbitration_channel(bot, guild_ids=[ctx.guild.id])
+    sample = format_display_time(int(time.time()), tz)
+    await ctx.send(f"✅ Часовой пояс: **{name.strip()}** (сейчас {sample}).", delete_after=10)
+
+@bot.command(name='set_language')
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def set_language(ctx, locale: str):
+    """Язык расписания гильдии: ru или en."""
+    locale = locale.strip().lower()
+    if locale not in LOCALES:
+        await ctx.send(f"❌ Доступные языки: {', '.join(LOCALES)}.", delete_after=15)
+        return
+    guild_settings(ctx.guild.id)['LOCALE'] = locale
+    save_config()
+    await update_arbitration_channel(bot, guild_ids=[ctx.guild.id])
+    await ctx.send(f"✅ Язык расписания: **{locale}**.", delete_after=10)
+
+@bot.command(name='sync')
+@commands.is_owner()
+async def sync_commands(ctx):
+    """Принудительно синхронизирует слэш-команды с Discord (только владелец бота)."""
+    try:
+        await bot.sync_command_tree(force=True)
+    except discord.HTTPException as e:
+        await ctx.send(f"❌ Не удалось синхронизировать слэш-команды: {e}", delete_after=15)
+        return
+    await ctx.send("✅ Слэш-команды синхронизированы.", delete_after=10)
+
+class ScheduleQueryFlags(commands.FlagConverter):
+    """Фильтры поиска: !arbys tier: S type: Оборона faction: Зараженные"""
+
+    tier: Optional[str] = commands.flag(default=None, description="Тир, можно несколько: S, A")
+    mission_type: Optional[str] = commands.flag(name='type', default=None, description="Тип миссии (Оборона / Defense)")
+    faction: Optional[str] = commands.flag(default=None, description="Фракция (Зараженные / Infested)")
+    node: Optional[str] = commands.flag(default=None, description="Нода (начало названия)")
+    planet: Optional[str] = commands.flag(default=None, description="Планета")
+    bonus: Optional[str] = commands.flag(default=None, description="Бонус (часть текста)")
+
+@bot.hybrid_command(name='arbys', description="Поиск Арбитражей в расписании на 30 дней")
+async def arbys_query(ctx, *, flags: ScheduleQueryFlags):
+    """Ищет Арбитражи по тиру, типу, фракции, ноде, планете и бонусу."""
+    if not len(CURRENT_SCHEDULE.store):
+        await ctx.send("Расписание еще не загружено, попробуйте чуть позже.", ephemeral=True)
+        return
+    filters = {
+        "tier": flags.tier, "type": flags.mission_type, "faction": flags.faction,
+        "node": flags.node, "planet": flags.planet, "bonus": flags.bonus,
+    }
+    pages = render_schedule_query(filters, time.time(), rendering_profile(ctx.guild.id if ctx.guild else None))
+    if len(pages) == 1:
+        await ctx.send(embed=pages[0])
+        return
+    view = QueryResultView(pages, ctx.author.id)
+    view.message = await ctx.send(embed=pages[0], view=view)
+
+async def send_stats(ctx, kind: str, arg: Any):
+    profile = rendering_profile(ctx.guild.id if ctx.guild else None)
+    await ctx.send(embed=await render_stats(kind, arg, profile))
+
+@bot.hybrid_group(name='stats', invoke_without_command=True, description="Статистика ротаций Арбитражей по архиву")
+async def stats(ctx):
+    """Статистика по архиву: !stats tiers [нода], !stats gaps [тир], !stats factions [дней]"""
+    await send_stats(ctx, "tiers", None)
+
+@stats.command(name='tiers', description="Частота тиров по нодам")
+async def stats_tiers(ctx, *, node: Optional[str] = None):
+    """Частота тиров по одной ноде или по нодам с наибольшим числом S."""
+    await send_stats(ctx, "tiers", node.strip() if node else None)
+
+@stats.command(name='gaps', description="Интервалы между миссиями тира")
+async def stats_gaps(ctx, tier: str = "S"):
+    """Средний, медианный и крайние интервалы между миссиями тира."""
+    await send_stats(ctx, "gaps", tier.strip().upper())
+
+@stats.command(name='factions', description="Доля фракций за последние дни")
+async def stats_factions(ctx, days: int = 30):
+    """Сколько миссий было против каждой фракции за последние days дней."""
+    days = max(1, min(days, 3650))
+    # Граница по началу суток: в пределах дня ключ кэша не меняется
+    since = (int(time.time()) // 86400 - days) * 86400
+    await send_stats(ctx, "factions", since)
+
+class SubscriptionFlags(commands.FlagConverter):
+    """Условия подписки: !subscribe tier: S,A faction: Зараженные lead: 10"""
+
+    tier: Optional[str] = commands.flag(default=None, description="Тиры через запятую: S, A")
+    mission_type: Optional[str] = commands.flag(name='type', default=None, description="Тип миссии (Выживание / Survival)")
+    faction: Optional[str] = commands.flag(default=None, description="Фракция (Зараженные / Infested)")
+    node: Optional[str] = commands.flag(default=None, description="Нода (точное название)")
+    lead: int = commands.flag(default=NOTIFY_DEFAULT_LEAD_MINUTES, description="За сколько минут до старта уведомить")
+    role: Optional[discord.Role] = commands.flag(default=None, description="Уведомлять роль в канале Арбитража (нужно право управлять ролями)")
+
+def describe_subscription(rule: Dict[str, Any]) -> str:
+    parts = []
+    if rule.get('TIERS'):
+        parts.append(f"тир {'/'.join(rule['TIERS'])}")
+    if rule.get('TYPE'):
+        parts.append(f"тип {rule['TYPE']}")
+    if rule.get('FACTION'):
+        parts.append(f"враг {rule['FACTION']}")
+    if rule.get('NODE'):
+        parts.append(f"нода {rule['NODE']}")
+    target = f"<@&{rule['TARGET_ID']}>" if rule['OWNER'] == 'role' else "в личку"
+    return f"{', '.join(parts)} — за {rule['LEAD_MINUTES']} мин, {target}"
+
+@bot.hybrid_command(name='subscribe', description="Подписка на уведомления об Арбитражах")
+@commands.guild_only()
+async def subscribe(ctx, *, flags: SubscriptionFlags):
+    """Создает правило уведомлений по тиру, типу, фракции и/или ноде."""
+    rule: Dict[str, Any] = {"LEAD_MINUTES": flags.lead}
+    if flags.tier:
+        tiers = sorted(set(flags.tier.upper().replace(',', ' ').split()))
+        unknown = [tier for tier in tiers if tier not in TIER_COLORS]
+        if unknown:
+            await ctx.send(f"Неизвестный тир: {', '.join(unknown)}. Доступны: {', '.join(TIER_COLORS)}.", ephemeral=True)
+            return
+        rule['TIERS'] = tiers
+    if flags.mission_type:
+        rule['TYPE'] = normalize_mission_type(flags.mission_type)
+    if flags.faction:
+        faction = normalize_faction_name(flags.faction, '')
+        if faction == 'N/A':
+            await ctx.send("Неизвестная фракция. Примеры: Гринир, Корпус, Зараженные, Орокин (или Grineer, Corpus...).", ephemeral=True)
+            return
+        rule['FACTION'] = faction
+    if flags.node:
+        rule['NODE'] = flags.node.strip().lower()
+    if len(rule) == 1:
+        await ctx.send("Укажите хотя бы одно условие: tier, type, faction или node.", ephemeral=True)
+        return
+    if not 0 <= flags.lead <= NOTIFY_MAX_LEAD_MINUTES:
+        await ctx.send(f"lead должен быть от 0 до {NOTIFY_MAX_LEAD_MINUTES} минут.", ephemeral=True)
+        return
+    if flags.role is not None:
+        if not ctx.author.guild_permissions.manage_roles:
+            await ctx.send("Подписывать роли могут только участники с правом управлять ролями.", ephemeral=True)
+            return
+        rule.update(OWNER='role', TARGET_ID=flags.role.id)
+    else:
+        rule.update(OWNER='user', TARGET_ID=ctx.author.id)
+
+    settings = guild_settings(ctx.guild.id)
+    rule_id = str(settings.get('NEXT_SUBSCRIPTION_ID', 1))
+    settings['NEXT_SUBSCRIPTION_ID'] = int(rule_id) + 1
+    settings.setdefault('SUBSCRIPTIONS', {})[rule_id] = rule
+    # Уже идущие и наступившие миссии не присылаем задним числом
+    guild_state(ctx.guild.id).setdefault('NOTIFIED', {})[rule_id] = int(time.time()) + rule['LEAD_MINUTES'] * 60
+    save_config()
+    save_state()
+    NOTIFIER.invalidate()
+    UPDATE_SCHEDULER.wake()
+    await ctx.send(f"🔔 Подписка #{rule_id}: {describe_subscription(rule)}.", ephemeral=True)
+
+@bot.hybrid_command(name='subscriptions', description="Ваши подписки и подписки ролей на сервере")
+@commands.guild_only()
+async def list_subscriptions(ctx):
+    """Показывает подписки автора и ролей этой гильдии."""
+    rules = guild_settings(ctx.guild.id).get('SUBSCRIPTIONS', {})
+    lines = [
+        f"**#{rule_id}** {describe_subscription(rule)}"
+        for rule_id, rule in rules.items()
+        if rule['OWNER'] == 'role' or rule['TARGET_ID'] == ctx.author.id
+    ]
+    await ctx.send("\n".join(lines) if lines else "Подписок нет. Создайте: !subscribe tier: S", ephemeral=True)
+
+@bot.hybrid_command(name='unsubscribe', description="Удалить подписку по номеру")
+@commands.guild_only()
+async def unsubscribe(ctx, rule_id: int):
+    """Удаляет свою подписку (или подписку роли — с правом управлять ролями)."""
+    rules = guild_settings(ctx.guild.id).get('SUBSCRIPTIONS', {})
+    rule = rules.get(str(rule_id))
+    allowed = rule is not None and (
+        rule['TARGET_ID'] == ctx.author.id if rule['OWNER'] == 'user' else ctx.author.guild_permissions.manage_roles
+    )
+    if not allowed:
+        await ctx.send(f"Подписка #{rule_id} не найдена среди ваших.", ephemeral=True)
+        return
+    del rules[str(rule_id)]
+    guild_state(ctx.guild.id).get('NOTIFIED', {}).pop(str(rule_id), None)
+    save_config()
+    save_state()
+    NOTIFIER.invalidate()
+    await ctx.send(f"Подписка #{rule_id} удалена.", ephemeral=True)
+
 if __name__ == '__main__':
-    if not BOT_TOKEN:
+    if SCRAPE_WORKER_MODE:
+        asyncio.run(run_scrape_worker())
+    elif not BOT_TOKEN:
         print("\n\n-- КРИТИЧЕСКАЯ ОШИБКА --")
         print("Переменная окружения 'DISCORD_BOT_TOKEN' не установлена.")
         print("Пожалуйста, установите ее в настройках Render Environment.")
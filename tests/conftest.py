@@ -0,0 +1,43 @@
+"""Общая настройка тестов.
+
+main_bot при импорте читает и пересохраняет свои файлы (config.json и др.)
+в текущем каталоге — тесты запускаются во временном, чтобы не трогать рабочие.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TESTS_DIR)
+
+sys.path.insert(0, REPO_DIR)
+os.chdir(tempfile.mkdtemp(prefix='arbys-tests-'))
+
+HOUR = 3600
+BASE = 1_800_000_000 - 1_800_000_000 % HOUR  # Начало часа, как у настоящих миссий
+
+
+def mission(start: int, tier: str = "C", node: str = "Casta", planet: str = "Ceres",
+            mission_type: str = "Defense", faction: str = "Grineer", bonus: str = "N/A"):
+    """Миссия в формате парсера (parse_arbitration_entries)."""
+    return {
+        "Tier": tier,
+        "Type": mission_type,
+        "Faction": faction,
+        "Node": node,
+        "Planet": planet,
+        "Location": f"{node}, {planet}",
+        "Bonus": bonus,
+        "StartTimestamp": start,
+        "EndTimestamp": start + HOUR,
+    }
+
+@pytest.fixture
+def hourly():
+    """Фабрика почасового таймлайна с BASE: hourly(hours, overrides={час: поля})."""
+    def build(hours: int, overrides=None):
+        overrides = overrides or {}
+        return [mission(BASE + h * HOUR, **overrides.get(h, {})) for h in range(hours)]
+    return build
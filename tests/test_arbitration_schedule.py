@@ -0,0 +1,30 @@
+"""build_arbitration_schedule: Current/Upcoming/Notable на момент now."""
+import main_bot as mb
+from conftest import BASE, HOUR, mission
+
+
+def test_notable_tier_days_ahead_is_found(hourly):
+    # Единственный S-тир через 100 часов все равно попадает в Notable
+    store = mb.ScheduleStore.from_missions(hourly(120, {100: {"tier": "S", "node": "Io"}}))
+    schedule = mb.build_arbitration_schedule(store, BASE + 30 * 60)
+
+    notable = [(m["Tier"], m["TargetTimestamp"]) for m in schedule["Notable"]]
+    assert notable == [("S", BASE + 100 * HOUR)]
+    assert len(schedule["Upcoming"]) == mb.UPCOMING_CACHE_LIMIT
+
+def test_current_is_next_mission_between_missions():
+    store = mb.ScheduleStore.from_missions([mission(BASE), mission(BASE + 3 * HOUR, tier="A")])
+    schedule = mb.build_arbitration_schedule(store, BASE + 2 * HOUR)
+
+    assert schedule["Current"]["IsActive"] is False
+    assert schedule["Current"]["StartTimestamp"] == BASE + 3 * HOUR
+    assert schedule["Upcoming"] == []
+    assert schedule["Notable"] == []  # Текущая (следующая) миссия в Notable не дублируется
+
+def test_active_mission_counts_down_to_its_end():
+    store = mb.ScheduleStore.from_missions([mission(BASE, tier="B"), mission(BASE + HOUR)])
+    schedule = mb.build_arbitration_schedule(store, BASE + 10 * 60)
+
+    assert schedule["Current"]["IsActive"] is True
+    assert schedule["Current"]["TargetTimestamp"] == BASE + HOUR
+    assert [m["TargetTimestamp"] for m in schedule["Upcoming"]] == [BASE + HOUR]
@@ -0,0 +1,46 @@
+"""ScheduleArchive: upsert версий расписания и агрегаты для !stats."""
+import pytest
+
+import main_bot as mb
+from conftest import BASE, HOUR, mission
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = mb.ScheduleArchive(str(tmp_path / "archive.sqlite3"))
+    yield archive
+    archive.close()
+
+def test_record_upserts_only_new_or_changed_missions(archive, hourly):
+    first = mb.ScheduleStore.from_missions(hourly(4, {1: {"tier": "S"}}))
+    assert archive.record(first, BASE) == 4
+    assert archive.version == 1
+    assert archive.record(first, BASE + 60) == 0  # Тот же отпечаток — без запросов
+
+    # Следующий скрапинг: часы 1–3 те же (час 3 поменял бонус), плюс час 4
+    shifted = hourly(5, {1: {"tier": "S"}, 3: {"bonus": "Energy Drain"}})[1:]
+    assert archive.record(mb.ScheduleStore.from_missions(shifted), BASE + HOUR) == 2
+    assert archive.version == 2
+
+    # Одинаковое содержимое в новом хранилище не меняет ни строк, ни версии
+    archive.archived_hash = ''
+    assert archive.record(mb.ScheduleStore.from_missions(shifted), BASE + 2 * HOUR) == 0
+    assert archive.version == 2
+
+    assert archive.span() == (BASE, BASE + 4 * HOUR, 5)
+    bonus, first_seen = archive._query("SELECT bonus, first_seen FROM missions WHERE start = ?", (BASE + 3 * HOUR,))[0]
+    assert (bonus, first_seen) == ("Energy Drain", BASE)  # first_seen не переписывается
+
+def test_aggregates(archive):
+    special = {0: dict(tier="S", node="Io"), 4: dict(tier="S"), 7: dict(tier="S", faction="Corpus")}
+    missions = [mission(BASE + h * HOUR, **special.get(h, {})) for h in range(10)]
+    archive.record(mb.ScheduleStore.from_missions(missions), BASE)
+
+    assert archive.tier_frequency("io") == [("Io", {"S": 1})]
+    assert archive.tier_frequency(limit=1) == [("Casta", {"C": 7, "S": 2})]
+    assert archive.tier_gaps("S") == {"count": 3, "mean": 3.5, "median": 4.0, "min": 3.0, "max": 4.0}
+    assert archive.tier_gaps("A") is None
+    assert archive.faction_mix(BASE + 5 * HOUR) == [("Grineer", 4), ("Corpus", 1)]
+
+def test_empty_archive_has_no_span(archive):
+    assert archive.span() is None
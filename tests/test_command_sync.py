@@ -0,0 +1,27 @@
+"""Синхронизация слэш-команд только при изменении дерева команд."""
+import asyncio
+
+import main_bot as mb
+
+
+def test_tree_is_synced_only_when_it_changes(monkeypatch):
+    calls = []
+
+    async def fake_sync(*args, **kwargs):
+        calls.append(kwargs)
+        return []
+
+    monkeypatch.setattr(mb.bot.tree, 'sync', fake_sync)
+    monkeypatch.delitem(mb.STATE, 'COMMAND_TREE_HASH', raising=False)
+
+    async def scenario():
+        assert await mb.bot.sync_command_tree()
+        assert not await mb.bot.sync_command_tree()
+        assert await mb.bot.sync_command_tree(force=True)
+        # Другое дерево (например, новая команда) — снова синхронизируем
+        mb.STATE['COMMAND_TREE_HASH'] = 'stale'
+        assert await mb.bot.sync_command_tree()
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+    assert mb.STATE['COMMAND_TREE_HASH'] == mb.bot.command_tree_hash()
@@ -0,0 +1,160 @@
+"""HTTP-источник без браузера: условные запросы, 304 и откат на запасной источник.
+
+Сервер — benchmarks/fake_browsewf.py на случайном порту; отказ и пустой
+ответ отдают два дополнительных маршрута.
+"""
+import asyncio
+import contextlib
+import os
+import sys
+
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+import main_bot as mb
+from conftest import BASE, HOUR, REPO_DIR
+
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+from fake_browsewf import FakeBrowseWf  # noqa: E402
+
+
+@contextlib.asynccontextmanager
+async def fake_browsewf():
+    site = FakeBrowseWf(days=1)
+    app = site.make_app()
+
+    async def down(request):
+        return web.Response(status=503)
+
+    async def empty(request):
+        return web.json_response([])
+
+    app.router.add_get('/down.json', down)
+    app.router.add_get('/empty.json', empty)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    host, port = runner.addresses[0][:2]
+    try:
+        yield site, f"http://{host}:{port}"
+    finally:
+        # Сессия общая для всех запросов бота и привязана к event loop теста
+        await mb.close_http_session()
+        await runner.cleanup()
+
+class StaticSource(mb.ScheduleSource):
+    """Запасной источник с готовыми записями вместо браузера."""
+
+    name = "static"
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        return self.entries
+
+FALLBACK_ENTRIES = [(str(BASE), "00:00 • Defense - Grineer @ Casta, Ceres (C tier)")]
+
+
+def test_conditional_request_gets_304():
+    async def scenario():
+        async with fake_browsewf() as (site, url):
+            source = mb.HttpSource(f"{url}/arbys.json")
+            try:
+                entries = await source.fetch()
+                assert len(entries) == 24 and site.not_modified == 0
+                assert await source.fetch() is None
+                assert site.not_modified == 1
+                # HTML-страница той же подмены разбирается в те же пары
+                html_source = mb.HttpSource(f"{url}/arbys")
+                assert [tuple(e) for e in await html_source.fetch()] == [tuple(e) for e in entries]
+                await html_source.close()
+            finally:
+                await source.close()
+
+    asyncio.run(scenario())
+
+def test_not_modified_republishes_cache_without_parsing(monkeypatch):
+    async def scenario():
+        async with fake_browsewf() as (site, url):
+            source = mb.HttpSource(f"{url}/arbys.json")
+            monkeypatch.setattr(mb, 'SCHEDULE_SOURCE', source)
+            try:
+                first = await mb.parse_warframe_state()
+                assert len(first.store) == 24
+
+                def must_not_parse(entries):
+                    raise AssertionError("304 не должен разбираться заново")
+
+                monkeypatch.setattr(mb, 'parse_arbitration_entries', must_not_parse)
+                again = await mb.parse_warframe_state()
+                assert again.store is first.store and again.version == first.version
+                assert again.scraped_at >= first.scraped_at
+                assert site.not_modified == 1
+            finally:
+                await source.close()
+
+    asyncio.run(scenario())
+
+def test_server_error_falls_back():
+    async def scenario():
+        async with fake_browsewf() as (site, url):
+            primary, fallback = mb.HttpSource(f"{url}/down.json"), StaticSource(FALLBACK_ENTRIES)
+            source = mb.FallbackSource(primary, fallback)
+            try:
+                assert await source.fetch() == FALLBACK_ENTRIES
+                assert fallback.calls == 1
+            finally:
+                await source.close()
+
+    asyncio.run(scenario())
+
+def test_empty_payload_falls_back_and_is_not_cached():
+    async def scenario():
+        async with fake_browsewf() as (site, url):
+            primary, fallback = mb.HttpSource(f"{url}/empty.json"), StaticSource(FALLBACK_ENTRIES)
+            source = mb.FallbackSource(primary, fallback)
+            try:
+                assert await source.fetch() == FALLBACK_ENTRIES
+                # Пустой ответ не запоминается: следующий запрос не условный
+                assert primary._validators == {}
+                assert await source.fetch() == FALLBACK_ENTRIES
+                assert fallback.calls == 2
+            finally:
+                await source.close()
+
+    asyncio.run(scenario())
+
+def test_not_modified_does_not_fall_back():
+    async def scenario():
+        async with fake_browsewf() as (site, url):
+            fallback = StaticSource(FALLBACK_ENTRIES)
+            source = mb.FallbackSource(mb.HttpSource(f"{url}/arbys.json"), fallback)
+            try:
+                assert len(await source.fetch()) == 24
+                assert await source.fetch() is None
+                assert fallback.calls == 0
+            finally:
+                await source.close()
+
+    asyncio.run(scenario())
+
+def test_html_payload_matches_dom_parse():
+    html = (
+        '<div id="log">'
+        f'<b data-timestamp="{BASE + HOUR}">01:00 • Survival - Infested @ Io, Jupiter (S tier)</b>'
+        f'<span data-timestamp="{BASE}">00:00 • Defense - Grineer @ Casta, Ceres (C tier, +Energy)</span>'
+        '</div>'
+    )
+    now = BASE + 10 * 60
+    from_dom = mb.parse_arbitration_schedule(BeautifulSoup(html, 'html.parser'), now)
+    entries = mb.decode_source_payload(html, 'text/html')
+    from_payload = mb.build_arbitration_schedule(
+        mb.ScheduleStore.from_missions(mb.parse_arbitration_entries(entries)), now)
+
+    assert from_dom == from_payload
+    assert from_dom["Current"]["Node"] == "Casta"
+    assert from_dom["Current"]["Bonus"] == "+Energy"
+    assert [m["Tier"] for m in from_dom["Upcoming"]] == ["S"]
@@ -0,0 +1,116 @@
+"""JsonStore: отложенная пакетная запись и атомарная замена файла."""
+import asyncio
+import json
+import os
+import threading
+
+import main_bot as mb
+
+
+def counting_store(path, data):
+    store = mb.JsonStore(str(path), data)
+    writes = []
+    write = store._write
+
+    def counted(raw):
+        writes.append(raw)
+        write(raw)
+
+    store._write = counted
+    return store, writes
+
+def test_mark_dirty_outside_event_loop_writes_immediately(tmp_path):
+    path = tmp_path / "state.json"
+    store, writes = counting_store(path, {"A": 1})
+    store.mark_dirty()
+    assert len(writes) == 1
+    assert json.loads(path.read_text(encoding='utf-8')) == {"A": 1}
+
+def test_changes_in_event_loop_are_debounced_into_one_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(mb, 'CONFIG_FLUSH_DELAY_SECONDS', 0.05)
+    path = tmp_path / "state.json"
+    data = {}
+    store, writes = counting_store(path, data)
+
+    async def scenario():
+        for i in range(5):
+            data["N"] = i
+            store.mark_dirty()
+        assert not path.exists()  # Запись отложена
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+    assert len(writes) == 1
+    assert json.loads(path.read_text(encoding='utf-8')) == {"N": 4}
+    assert os.listdir(tmp_path) == ["state.json"]  # Временный файл заменен атомарно
+
+def test_flush_writes_pending_changes_synchronously(tmp_path, monkeypatch):
+    monkeypatch.setattr(mb, 'CONFIG_FLUSH_DELAY_SECONDS', 60)
+    path = tmp_path / "config.json"
+    store, writes = counting_store(path, {"GUILDS": {}})
+
+    async def scenario():
+        store.mark_dirty()
+        store.flush()
+        assert json.loads(path.read_text(encoding='utf-8')) == {"GUILDS": {}}
+
+    asyncio.run(scenario())
+    assert len(writes) == 1
+    store.flush()  # Нечего сохранять — повторной записи нет
+    assert len(writes) == 1
+
+def test_load_keeps_defaults_when_file_is_broken(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{broken", encoding='utf-8')
+    store = mb.JsonStore(str(path), {"GUILDS": {}})
+    assert not store.load()
+    assert store.data == {"GUILDS": {}}
+
+def test_flush_waits_for_background_write_in_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(mb, 'CONFIG_FLUSH_DELAY_SECONDS', 0)
+    path = tmp_path / "state.json"
+    data = {"N": 1}
+    store = mb.JsonStore(str(path), data)
+    written = []
+    write = store._write
+
+    def recorded(raw):
+        write(raw)
+        written.append(json.loads(raw))  # Только успешно завершенные записи
+
+    store._write = recorded
+    in_fsync, release = threading.Event(), threading.Event()
+    fsync = os.fsync
+
+    def slow_fsync(fd):
+        if threading.current_thread() is not threading.main_thread():
+            in_fsync.set()
+            release.wait(5)
+        fsync(fd)
+
+    monkeypatch.setattr(os, 'fsync', slow_fsync)
+
+    async def scenario():
+        store.mark_dirty()
+        while not in_fsync.is_set():  # Фоновая запись застряла на fsync
+            await asyncio.sleep(0.01)
+        data["N"] = 2
+        store.mark_dirty()
+        threading.Timer(0.2, release.set).start()
+        store.flush()  # Отмена задачи не останавливает поток — flush ждет его
+
+    asyncio.run(scenario())
+    assert written == [{"N": 1}, {"N": 2}]
+    assert json.loads(path.read_text(encoding='utf-8')) == {"N": 2}
+    assert os.listdir(tmp_path) == ["state.json"]
+
+def test_stale_snapshot_does_not_overwrite_newer_one(tmp_path):
+    path = tmp_path / "state.json"
+    data = {"N": 1}
+    store = mb.JsonStore(str(path), data)
+    stale = store._serialize()
+    data["N"] = 2
+    store._dirty = True
+    store.flush()
+    store._save(*stale)  # Запоздавшая фоновая запись старого снимка
+    assert json.loads(path.read_text(encoding='utf-8')) == {"N": 2}
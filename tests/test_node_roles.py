@@ -0,0 +1,57 @@
+"""NodeRoleIndex: поиск роли ноды по MAP_ROLES и по именам ролей."""
+from types import SimpleNamespace
+
+import pytest
+
+import main_bot as mb
+
+GUILD_ID = 7
+
+
+def role(role_id: int, name: str):
+    return SimpleNamespace(id=role_id, name=name, is_default=lambda: role_id == GUILD_ID)
+
+@pytest.fixture
+def guild_config():
+    saved = dict(mb.CONFIG)
+    mb.CONFIG.clear()
+    yield mb.guild_settings(GUILD_ID)
+    mb.CONFIG.clear()
+    mb.CONFIG.update(saved)
+
+def test_lookup_by_role_name_conventions(guild_config):
+    guild = SimpleNamespace(id=GUILD_ID, roles=[role(GUILD_ID, "@everyone"), role(1, "Арби Casta"), role(2, "arby-io (Jupiter)")])
+    index = mb.NodeRoleIndex(guild)
+    assert index.lookup("Casta") == 1
+    assert index.lookup("IO") == 2
+    assert index.lookup("Hydron") is None
+
+def test_map_roles_win_over_names_and_follow_role_events(guild_config):
+    guild_config['MAP_ROLES'] = {"Casta": 3, "Hydron": "Defense fans"}
+    casta, explicit, fans = role(1, "Casta"), role(3, "Ceres squad"), role(4, "Defense fans")
+    index = mb.NodeRoleIndex(SimpleNamespace(id=GUILD_ID, roles=[casta, explicit]))
+    assert index.lookup("Casta") == 3
+    assert index.lookup("Hydron") is None
+
+    index.add_role(fans)
+    assert index.lookup("Hydron") == 4
+    index.remove_role(explicit)
+    assert index.lookup("Casta") == 1
+    index.remove_role(fans)
+    assert index.lookup("Hydron") is None
+
+def test_mention_looks_role_up_once_and_reports_missing_role_once(guild_config, monkeypatch, capsys):
+    monkeypatch.setitem(mb.STATE, 'GUILDS', {})
+    monkeypatch.setitem(mb.NODE_ROLE_INDEXES, GUILD_ID, mb.NodeRoleIndex(
+        SimpleNamespace(id=GUILD_ID, roles=[role(GUILD_ID, "@everyone"), role(1, "Casta")])))
+    guild = SimpleNamespace(id=GUILD_ID)
+    lookups = []
+    find = mb.find_node_role_id
+    monkeypatch.setattr(mb, 'find_node_role_id', lambda g, node: lookups.append(node) or find(g, node))
+
+    # Две подряд миссии на Hydron без роли и одна обновка продолжающейся миссии
+    for start in (1000, 1000, 2000):
+        assert mb.resolve_arbitration_mention(guild, {"IsActive": True, "Node": "Hydron", "StartTimestamp": start}) is None
+    assert mb.resolve_arbitration_mention(guild, {"IsActive": True, "Node": "Casta", "StartTimestamp": 3000}) == "<@&1>"
+    assert lookups == ["Hydron", "Hydron", "Hydron", "Casta"]
+    assert capsys.readouterr().out.count("Роль не найдена для ноды: Hydron") == 1
@@ -0,0 +1,67 @@
+"""Подписки: сопоставление правил и однократная постановка уведомлений в очередь."""
+import pytest
+
+import main_bot as mb
+from conftest import BASE, HOUR, mission
+
+GUILD_ID = 42
+CHANNEL_ID = 777
+
+
+@pytest.fixture
+def engine(monkeypatch, hourly):
+    """Чистые CONFIG/STATE, расписание на сутки с S-тиром через 3 часа и свой NotificationEngine."""
+    saved_config, saved_state = dict(mb.CONFIG), dict(mb.STATE)
+    mb.CONFIG.clear()
+    mb.STATE.clear()
+    store = mb.ScheduleStore.from_missions(hourly(24, {3: {"tier": "S", "node": "Io", "faction": "Corpus"}}))
+    monkeypatch.setattr(mb, 'CURRENT_SCHEDULE', mb.ScheduleSnapshot(store, BASE, next(mb.SCHEDULE_VERSIONS)))
+    yield mb.NotificationEngine()
+    mb.CONFIG.clear()
+    mb.CONFIG.update(saved_config)
+    mb.STATE.clear()
+    mb.STATE.update(saved_state)
+
+def add_rule(rule_id: str, **rule):
+    mb.guild_settings(GUILD_ID).setdefault('SUBSCRIPTIONS', {})[rule_id] = rule
+
+def test_index_matches_only_when_every_condition_holds():
+    index = mb.SubscriptionIndex([
+        ((1, "1"), {"TIERS": ["S", "A"], "FACTION": "Корпус", "LEAD_MINUTES": 0}),
+        ((1, "2"), {"NODE": "io", "LEAD_MINUTES": 0}),
+    ])
+    assert sorted(index.match(mission(BASE, tier="S", node="Io", faction="Corpus"))) == [(1, "1"), (1, "2")]
+    assert index.match(mission(BASE, tier="S", node="Casta", faction="Grineer")) == []
+    assert index.match(mission(BASE, tier="B", node="Io", faction="Corpus")) == [(1, "2")]
+
+def test_index_ignores_duplicate_values_after_normalization():
+    index = mb.SubscriptionIndex([
+        ((1, "1"), {"TIERS": ["S", "s"], "TYPE": ["Defense", "defense"], "LEAD_MINUTES": 0}),
+    ])
+    assert index.match(mission(BASE, tier="S", mission_type="Defense")) == [(1, "1")]
+    assert index.match(mission(BASE, tier="A", mission_type="Defense")) == []
+
+def test_user_rule_is_queued_once_when_due(engine):
+    add_rule("1", TIERS=["S"], LEAD_MINUTES=30, OWNER='user', TARGET_ID=5)
+    start = BASE + 3 * HOUR
+
+    assert engine.collect(start - 40 * 60) == 0  # Срок еще не наступил
+    assert engine.collect(start - 20 * 60) == 1
+    assert engine.collect(start - 10 * 60) == 0
+    assert mb.STATE['OUTBOX']["user:5"]["MISSIONS"] == [start]
+    assert mb.guild_state(GUILD_ID)['NOTIFIED']["1"] == start
+
+def test_role_rule_waits_for_arbitration_channel(engine):
+    add_rule("1", TIERS=["S"], LEAD_MINUTES=30, OWNER='role', TARGET_ID=900)
+    start = BASE + 3 * HOUR
+
+    assert engine.collect(start - 20 * 60) == 0
+    assert "1" not in mb.guild_state(GUILD_ID).get('NOTIFIED', {})
+    assert not mb.STATE.get('OUTBOX')
+
+    mb.guild_settings(GUILD_ID)['ARBITRATION_CHANNEL_ID'] = CHANNEL_ID
+    assert engine.collect(start - 10 * 60) == 1
+    entry = mb.STATE['OUTBOX'][f"channel:{CHANNEL_ID}"]
+    assert entry["MISSIONS"] == [start]
+    assert entry["MENTIONS"] == [900]
+    assert engine.collect(start - 5 * 60) == 0
@@ -0,0 +1,83 @@
+"""ScheduleStore: границы поиска по времени, индексы полей, снимок на диске и
+отпечаток содержимого."""
+import pytest
+
+import main_bot as mb
+from conftest import BASE, HOUR, mission
+
+
+@pytest.fixture
+def store(hourly):
+    return mb.ScheduleStore.from_missions(hourly(6, {
+        2: {"tier": "S", "node": "Io", "planet": "Jupiter"},
+        4: {"tier": "S", "faction": "Corpus"},
+    }))
+
+def test_current_index_boundaries(store):
+    assert store.current_index(BASE - 1) is None
+    assert store.current_index(BASE) == 0
+    assert store.current_index(BASE + HOUR - 1) == 0
+    assert store.current_index(BASE + HOUR) == 1
+    assert store.current_index(store.horizon_end - 1) == 5
+    assert store.current_index(store.horizon_end) is None
+
+def test_current_index_in_a_gap():
+    gapped = mb.ScheduleStore.from_missions([mission(BASE), mission(BASE + 2 * HOUR)])
+    assert gapped.current_index(BASE + HOUR) is None
+    assert gapped.first_after(BASE + HOUR) == 1
+
+def test_first_after_is_strict(store):
+    assert store.first_after(BASE - 1) == 0
+    assert store.first_after(BASE) == 1
+    assert store.first_after(BASE + 5 * HOUR) == len(store) == 6
+
+def test_next_index_by_fields(store):
+    assert store.next_index(BASE) == 1
+    assert store.next_index(BASE, Tier="S") == 2
+    assert store.next_index(BASE + 2 * HOUR, Tier="S") == 4  # Идущая S уже не «следующая»
+    assert store.next_index(BASE + 4 * HOUR, Tier="S") is None
+    assert store.next_index(BASE, Node="Io") == 2
+    assert store.next_index(BASE, Tier="S", Faction="Corpus") == 4
+    assert store.next_index(BASE, Node="Nowhere") is None
+
+def test_empty_store():
+    empty = mb.ScheduleStore.from_missions([])
+    assert len(empty) == 0 and empty.horizon_end == 0
+    assert empty.current_index(BASE) is None
+    assert empty.next_index(BASE, Tier="S") is None
+
+def test_snapshot_roundtrip(store):
+    restored = mb.ScheduleStore.from_snapshot(store.to_snapshot())
+    assert restored.same_content(store)
+    assert [restored.mission(pos) for pos in range(len(restored))] == [store.mission(pos) for pos in range(len(store))]
+    assert restored.next_index(BASE, Node="Io") == 2
+
+def test_snapshot_with_bad_codes_is_rejected(store):
+    data = store.to_snapshot()
+    data["codes"]["Tier"][0] = len(data["tables"]["Tier"])
+    with pytest.raises(ValueError):
+        mb.ScheduleStore.from_snapshot(data)
+    data = store.to_snapshot()
+    data["codes"]["Node"].pop()
+    with pytest.raises(ValueError):
+        mb.ScheduleStore.from_snapshot(data)
+
+def test_content_hash_follows_content(hourly):
+    missions = hourly(6)
+    same = mb.ScheduleStore.from_missions(reversed(missions))
+    assert mb.ScheduleStore.from_missions(missions).content_hash == same.content_hash
+
+    changed = hourly(6, {3: {"bonus": "Energy Drain"}})
+    assert mb.ScheduleStore.from_missions(changed).content_hash != same.content_hash
+    assert mb.ScheduleStore.from_missions(missions[:-1]).content_hash != same.content_hash
+
+def test_publish_keeps_version_for_same_content(monkeypatch, hourly):
+    monkeypatch.setattr(mb, 'CURRENT_SCHEDULE', mb.CURRENT_SCHEDULE)  # Вернуть кэш после теста
+    first = mb.publish_schedule(mb.ScheduleStore.from_missions(hourly(6)), BASE)
+    again = mb.publish_schedule(mb.ScheduleStore.from_missions(hourly(6)), BASE + 60)
+    assert again.store is first.store and again.version == first.version
+    assert again.scraped_at == BASE + 60
+
+    changed = mb.publish_schedule(mb.ScheduleStore.from_missions(hourly(7)), BASE + 120)
+    assert changed.version > first.version
+    assert mb.CURRENT_SCHEDULE is changed
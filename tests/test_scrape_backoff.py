@@ -0,0 +1,103 @@
+"""ScrapeBackoff: рост паузы, размыкание цепи, сброс и пометка устаревшего кэша."""
+import asyncio
+
+import pytest
+
+import main_bot as mb
+from conftest import BASE, HOUR
+
+NOW = float(BASE)
+
+
+@pytest.fixture
+def backoff(monkeypatch):
+    backoff = mb.ScrapeBackoff()
+    monkeypatch.setattr(mb, 'SCRAPE_BACKOFF', backoff)
+    return backoff
+
+def test_delay_doubles_and_is_capped(backoff, monkeypatch):
+    monkeypatch.setattr(mb, 'SCRAPE_CIRCUIT_THRESHOLD', 100)
+    monkeypatch.setattr(mb.random, 'uniform', lambda low, high: high)
+    delays = []
+    for _ in range(8):
+        assert not backoff.record_failure(NOW)
+        delays.append(backoff.not_before - NOW)
+    base = mb.SCRAPE_BACKOFF_BASE_SECONDS
+    assert delays[:4] == [base, 2 * base, 4 * base, 8 * base]
+    assert delays[-1] == mb.SCRAPE_BACKOFF_MAX_SECONDS
+
+def test_jitter_stays_within_half_the_delay(backoff):
+    for failures in range(1, mb.SCRAPE_CIRCUIT_THRESHOLD):
+        backoff.record_failure(NOW)
+        delay = min(mb.SCRAPE_BACKOFF_MAX_SECONDS, mb.SCRAPE_BACKOFF_BASE_SECONDS * 2 ** (failures - 1))
+        assert delay / 2 <= backoff.not_before - NOW <= delay
+
+def test_circuit_opens_at_threshold_and_a_failed_trial_reopens_it(backoff):
+    opened = [backoff.record_failure(NOW) for _ in range(mb.SCRAPE_CIRCUIT_THRESHOLD)]
+    assert opened == [False] * (mb.SCRAPE_CIRCUIT_THRESHOLD - 1) + [True]
+    assert backoff.is_open(NOW)
+    assert backoff.not_before == NOW + mb.SCRAPE_CIRCUIT_COOLDOWN_SECONDS
+
+    trial = NOW + mb.SCRAPE_CIRCUIT_COOLDOWN_SECONDS
+    assert not backoff.is_open(trial)
+    assert backoff.record_failure(trial)  # Пробная попытка не удалась — цепь снова разомкнута
+    assert backoff.is_open(trial + 1)
+
+def test_success_resets_everything(backoff):
+    for _ in range(mb.SCRAPE_CIRCUIT_THRESHOLD):
+        backoff.record_failure(NOW)
+    backoff.record_success()
+    assert (backoff.failures, backoff.not_before, backoff.open_until) == (0, 0.0, 0.0)
+    assert not backoff.is_open(NOW)
+    assert not backoff.record_failure(NOW)  # Счет начинается заново
+
+def test_next_scrape_waits_for_backoff(backoff, monkeypatch):
+    empty = mb.ScheduleSnapshot(mb.ScheduleStore.from_missions([]), 0, next(mb.SCHEDULE_VERSIONS))
+    monkeypatch.setattr(mb, 'CURRENT_SCHEDULE', empty)
+    assert mb.timeline_needs_refresh(NOW)
+    backoff.record_failure(NOW)
+    assert not mb.timeline_needs_refresh(NOW)
+    assert mb.next_scrape_time(NOW) == backoff.not_before
+
+def test_stale_since():
+    def snapshot(scraped_at):
+        return mb.ScheduleSnapshot(mb.ScheduleStore.from_missions([]), scraped_at, 0)
+
+    assert mb.schedule_stale_since(snapshot(0), NOW) is None  # Скрапинга еще не было — не «устарело»
+    assert mb.schedule_stale_since(snapshot(NOW - mb.SCRAPE_STALE_AFTER_SECONDS + 1), NOW) is None
+    stale = NOW - mb.SCRAPE_STALE_AFTER_SECONDS
+    assert mb.schedule_stale_since(snapshot(stale), NOW) == int(stale)
+
+class FlakySource(mb.ScheduleSource):
+    """Источник, который падает, пока не получит записи."""
+
+    name = "flaky"
+
+    def __init__(self):
+        self.entries = None
+        self.resets = 0
+
+    async def fetch(self):
+        if self.entries is None:
+            raise RuntimeError("503")
+        return self.entries
+
+    async def reset(self):
+        self.resets += 1
+
+def test_scrape_cycle_feeds_the_backoff(backoff, monkeypatch):
+    source = FlakySource()
+    monkeypatch.setattr(mb, 'SCHEDULE_SOURCE', source)
+
+    async def scenario():
+        for _ in range(mb.SCRAPE_CIRCUIT_THRESHOLD):
+            assert await mb.run_scrape_cycle() is None
+        assert backoff.is_open(mb.time.time())
+        # Ошибка fetch сбрасывает источник, размыкание цепи — еще раз
+        assert source.resets == mb.SCRAPE_CIRCUIT_THRESHOLD + 1
+
+        source.entries = [(str(BASE + HOUR), "01:00 • Survival - Infested @ Io, Jupiter (S tier)")]
+        assert len((await mb.run_scrape_cycle()).store) == 1
+        assert backoff.failures == 0 and not backoff.is_open(mb.time.time())
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+"""Процесс скрапинга: настоящий дочерний `main_bot.py --scrape-worker`
+против benchmarks/fake_browsewf.py на случайном порту."""
+import asyncio
+
+import pytest
+
+import main_bot as mb
+from test_http_source import fake_browsewf
+
+
+def run_with_worker(monkeypatch, scenario, path="/arbys.json"):
+    async def main():
+        async with fake_browsewf() as (site, url):
+            # Воркер читает настройки источника из окружения при импорте
+            monkeypatch.setenv('SCRAPE_SOURCE', 'http')
+            monkeypatch.setenv('HTTP_SOURCE_URL', f"{url}{path}")
+            source = mb.WorkerSource("http")
+            try:
+                return await scenario(source)
+            finally:
+                await source.close()
+    return asyncio.run(main())
+
+def test_worker_recycled_after_max_scrapes(monkeypatch):
+    monkeypatch.setattr(mb, 'SCRAPE_WORKER_MAX_SCRAPES', 2)
+
+    async def scenario(source):
+        results = []
+        for _ in range(3):
+            entries = await source.fetch()
+            results.append((source._process.pid, entries is not None))
+        return results
+
+    (first, fresh), (second, cached), (third, refetched) = run_with_worker(monkeypatch, scenario)
+    assert first == second and (fresh, cached) == (True, False)  # Тот же процесс помнит ETag
+    assert third != first and refetched  # Новый процесс начинает с чистого источника
+
+def test_reset_after_error_keeps_worker(monkeypatch):
+    async def scenario(source):
+        pids = []
+        for _ in range(2):
+            with pytest.raises(mb.ScrapeWorkerError):
+                await source.fetch()
+            await source.reset()  # Так делает parse_warframe_state после ошибки
+            assert source.is_alive()
+            pids.append(source._process.pid)
+        return pids
+
+    first, second = run_with_worker(monkeypatch, scenario, path="/down.json")
+    assert first == second
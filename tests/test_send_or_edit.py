@@ -0,0 +1,70 @@
+"""send_or_edit_message: правка только при изменении содержимого."""
+import asyncio
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+import main_bot as mb
+
+MESSAGE_IDS = itertools.count(1000)
+
+
+class FakeMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **fields):
+        self.channel.edits.append((self.id, fields))
+
+
+class FakeChannel:
+    """Текстовый канал, записывающий отправки и правки вместо запросов к API."""
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.sent = []
+        self.edits = []
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self, message_id)
+
+    async def send(self, **fields):
+        self.sent.append(fields)
+        return FakeMessage(self, next(MESSAGE_IDS))
+
+
+def schedule_embed(node, minutes_ago=0):
+    embed = discord.Embed(title="Арбитраж", description=node)
+    embed.timestamp = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return embed
+
+def test_unchanged_render_skips_the_edit():
+    channel = FakeChannel(501)
+
+    async def scenario():
+        await mb.send_or_edit_message('TEST_SKIP_MESSAGE_ID', channel, schedule_embed("Casta", 5))
+        # Тот же рендер, другое время обновления — запроса нет
+        await mb.send_or_edit_message('TEST_SKIP_MESSAGE_ID', channel, schedule_embed("Casta"))
+        await mb.send_or_edit_message('TEST_SKIP_MESSAGE_ID', channel, schedule_embed("Casta"), content="  ")
+
+    asyncio.run(scenario())
+    assert len(channel.sent) == 1
+    assert channel.edits == []
+
+def test_changed_render_edits_the_same_message():
+    channel = FakeChannel(502)
+
+    async def scenario():
+        await mb.send_or_edit_message('TEST_EDIT_MESSAGE_ID', channel, schedule_embed("Casta"))
+        await mb.send_or_edit_message('TEST_EDIT_MESSAGE_ID', channel, schedule_embed("Io"))
+        await mb.send_or_edit_message('TEST_EDIT_MESSAGE_ID', channel, schedule_embed("Io"), content="<@&7>")
+        await mb.send_or_edit_message('TEST_EDIT_MESSAGE_ID', channel, schedule_embed("Io"), content="<@&7>")
+
+    asyncio.run(scenario())
+    assert len(channel.sent) == 1
+    assert [fields['embed'].description for _, fields in channel.edits] == ["Io", "Io"]
+    assert [fields['content'] for _, fields in channel.edits] == [None, "<@&7>"]
+    assert len({message_id for message_id, _ in channel.edits}) == 1
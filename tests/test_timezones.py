@@ -0,0 +1,28 @@
+"""resolve_timezone: смещения UTC±ЧЧ[:ММ] и имена IANA."""
+from datetime import timedelta, timezone
+
+import pytest
+
+import main_bot as mb
+
+
+@pytest.mark.parametrize("name, hours", [
+    ("UTC", 0), ("gmt", 0), ("UTC+3", 3), ("utc+3", 3), ("+05:30", 5.5), ("+0530", 5.5),
+    ("UTC+14", 14), ("GMT-3", -3), ("UTC-9:30", -9.5), ("UTC-12", -12),
+])
+def test_offsets(name, hours):
+    assert mb.resolve_timezone(name) == timezone(timedelta(hours=hours))
+
+@pytest.mark.parametrize("name", ["UTC+15", "UTC+14:30", "UTC-13", "UTC+5:75", "UTC+", "3"])
+def test_offsets_out_of_range_or_malformed(name):
+    with pytest.raises(ValueError):
+        mb.resolve_timezone(name)
+
+def test_iana_names():
+    assert mb.resolve_timezone(" Europe/Berlin ").key == "Europe/Berlin"
+    for name in ("Mars/Olympus_Mons", "", "../etc/passwd"):
+        with pytest.raises(ValueError):
+            mb.resolve_timezone(name)
+
+def test_unknown_profile_timezone_falls_back_to_default():
+    assert mb.profile_timezone(("en", "Mars/Olympus_Mons")) == mb.resolve_timezone(mb.DEFAULT_TIMEZONE)
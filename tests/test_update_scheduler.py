@@ -0,0 +1,18 @@
+"""Сроки пробуждения цикла обновления канала."""
+import main_bot as mb
+from conftest import BASE, HOUR
+
+
+def test_recheck_every_minute_while_scrape_is_due(monkeypatch, hourly):
+    store = mb.ScheduleStore.from_missions(hourly(100))
+    monkeypatch.setattr(mb, 'NOTIFIER', mb.NotificationEngine())
+    now = BASE + 55 * 60
+
+    # Кэш свежий: ближайшее событие — конец текущей миссии
+    monkeypatch.setattr(mb, 'CURRENT_SCHEDULE', mb.ScheduleSnapshot(store, now, next(mb.SCHEDULE_VERSIONS)))
+    assert mb.next_update_time(now) == BASE + HOUR + mb.UPDATE_BOUNDARY_LAG_SECONDS
+
+    # Срок скрапинга прошел (кэш старый): перепроверка через минуту
+    monkeypatch.setattr(mb, 'CURRENT_SCHEDULE', mb.ScheduleSnapshot(store, now - 7 * 24 * HOUR, next(mb.SCHEDULE_VERSIONS)))
+    assert mb.timeline_needs_refresh(now)
+    assert mb.next_update_time(now) == now + mb.UPDATE_RECHECK_SECONDS + mb.UPDATE_BOUNDARY_LAG_SECONDS